@@ -0,0 +1,78 @@
+from collections import Counter
+from django.conf import settings
+from django.middleware.cache import CacheMiddleware
+from django.utils.cache import patch_response_headers
+from django.utils.decorators import decorator_from_middleware_with_args
+from catalog.current_release import get_current_release_date
+from catalog.middleware.compression import precompress
+
+
+# Hits/misses of the response cache, per cache policy (in-process counters)
+cache_counters = {'hit': Counter(), 'miss': Counter(), 'oversize': Counter()}
+
+
+def make_release_key(key, key_prefix, version):
+    '''
+    Cache key function (KEY_FUNCTION) namespacing the keys with the current release date:
+    a new release invalidates all the entries of the cache at once, without having to flush it.
+    '''
+    return f'{key_prefix}:{version}:{get_current_release_date()}:{key}'
+
+
+class ReleaseCacheMiddleware(CacheMiddleware):
+    """
+    Cache middleware applying a cache policy (see CACHE_POLICIES), i.e.:
+     - 'timeout': number of seconds the response is kept in the cache (0: no cache)
+     - 'max_size': maximum size (bytes) of a response to be cached
+     - 'max_age': 'max-age' value of the Cache-Control header sent to the clients
+    and counting the hits/misses.
+    """
+    def __init__(self, get_response, policy=None, **kwargs):
+        self.policy = policy
+        kwargs.setdefault('key_prefix', policy)
+        kwargs.setdefault('cache_alias', settings.CACHE_MIDDLEWARE_ALIAS)
+        super().__init__(get_response, **kwargs)
+        self.load_policy()
+
+    def load_policy(self):
+        ''' Load the settings of the cache policy (read on each request as they can be overridden) '''
+        policy_settings = settings.CACHE_POLICIES[self.policy]
+        self.page_timeout = policy_settings['timeout']
+        self.max_size = policy_settings.get('max_size')
+        self.max_age = policy_settings.get('max_age')
+
+    def process_request(self, request):
+        self.load_policy()
+        if not self.page_timeout:
+            # No lookup in the cache, but the response headers are still updated
+            request._cache_update_cache = True
+            return None
+        if request.META.get('CONTENT_LENGTH') not in (None, '', '0'):
+            # The content of the request (e.g. JSON 'filter_ids' parameter) is not part of the cache key
+            request._cache_update_cache = False
+            return None
+        response = super().process_request(request)
+        if request.method in ('GET', 'HEAD'):
+            cache_status = 'miss' if response is None else 'hit'
+            cache_counters[cache_status][self.policy] += 1
+            # Status used by the metrics (see catalog.middleware.metrics), set on the Django request for the REST views
+            getattr(request, '_request', request).cache_status = cache_status
+        return response
+
+    def process_response(self, request, response):
+        self.load_policy()
+        if self.max_size and not response.streaming and len(response.content) > self.max_size:
+            cache_counters['oversize'][self.policy] += 1
+            request._cache_update_cache = False
+        # The max-age of the Cache-Control header is the minimum of this value and of the cache timeout
+        if self.max_age is not None and self._should_update_cache(request, response):
+            patch_response_headers(response, self.max_age)
+        # Store the compressed forms of the response with it, so the cache hits are not compressed again
+        if self.page_timeout and self._should_update_cache(request, response) and response.status_code == 200:
+            precompress(response)
+        return super().process_response(request, response)
+
+
+def release_cache_page(policy):
+    ''' View decorator caching the response with the given cache policy (see CACHE_POLICIES) '''
+    return decorator_from_middleware_with_args(ReleaseCacheMiddleware)(policy=policy)
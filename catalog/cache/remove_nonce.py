@@ -1,11 +1,12 @@
 from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
 import re
 
 
-class RemoveNonceFromCacheBackend(LocMemCache):
+class RemoveNonceMixin:
     """If a page is cached on the server and contains CSP nonces, the value of the nonce
     if not refreshed making it not matching the nonce any new HTTP response header, and
-    more problematically giving the same nonce to all clients. This subclass removes
+    more problematically giving the same nonce to all clients. This mixin removes
     the nonce completely from a cached page, which will be put back downstream by the
     middleware with the correct value of the new request."""
     def get(self, key, default=None, version=None):
@@ -22,3 +23,13 @@ class RemoveNonceFromCacheBackend(LocMemCache):
                         flags=re.IGNORECASE
                     ).encode('utf-8')
         return result
+
+
+class RemoveNonceFromCacheBackend(RemoveNonceMixin, LocMemCache):
+    """Local memory cache (per process), removing the CSP nonces from the cached pages"""
+    pass
+
+
+class RemoveNonceFromRedisCacheBackend(RemoveNonceMixin, RedisCache):
+    """Redis cache (shared between the instances), removing the CSP nonces from the cached pages"""
+    pass
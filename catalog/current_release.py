@@ -0,0 +1,57 @@
+import time
+from django.conf import settings
+
+
+# In-process cache of the current release date
+_current_release = {'date': None, 'expires': 0}
+
+
+def get_current_release_date():
+    '''
+    Return the date of the current (latest) release.
+    The value is kept in memory for CURRENT_RELEASE_CACHE_TIMEOUT seconds to avoid querying the database on each request.
+    '''
+    now = time.monotonic()
+    if now >= _current_release['expires']:
+        from catalog.models import Release
+        _current_release['date'] = Release.objects.order_by('-date').values_list('date', flat=True).first()
+        _current_release['expires'] = now + settings.CURRENT_RELEASE_CACHE_TIMEOUT
+    return _current_release['date']
+
+
+def reset_current_release_date():
+    ''' Clear the in-process value of the current release date (e.g. after creating a new release) '''
+    _current_release['expires'] = 0
+
+
+# In-process cache of the statistics of the current release
+_release_statistics = {'data': None, 'expires': 0}
+
+
+def get_release_statistics():
+    '''
+    Return the information and statistics (total numbers of entries) of the current release, as a dictionary:
+    'date', 'score_count', 'publication_count' (new entries in the release) and the 'total_*_count' values.
+    The totals come from the statistics snapshot stored in the release by the post-processing,
+    or are counted when the release doesn't have it (or on the curation site, where the data changes between releases).
+    The value is kept in memory for RELEASE_STATISTICS_CACHE_TIMEOUT seconds.
+    '''
+    now = time.monotonic()
+    if now >= _release_statistics['expires']:
+        from catalog.models import Release
+        release = Release.objects.order_by('-date').first()
+        data = {'date': None, 'score_count': None, 'publication_count': None}
+        if release:
+            data.update({'date': release.date, 'score_count': release.score_count, 'publication_count': release.publication_count})
+        if release and release.has_statistics and not settings.PGS_ON_CURATION_SITE:
+            data.update({field: getattr(release, field) for field in Release.statistics_fields})
+        else:
+            data.update(Release.compute_statistics())
+        _release_statistics['data'] = data
+        _release_statistics['expires'] = now + settings.RELEASE_STATISTICS_CACHE_TIMEOUT
+    return _release_statistics['data']
+
+
+def reset_release_statistics():
+    ''' Clear the in-process statistics of the current release (e.g. after updating the release) '''
+    _release_statistics['expires'] = 0
@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import zlib
+from collections import Counter
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Number of compressed responses, by type of compression (in-process counters)
+compression_counters = Counter()
+
+# Compression levels used for the data compressed once (e.g. JSON documents generated at release time)
+max_levels = {'gzip': 9, 'br': 11}
+
+
+def available_encodings():
+    ''' Content encodings supported, by order of preference '''
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def compress(content, encoding, level=None):
+    ''' Compress the content (bytes) with the given encoding ('gzip' or 'br') '''
+    if level is None:
+        level = settings.COMPRESSION_LEVELS[encoding]
+    if encoding == 'br':
+        return brotli.compress(content, quality=level)
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+class StreamCompressor:
+    """ Incremental compression of a stream: each chunk is compressed and flushed, so the client can decode it straight away """
+
+    def __init__(self, encoding):
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits=31: gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        self.encoding = encoding
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def content_digest(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def uses_csrf_token(response):
+    ''' Check if a CSRF token has been rendered in the response (CSRF cookie set by the CsrfViewMiddleware) '''
+    return settings.CSRF_COOKIE_NAME in response.cookies
+
+
+def is_compressible(response):
+    '''
+    Check the content type (allowlist), the size and the encoding of the response.
+    The responses containing a CSRF token (e.g. pages with forms, which can also reflect the user input) are not
+    compressed, to prevent the BREACH attack (guessing the token from the size of the compressed responses).
+    '''
+    if response.has_header('Content-Encoding') or uses_csrf_token(response):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+        return False
+    return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+def set_precompressed(response, variants):
+    '''
+    Attach compressed forms of the content to the response (dictionary encoding -> bytes), served as-is by the
+    CompressionMiddleware. They are linked to the digest of the content, so they are ignored if the content changes.
+    '''
+    response.precompressed = {'digest': content_digest(response.content), 'variants': variants}
+
+
+def precompress(response):
+    ''' Compress the content of a response with all the available encodings (e.g. before storing it in the cache) '''
+    if response.streaming or getattr(response, 'precompressed', None) or not is_compressible(response):
+        return
+    set_precompressed(response, {encoding: compress(response.content, encoding) for encoding in available_encodings()})
+
+
+def get_precompressed(response, encoding):
+    precompressed = getattr(response, 'precompressed', None)
+    if not precompressed or encoding not in precompressed['variants']:
+        return None
+    if precompressed['digest'] != content_digest(response.content):
+        return None
+    return precompressed['variants'][encoding]
+
+
+def get_accepted_encoding(request):
+    ''' Return the preferred encoding accepted by the client (header Accept-Encoding), or None '''
+    accepted = {}
+    for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = value.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        accepted[name.strip().lower()] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    This middleware class compresses the responses with brotli (if the library is installed) or gzip,
+    depending on the header Accept-Encoding of the request.
+    Only the content types listed in COMPRESSION_CONTENT_TYPES and the responses larger than COMPRESSION_MIN_SIZE
+    are compressed, except the responses containing a CSRF token. The compressed forms attached to the response (e.g. by the cache or from the JSON documents
+    generated at release time) are served as-is, and the streaming responses are compressed chunk by chunk.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = get_accepted_encoding(request)
+        if not encoding:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The length of the compressed content is not known in advance
+            del response['Content-Length']
+            compression_counters['stream'] += 1
+        else:
+            content = get_precompressed(response, encoding)
+            if content is not None:
+                compression_counters['precompressed'] += 1
+            else:
+                content = compress(response.content, encoding)
+                # Return the uncompressed response if the compression doesn't reduce its size
+                if len(content) >= len(response.content):
+                    return response
+                compression_counters['compressed'] += 1
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # The content is not byte for byte the same as the uncompressed response (weak ETag)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,188 @@
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from catalog.cache.release_cache import cache_counters
+from catalog.middleware.compression import compression_counters
+
+
+# Upper bounds of the buckets of the histograms
+duration_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+queries_buckets = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+bytes_buckets = (1000, 10000, 100000, 1000000, 10000000)
+
+
+class Histogram:
+    """ Cumulative histogram in the Prometheus format: number of observations per bucket, sum and count (by labels) """
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, labels, value):
+        ''' Add an observation. 'labels' is a tuple of (name, value) pairs '''
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry['buckets'][i] += 1
+        entry['sum'] += value
+        entry['count'] += 1
+
+    def export(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for labels, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry['buckets']):
+                lines.append(f'{self.name}_bucket{format_labels(labels + (("le", str(bound)),))} {count}')
+            lines.append(f'{self.name}_bucket{format_labels(labels + (("le", "+Inf"),))} {entry["count"]}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {entry["sum"]:g}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {entry["count"]}')
+        return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def format_counters(name, description, samples, metric_type='counter'):
+    ''' Lines of a counter (or gauge) metric, from a list of (labels, value) '''
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}']
+    for labels, value in sorted(samples):
+        lines.append(f'{name}{format_labels(labels)} {value:g}')
+    return lines
+
+
+# In-process metrics, aggregated per server process (each process exposes its own values)
+metrics_lock = threading.Lock()
+requests_counter = Counter()
+histograms = {
+    'duration': Histogram('pgs_request_duration_seconds', 'Duration of the requests.', duration_buckets),
+    'queries': Histogram('pgs_request_db_queries', 'Number of SQL queries per request.', queries_buckets),
+    'db_duration': Histogram('pgs_request_db_duration_seconds', 'Duration of the SQL queries per request and database.', duration_buckets),
+    'serialization': Histogram('pgs_request_serialization_seconds', 'Duration of the view and of the rendering, excluding the SQL queries (mostly serialization of the results).', duration_buckets),
+    'bytes': Histogram('pgs_response_bytes', 'Size of the responses (bytes, not streamed).', bytes_buckets)
+}
+
+# Functions returning the lines of other metrics, added to the /metrics output (e.g. in-process counters of other modules)
+collectors = []
+
+
+def register_collector(collector):
+    collectors.append(collector)
+    return collector
+
+
+@register_collector
+def export_cache_counters():
+    lines = format_counters('pgs_response_cache_total', 'Lookups of the response cache, by cache policy and status.',
+                            [((('policy', policy), ('status', status)), value) for status, counters in cache_counters.items() for policy, value in counters.items()])
+    lines += format_counters('pgs_compression_total', 'Compressed responses, by type of compression.',
+                             [((('type', name),), value) for name, value in compression_counters.items()])
+    return lines
+
+
+def export_metrics():
+    ''' Return all the metrics in the Prometheus text exposition format '''
+    with metrics_lock:
+        lines = format_counters('pgs_requests_total', 'Number of requests (including the requests not sampled).',
+                                [(labels, value) for labels, value in requests_counter.items()])
+        lines += format_counters('pgs_metrics_sample_rate', 'Proportion of the requests measured for the histograms.',
+                                 [((), settings.METRICS_SAMPLE_RATE)], 'gauge')
+        for histogram in histograms.values():
+            lines += histogram.export()
+    for collector in collectors:
+        lines += collector()
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    with metrics_lock:
+        requests_counter.clear()
+        for histogram in histograms.values():
+            histogram.values.clear()
+
+
+class QueryTimer:
+    """ Execution wrapper counting the SQL queries and their duration per database alias """
+
+    def __init__(self):
+        self.queries = Counter()
+        self.durations = Counter()
+        self.view_start = None
+        self.view_db_duration = 0
+
+    def get_wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.durations[alias] += time.perf_counter() - start
+                self.queries[alias] += 1
+        return wrapper
+
+
+class MetricsMiddleware:
+    """
+    This middleware class records metrics of the requests, by view (name of the URL pattern):
+     - number of requests, by status code and response cache status (hit/miss/none, see catalog.cache.release_cache)
+     - duration of the request, number of SQL queries and their duration for each database
+     - serialization time: duration of the view and of the rendering, without the SQL queries
+     - size of the response
+    Only a proportion of the requests (METRICS_SAMPLE_RATE) is measured, to limit the overhead.
+    The SQL queries run by the worker threads (see rest_api.concurrency) or while streaming a response are not counted.
+    The metrics are exposed in the Prometheus text format by the '/metrics' endpoint.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.METRICS_SAMPLE_RATE
+        if not sample_rate or random.random() >= sample_rate:
+            response = self.get_response(request)
+            self.count_request(request, response)
+            return response
+
+        timer = request._metrics_timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer.get_wrapper(alias)))
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        view = self.count_request(request, response)
+        labels = (('view', view),)
+        db_duration = sum(timer.durations.values())
+        with metrics_lock:
+            histograms['duration'].observe(labels, end - start)
+            histograms['queries'].observe(labels, sum(timer.queries.values()))
+            for alias in connections:
+                histograms['db_duration'].observe(labels + (('database', alias),), timer.durations[alias])
+            if timer.view_start is not None:
+                histograms['serialization'].observe(labels, max(0, end - timer.view_start - (db_duration - timer.view_db_duration)))
+            if not response.streaming:
+                histograms['bytes'].observe(labels, len(response.content))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = getattr(request, '_metrics_timer', None)
+        if timer:
+            timer.view_start = time.perf_counter()
+            timer.view_db_duration = sum(timer.durations.values())
+
+    def count_request(self, request, response):
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        labels = (('view', view), ('status', str(response.status_code)), ('cache', getattr(request, 'cache_status', 'none')))
+        with metrics_lock:
+            requests_counter[labels] += 1
+        return view
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import re
+from calendar import timegm
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from catalog.current_release import get_current_release_date
+
+
+class ReleaseETagMiddleware:
+    """
+    This middleware class adds an ETag and a Last-Modified header, derived from the current release, to the responses
+    of the pages listed in RELEASE_ETAG_PATHS, as the public data only change at release time.
+    The conditional requests (If-None-Match/If-Modified-Since) matching the current release receive a 304 response
+    without calling the view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = [re.compile(path) for path in settings.RELEASE_ETAG_PATHS]
+        # Change the ETags when a new version of the website is deployed
+        self.version = os.environ.get('GAE_VERSION', '')
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not any(path.match(request.path) for path in self.paths):
+            return self.get_response(request)
+
+        release_date = get_current_release_date()
+        if not release_date:
+            return self.get_response(request)
+
+        etag = self.get_etag(request, release_date)
+        last_modified = timegm(release_date.timetuple())
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Keep the CSP header (and nonce) of the cached page
+            response._csp_exempt = True
+            return response
+
+        response = self.get_response(request)
+        if response.status_code == 200 and not response.has_header('ETag'):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_etag(self, request, release_date):
+        key = '|'.join([
+            self.version,
+            release_date.isoformat(),
+            request.path,
+            request.META.get('QUERY_STRING', ''),
+            request.META.get('HTTP_ACCEPT', '')
+        ])
+        return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # Weak comparison, as the ETag can be weakened by the compression of the response
+            etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+            return etag in etags or '*' in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_release_efotrait_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortAssociation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('association_type', models.CharField(choices=[('development', 'Score development (GWAS and training samples)'), ('evaluation', 'Score evaluation (Performance samples)')], max_length=20, verbose_name='Association type')),
+                ('cohort', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='associations', to='catalog.cohort', verbose_name='Cohort')),
+                ('score', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_associations', to='catalog.score', verbose_name='Polygenic Score (PGS)')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cohort', 'association_type', 'score'), name='unique_cohort_association')],
+            },
+        ),
+        # Initial content of the associations table (rebuilt after each import and release afterwards, see CohortAssociation.update_associations)
+        migrations.RunSQL(
+            "INSERT INTO catalog_cohortassociation (cohort_id, score_id, association_type) "
+            "SELECT sc.cohort_id, ss.score_id, 'development' FROM catalog_sample_cohorts sc INNER JOIN catalog_score_samples_variants ss ON ss.sample_id = sc.sample_id "
+            "UNION SELECT sc.cohort_id, ss.score_id, 'development' FROM catalog_sample_cohorts sc INNER JOIN catalog_score_samples_training ss ON ss.sample_id = sc.sample_id "
+            "UNION SELECT sc.cohort_id, p.score_id, 'evaluation' FROM catalog_sample_cohorts sc "
+            "INNER JOIN catalog_sampleset_samples pss ON pss.sample_id = sc.sample_id "
+            "INNER JOIN catalog_performance p ON p.sampleset_id = pss.sampleset_id",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_cohortassociation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GwasScoreAssociation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gcst_id', models.CharField(db_index=True, max_length=20, verbose_name='GWAS Catalog Study ID (GCST...)')),
+                ('score', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gwas_associations', to='catalog.score', verbose_name='Polygenic Score (PGS)')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('gcst_id', 'score'), name='unique_gwas_score_association')],
+            },
+        ),
+        # Initial content of the associations table (rebuilt after each import and release afterwards, see GwasScoreAssociation.update_associations)
+        migrations.RunSQL(
+            "INSERT INTO catalog_gwasscoreassociation (gcst_id, score_id) "
+            "SELECT DISTINCT s.\"source_GWAS_catalog\", ss.score_id FROM catalog_sample s INNER JOIN catalog_score_samples_variants ss ON ss.sample_id = s.id "
+            "WHERE s.\"source_GWAS_catalog\" IS NOT NULL AND s.\"source_GWAS_catalog\" != ''",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:17
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Trigram indexes for the case insensitive substring searches ('icontains' lookups, i.e. UPPER(...) LIKE UPPER(...)).
+# Only created if the extension 'pg_trgm' is available on the database server.
+trigram_columns = ('label', 'synonyms', 'mapped_terms')
+
+create_trigram_indexes = '''
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        %s
+    END IF;
+END
+$$;
+''' % '\n        '.join(
+    f'CREATE INDEX IF NOT EXISTS efotrait_ontology_{column}_trgm ON catalog_efotrait_ontology USING gin ((UPPER({column}::text)) gin_trgm_ops);'
+    for column in trigram_columns
+)
+
+drop_trigram_indexes = ' '.join(f'DROP INDEX IF EXISTS efotrait_ontology_{column}_trgm;' for column in trigram_columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_gwasscoreassociation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='efotrait_ontology',
+            name='mapped_terms_array',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('mapped_terms'), models.Value(' | '), function='string_to_array', output_field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)), output_field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+        ),
+        migrations.AddField(
+            model_name='efotrait_ontology',
+            name='synonyms_array',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('synonyms'), models.Value(' | '), function='string_to_array', output_field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)), output_field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+        ),
+        migrations.AddIndex(
+            model_name='efotrait_ontology',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['synonyms_array'], name='efotrait_ontology_synonyms'),
+        ),
+        migrations.AddIndex(
+            model_name='efotrait_ontology',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['mapped_terms_array'], name='efotrait_ontology_mapped'),
+        ),
+        migrations.RunSQL(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_efotrait_ontology_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='release',
+            name='total_cohort_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of Cohorts'),
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='total_efotrait_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of EFO traits'),
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='total_performance_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of PGS Performance metrics'),
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='total_publication_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of PGS Publications'),
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='total_sampleset_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of PGS Sample Sets'),
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='total_score_count',
+            field=models.IntegerField(null=True, verbose_name='Total number of PGS scores'),
+        ),
+    ]
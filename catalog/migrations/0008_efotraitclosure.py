@@ -0,0 +1,37 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_release_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EFOTraitClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='Distance between the traits')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='catalog.efotrait_ontology', verbose_name='Ancestor trait')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='catalog.efotrait_ontology', verbose_name='Descendant trait')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='efotrait_closure_descendant')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_efotrait_closure')],
+            },
+        ),
+        # Initial content of the closure table (rebuilt at each release afterwards, see EFOTraitClosure.update_closure)
+        migrations.RunSQL(
+            "WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS ("
+            "SELECT id, id, 0 FROM catalog_efotrait_ontology "
+            "UNION SELECT c.ancestor_id, r.to_efotrait_ontology_id, c.depth + 1 FROM closure c "
+            "INNER JOIN catalog_efotrait_ontology_child_traits r ON r.from_efotrait_ontology_id = c.descendant_id WHERE c.depth < 100) "
+            "INSERT INTO catalog_efotraitclosure (ancestor_id, descendant_id, depth) "
+            "SELECT ancestor_id, descendant_id, MIN(depth) FROM closure GROUP BY ancestor_id, descendant_id",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
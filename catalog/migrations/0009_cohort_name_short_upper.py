@@ -0,0 +1,18 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:55
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_efotraitclosure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cohort',
+            index=models.Index(django.db.models.functions.text.Upper('name_short'), name='cohort_name_short_upper'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:58
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_cohort_name_short_upper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='ancestry_keys',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ancestry_keys'], name='score_ancestry_keys'),
+        ),
+        # Keys of the existing ancestry distributions (see Score.get_ancestry_keys)
+        migrations.RunSQL(
+            "UPDATE catalog_score SET ancestry_keys = ARRAY("
+            "SELECT s.key FROM jsonb_each(ancestries) s "
+            "UNION ALL SELECT s.key || ':dist:' || d.key FROM jsonb_each(ancestries) s, "
+            "jsonb_each(CASE WHEN jsonb_typeof(s.value -> 'dist') = 'object' THEN s.value -> 'dist' ELSE '{}'::jsonb END) d "
+            "UNION ALL SELECT s.key || ':multi' FROM jsonb_each(ancestries) s "
+            "WHERE jsonb_typeof(s.value) = 'object' AND s.value ?| ARRAY['multi','dist_count']) "
+            "WHERE jsonb_typeof(ancestries) = 'object'",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -1,7 +1,10 @@
 import datetime as dt
-from django.db import models
+from django.db import models, connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Upper
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.contrib.postgres.fields import DecimalRangeField
+from django.contrib.postgres.fields import ArrayField, DecimalRangeField
+from django.contrib.postgres.indexes import GinIndex
 from pgs_web import constants
 from catalog import common
 from core.services.ols_rest_client import OLSRestClient
@@ -132,38 +135,146 @@ class Cohort(models.Model):
     # Used to identify cohorts with associated released scores
     released = models.BooleanField('Associated with released Score(s)', default=False)
 
+    class Meta:
+        indexes = [
+            # Case insensitive lookups of the short names ('iexact' or filter_by_names)
+            models.Index(Upper('name_short'), name='cohort_name_short_upper')
+        ]
+
     def __str__(self):
         return self.name_short
 
 
+    @classmethod
+    def filter_by_names(cls, names, queryset=None):
+        """
+        Filter the cohorts matching one of the short names (exact match, case insensitive), with a single
+        lookup on the indexed 'upper(name_short)'. The names are compared literally (no pattern).
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.alias(name_short_upper=Upper('name_short')).filter(name_short_upper__in=[Upper(Value(name)) for name in names])
+
+
     @property
     def associated_pgs_ids(self):
+        """
+        Fetch the associated PGS IDs from the CohortAssociation table, filled by its migration and rebuilt after each
+        import and release (a cohort without entries in the table has no associated PGS).
+        """
+        associations = self.associations.all()
+        if 'associations' not in getattr(self, '_prefetched_objects_cache', {}):
+            associations = associations.select_related('score').only('cohort_id', 'association_type', 'score__id')
+        associated_pgs_ids = { CohortAssociation.DEVELOPMENT: set(), CohortAssociation.EVALUATION: set() }
+        for association in associations:
+            associated_pgs_ids[association.association_type].add(association.score.id)
+        return { association_type: sorted(pgs_ids) for association_type, pgs_ids in associated_pgs_ids.items() }
+
+
+class CohortAssociation(models.Model):
+    """Class to store the (denormalized) associations between cohorts and PGS, via the samples used to develop or evaluate the scores"""
+    DEVELOPMENT = 'development'
+    EVALUATION = 'evaluation'
+    ASSOCIATION_TYPE_CHOICES = [
+        (DEVELOPMENT, 'Score development (GWAS and training samples)'),
+        (EVALUATION, 'Score evaluation (Performance samples)')
+    ]
+    cohort = models.ForeignKey(Cohort, on_delete=models.CASCADE, related_name='associations', verbose_name='Cohort')
+    score = models.ForeignKey('Score', on_delete=models.CASCADE, related_name='cohort_associations', verbose_name='Polygenic Score (PGS)')
+    association_type = models.CharField('Association type', max_length=20, choices=ASSOCIATION_TYPE_CHOICES)
 
-        list_dev_associated_pgs_ids  = set()
-        list_eval_associated_pgs_ids = set()
-        sample_ids_list = set()
-        pss_ids_list = set()
-
-        for sample in self.sample_set.all():
-            if sample.id in sample_ids_list:
-                continue
-            for pgs_id in sample.associated_PGS():
-                if pgs_id == '':
-                    continue
-                list_dev_associated_pgs_ids.add(pgs_id)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cohort', 'association_type', 'score'], name='unique_cohort_association')
+        ]
 
-            for pss_id in sample.associated_PSS():
-                pss_ids_list.add(pss_id)
+    def __str__(self):
+        return f'{self.cohort_id} | {self.score_id} ({self.association_type})'
+
+    @classmethod
+    def update_associations(cls, cohort_ids=None):
+        """
+        Rebuild the associations (all of them or only for the given list of cohort IDs) with set-based SQL queries.
+        Returns the number of associations stored.
+        """
+        table = cls._meta.db_table
+        sample_cohorts = Sample.cohorts.through._meta.db_table
+        score_samples = [Score.samples_variants.through._meta.db_table, Score.samples_training.through._meta.db_table]
+        sampleset_samples = SampleSet.samples.through._meta.db_table
+        performance = Performance._meta.db_table
+
+        cohort_condition = ''
+        params = []
+        if cohort_ids is not None:
+            cohort_ids = list(cohort_ids)
+            if not cohort_ids:
+                return 0
+            cohort_condition = 'WHERE sc.cohort_id = ANY(%s)'
+            params = [cohort_ids]
+
+        development_queries = [
+            f"SELECT sc.cohort_id, ss.score_id, '{cls.DEVELOPMENT}' FROM {sample_cohorts} sc INNER JOIN {score_sample} ss ON ss.sample_id = sc.sample_id {cohort_condition}"
+            for score_sample in score_samples
+        ]
+        evaluation_query = (
+            f"SELECT sc.cohort_id, p.score_id, '{cls.EVALUATION}' FROM {sample_cohorts} sc "
+            f"INNER JOIN {sampleset_samples} pss ON pss.sample_id = sc.sample_id "
+            f"INNER JOIN {performance} p ON p.sampleset_id = pss.sampleset_id {cohort_condition}"
+        )
+        with transaction.atomic():
+            if cohort_ids is None:
+                cls.objects.all().delete()
+            else:
+                cls.objects.filter(cohort_id__in=cohort_ids).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (cohort_id, score_id, association_type) {' UNION '.join([*development_queries, evaluation_query])}",
+                    params * 3
+                )
+                return cursor.rowcount
 
-            sample_ids_list.add(sample.id)
 
-        # Development association
-        list_dev_associated_pgs_ids = sorted(list_dev_associated_pgs_ids)
+class GwasScoreAssociation(models.Model):
+    """Class to store the (denormalized) associations between the GWAS Catalog studies (GCST) and the PGS using them as source of variant associations"""
+    gcst_id = models.CharField('GWAS Catalog Study ID (GCST...)', max_length=20, db_index=True)
+    score = models.ForeignKey('Score', on_delete=models.CASCADE, related_name='gwas_associations', verbose_name='Polygenic Score (PGS)')
 
-        # Evaluation association
-        list_eval_associated_pgs_ids = Performance.objects.select_related('score').values_list('score__id', flat=True).filter(sampleset__id__in=list(pss_ids_list)).distinct().order_by('score__id')
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gcst_id', 'score'], name='unique_gwas_score_association')
+        ]
 
-        return { 'development': list_dev_associated_pgs_ids, 'evaluation': list(list_eval_associated_pgs_ids)}
+    def __str__(self):
+        return f'{self.gcst_id} | {self.score_id}'
+
+    @classmethod
+    def update_associations(cls):
+        """ Rebuild all the associations with a set-based SQL query. Returns the number of associations stored. """
+        table = cls._meta.db_table
+        sample = Sample._meta.db_table
+        score_samples = Score.samples_variants.through._meta.db_table
+        with transaction.atomic():
+            cls.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (gcst_id, score_id) "
+                    f"SELECT DISTINCT s.\"source_GWAS_catalog\", ss.score_id FROM {sample} s INNER JOIN {score_samples} ss ON ss.sample_id = s.id "
+                    f"WHERE s.\"source_GWAS_catalog\" IS NOT NULL AND s.\"source_GWAS_catalog\" != ''"
+                )
+                return cursor.rowcount
+
+    @classmethod
+    def get_score_ids(cls, gcst_ids):
+        """
+        Return the sorted list of PGS IDs associated with each of the given GCST IDs (dictionary), in one query on the table.
+        The table is filled by its migration and rebuilt after each import and release (see update_associations):
+        the GCST IDs not in the table have no PGS.
+        """
+        score_ids = { gcst_id: set() for gcst_id in gcst_ids }
+        associations = cls.objects.filter(gcst_id__in=score_ids.keys()).values_list('gcst_id', 'score__id')
+        for gcst_id, score_id in associations:
+            score_ids[gcst_id].add(score_id)
+        return { gcst_id: sorted(ids) for gcst_id, ids in score_ids.items() }
 
 
 class EFOTrait_Base(models.Model):
@@ -626,6 +737,8 @@ class Score(models.Model):
 
     # Ancestry data
     ancestries = models.JSONField('Ancestry distributions', null=True)
+    # Keys of the ancestry distributions, used by the ancestry filters of the browse page (see get_ancestry_keys)
+    ancestry_keys = ArrayField(models.CharField(max_length=50), default=list, blank=True)
 
     # Weight type
     weight_type = models.TextField('PGS Weight Type', default='NR')
@@ -641,6 +754,25 @@ class Score(models.Model):
 
     class Meta:
         get_latest_by = 'num'
+        indexes = [
+            GinIndex(fields=['ancestry_keys'], name='score_ancestry_keys'),
+        ]
+
+    @staticmethod
+    def get_ancestry_keys(ancestries):
+        '''
+        List of keys of the ancestry distributions (Score.ancestries), stored in the indexed array 'ancestry_keys':
+        the study stages (e.g. 'gwas'), the ancestries of each stage (e.g. 'gwas:dist:EUR') and
+        the stages with multi-ancestry data (e.g. 'gwas:multi').
+        '''
+        keys = []
+        for stage, stage_data in (ancestries or {}).items():
+            keys.append(stage)
+            if isinstance(stage_data, dict):
+                keys += [f'{stage}:dist:{anc}' for anc in stage_data.get('dist') or {}]
+                if 'multi' in stage_data or 'dist_count' in stage_data:
+                    keys.append(f'{stage}:multi')
+        return keys
 
     # Score file FTP addresses
     @property
@@ -1051,6 +1183,24 @@ class EFOTrait_Ontology(EFOTrait_Base):
 
     child_traits = models.ManyToManyField('self', verbose_name='Child traits', symmetrical=False, related_name='parent_traits')
 
+    # Synonyms and mapped terms as arrays (generated by the database), for the indexed exact term searches
+    synonyms_array = models.GeneratedField(
+        expression=models.Func(models.F('synonyms'), models.Value(' | '), function='string_to_array', output_field=ArrayField(models.TextField())),
+        output_field=ArrayField(models.TextField()),
+        db_persist=True
+    )
+    mapped_terms_array = models.GeneratedField(
+        expression=models.Func(models.F('mapped_terms'), models.Value(' | '), function='string_to_array', output_field=ArrayField(models.TextField())),
+        output_field=ArrayField(models.TextField()),
+        db_persist=True
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['synonyms_array'], name='efotrait_ontology_synonyms'),
+            GinIndex(fields=['mapped_terms_array'], name='efotrait_ontology_mapped'),
+        ]
+
     @property
     def associated_pgs_ids(self):
         # Using 'all' and filter afterward uses less SQL queries than a direct distinct()
@@ -1075,6 +1225,112 @@ class EFOTrait_Ontology(EFOTrait_Base):
         else:
             return []
 
+    def get_descendants(self):
+        ''' Descendant traits (children, grandchildren, ...) in the ontology, from the closure table (see EFOTraitClosure) '''
+        return EFOTrait_Ontology.objects.filter(ancestor_links__ancestor=self, ancestor_links__depth__gt=0)
+
+    def get_ancestors(self):
+        ''' Ancestor traits (parents, grandparents, ...) in the ontology, from the closure table (see EFOTraitClosure) '''
+        return EFOTrait_Ontology.objects.filter(descendant_links__descendant=self, descendant_links__depth__gt=0)
+
+    def get_scores(self, include_self=True, include_children=True):
+        '''
+        Scores mapped to the trait and/or to its descendant traits, as a single semi-join
+        between the trait/score associations and the closure table (no duplicates, no 'distinct()').
+        The scores mapped to the trait itself don't depend on the closure table.
+        '''
+        trait_filter = models.Q(pk__in=[])
+        # Direct associations (not depending on the closure table being up to date)
+        if include_self:
+            trait_filter |= models.Q(efotrait_id=self.id)
+        if include_children:
+            trait_filter |= models.Q(efotrait_id__in=EFOTraitClosure.objects.filter(ancestor=self, depth__gt=0).values('descendant_id'))
+        score_traits = Score.trait_efo.through.objects.filter(trait_filter)
+        return Score.objects.filter(num__in=score_traits.values('score_id'))
+
+
+class EFOTraitClosure(models.Model):
+    """
+    Transitive closure of the EFOTrait_Ontology parent/child relations: one row per (ancestor, descendant) pair,
+    with the length of the shortest path between them (depth), including the trait itself (depth 0).
+    Rebuilt at release time from the direct relations (see release/scripts/UpdateEFO.py).
+    """
+    ancestor = models.ForeignKey(EFOTrait_Ontology, on_delete=models.CASCADE, related_name='descendant_links', verbose_name='Ancestor trait')
+    descendant = models.ForeignKey(EFOTrait_Ontology, on_delete=models.CASCADE, related_name='ancestor_links', verbose_name='Descendant trait')
+    depth = models.PositiveSmallIntegerField('Distance between the traits')
+
+    # Maximum length of the paths followed (protection against cycles in the relations)
+    max_depth = 100
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_efotrait_closure')
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='efotrait_closure_descendant')
+        ]
+
+    def __str__(self):
+        return f'{self.ancestor_id} > {self.descendant_id} ({self.depth})'
+
+    @classmethod
+    def update_closure(cls):
+        """ Rebuild the closure table from the direct parent/child relations with a recursive SQL query. Returns the number of rows stored. """
+        table = cls._meta.db_table
+        traits = EFOTrait_Ontology._meta.db_table
+        relations = EFOTrait_Ontology.child_traits.through._meta.db_table
+        with transaction.atomic():
+            cls.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS ("
+                    f"SELECT id, id, 0 FROM {traits} "
+                    f"UNION SELECT c.ancestor_id, r.to_efotrait_ontology_id, c.depth + 1 FROM closure c "
+                    f"INNER JOIN {relations} r ON r.from_efotrait_ontology_id = c.descendant_id WHERE c.depth < %s) "
+                    f"INSERT INTO {table} (ancestor_id, descendant_id, depth) "
+                    f"SELECT ancestor_id, descendant_id, MIN(depth) FROM closure GROUP BY ancestor_id, descendant_id",
+                    [cls.max_depth]
+                )
+                return cursor.rowcount
+
+    @classmethod
+    def check_integrity(cls):
+        """
+        Validate the closure table against the direct parent/child relations. Returns the list of errors (empty if valid):
+         - each trait is its own descendant (depth 0), and only itself
+         - each direct relation is in the closure, with a depth of 1
+         - the closure is transitive, with the shortest depths: the descendants of a descendant are descendants
+         - each pair of depth n > 0 comes from a pair of depth n-1 extended by a direct relation
+        """
+        table = cls._meta.db_table
+        traits = EFOTrait_Ontology._meta.db_table
+        relations = EFOTrait_Ontology.child_traits.through._meta.db_table
+        checks = {
+            'traits without their own closure row (depth 0)':
+                f"SELECT COUNT(*) FROM {traits} t LEFT JOIN {table} c ON c.ancestor_id = t.id AND c.descendant_id = t.id AND c.depth = 0 WHERE c.id IS NULL",
+            'closure rows of depth 0 between different traits':
+                f"SELECT COUNT(*) FROM {table} WHERE depth = 0 AND ancestor_id != descendant_id",
+            'direct relations missing from the closure (or with a depth other than 1)':
+                f"SELECT COUNT(*) FROM {relations} r LEFT JOIN {table} c ON c.ancestor_id = r.from_efotrait_ontology_id AND c.descendant_id = r.to_efotrait_ontology_id "
+                f"WHERE r.from_efotrait_ontology_id != r.to_efotrait_ontology_id AND (c.id IS NULL OR c.depth != 1)",
+            'missing transitive pairs (or with a depth too high)':
+                f"SELECT COUNT(*) FROM {table} c1 INNER JOIN {relations} r ON r.from_efotrait_ontology_id = c1.descendant_id "
+                f"LEFT JOIN {table} c2 ON c2.ancestor_id = c1.ancestor_id AND c2.descendant_id = r.to_efotrait_ontology_id "
+                f"WHERE c1.depth < %s AND (c2.id IS NULL OR c2.depth > c1.depth + 1)",
+            'closure rows not supported by the direct relations':
+                f"SELECT COUNT(*) FROM {table} c WHERE c.depth > 0 AND NOT EXISTS ("
+                f"SELECT 1 FROM {relations} r INNER JOIN {table} p ON p.descendant_id = r.from_efotrait_ontology_id "
+                f"WHERE r.to_efotrait_ontology_id = c.descendant_id AND p.ancestor_id = c.ancestor_id AND p.depth = c.depth - 1)"
+        }
+        errors = []
+        with connection.cursor() as cursor:
+            for label, query in checks.items():
+                cursor.execute(query, [cls.max_depth] if '%s' in query else [])
+                count = cursor.fetchone()[0]
+                if count:
+                    errors.append(f'{count} {label}')
+        return errors
+
 
 class TraitCategory(models.Model):
     """ Class to hold information about Trait category, as defined by the GWAS Catalog, to structure the numerous traits in broad groups."""
@@ -1103,6 +1359,14 @@ class TraitCategory(models.Model):
 
         return scores_count
 
+    def get_scores(self):
+        ''' Scores mapped to the traits of the category or to their descendant traits (see EFOTraitClosure) '''
+        closure = EFOTraitClosure.objects.filter(ancestor__traitcategory=self, depth__gt=0)
+        score_traits = Score.trait_efo.through.objects.filter(
+            models.Q(efotrait_id__in=self.efotraits_ontology.values('id')) | models.Q(efotrait_id__in=closure.values('descendant_id'))
+        )
+        return Score.objects.filter(num__in=score_traits.values('score_id'))
+
 
 class EmbargoedPublication(models.Model):
     """Class to store the list of embargoed Publications"""
@@ -1141,9 +1405,42 @@ class Release(models.Model):
     updated_performance_count = models.IntegerField('Number of PGS Performance metrics updated', default=0)
     updated_publication_count = models.IntegerField('Number of PGS Publication updated', default=0)
 
+    # Statistics snapshot of the catalog at the release (total numbers of entries), computed by the release post-processing
+    total_score_count = models.IntegerField('Total number of PGS scores', null=True)
+    total_publication_count = models.IntegerField('Total number of PGS Publications', null=True)
+    total_efotrait_count = models.IntegerField('Total number of EFO traits', null=True)
+    total_performance_count = models.IntegerField('Total number of PGS Performance metrics', null=True)
+    total_sampleset_count = models.IntegerField('Total number of PGS Sample Sets', null=True)
+    total_cohort_count = models.IntegerField('Total number of Cohorts', null=True)
+
+    statistics_fields = ('total_score_count', 'total_publication_count', 'total_efotrait_count',
+                         'total_performance_count', 'total_sampleset_count', 'total_cohort_count')
+
     def __str__(self):
         return str(self.date)
 
+    @classmethod
+    def compute_statistics(cls):
+        """ Count the entries of the catalog (total numbers), with the same keys as the statistics snapshot fields """
+        return {
+            'total_score_count': Score.objects.count(),
+            'total_publication_count': Publication.objects.count(),
+            'total_efotrait_count': EFOTrait.objects.count(),
+            'total_performance_count': Performance.objects.count(),
+            'total_sampleset_count': SampleSet.objects.count(),
+            'total_cohort_count': Cohort.objects.count()
+        }
+
+    def update_statistics(self):
+        """ Store the statistics snapshot of the catalog in the release """
+        for field, count in self.compute_statistics().items():
+            setattr(self, field, count)
+        self.save()
+
+    @property
+    def has_statistics(self):
+        return self.total_score_count is not None
+
     @property
     def released_score_ids(self):
         scores = Score.objects.values_list('id', flat=True).filter(date_released__exact=self.date).order_by('id')
@@ -0,0 +1,139 @@
+from datetime import date
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import override_settings
+
+from catalog.cache.release_cache import cache_counters
+from catalog.current_release import reset_current_release_date, get_release_statistics, reset_release_statistics
+from catalog.models import Release, Score
+from core.testing import CurationTestCase
+
+try:
+    import lupa
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+cache_policies = {policy: {**values, 'timeout': 60} for policy, values in settings.CACHE_POLICIES.items()}
+
+
+@override_settings(CACHE_POLICIES=cache_policies)
+class ReleaseCacheTest(CurationTestCase):
+    """ Test the response cache, namespaced by release """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        caches['responses'].clear()
+        reset_current_release_date()
+
+    def tearDown(self):
+        caches['responses'].clear()
+        reset_current_release_date()
+
+    def check_cache(self, url):
+        ''' Send the same request twice: the second response comes from the cache '''
+        hits = cache_counters['hit']['rest_list']
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url)
+        self.assertEqual(cache_counters['hit']['rest_list'], hits + 1)
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_cache_hit(self):
+        self.check_cache('/rest/score/all')
+
+    def test_new_release(self):
+        url = '/rest/score/all'
+        self.client.get(url)
+        Release.objects.create(date=date(2020, 3, 1))
+        reset_current_release_date()
+
+        misses = cache_counters['miss']['rest_list']
+        self.client.get(url)
+        self.assertEqual(cache_counters['miss']['rest_list'], misses + 1)
+
+    def test_request_content_not_cached(self):
+        url = '/rest/score/all'
+        self.client.get(url)
+        response = self.client.generic('GET', url, '{"filter_ids": ["PGS000002"]}', content_type='application/json')
+        self.assertEqual([x['id'] for x in response.json()['results']], ['PGS000002'])
+
+    @override_settings(CACHE_POLICIES={**cache_policies, 'rest_list': {**cache_policies['rest_list'], 'max_size': 10}})
+    def test_max_size(self):
+        url = '/rest/score/all'
+        self.client.get(url)
+        hits = cache_counters['hit']['rest_list']
+        self.client.get(url)
+        self.assertEqual(cache_counters['hit']['rest_list'], hits)
+
+    def test_remove_nonce(self):
+        cache = caches['responses']
+        key = 'views.decorators.cache.cache_page.test'
+        cache.set(key, HttpResponse('<script nonce="abc123">', content_type='text/html'))
+        self.assertEqual(cache.get(key).content, b'<script>')
+
+    @skipIf(fakeredis is None, 'fakeredis (with Lua support) is not installed')
+    def test_redis_cache(self):
+        ''' Use a Redis cache (in-memory Redis server) as shared cache '''
+        server = fakeredis.FakeServer()
+        redis_backend = {
+            'BACKEND': 'catalog.cache.remove_nonce.RemoveNonceFromRedisCacheBackend',
+            'LOCATION': 'redis://127.0.0.1:6379',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection, 'server': server}
+        }
+        redis_caches = {
+            'default': redis_backend,
+            'responses': {**redis_backend, 'KEY_FUNCTION': 'catalog.cache.release_cache.make_release_key'}
+        }
+        with override_settings(CACHES=redis_caches):
+            self.check_cache('/rest/score/all')
+            # Keys namespaced by the current release date
+            self.assertTrue(fakeredis.FakeRedis(server=server).keys('*:2020-02-12:views.decorators.cache.cache_page.rest_list*'))
+            self.test_remove_nonce()
+
+
+@override_settings(PGS_ON_CURATION_SITE=False)
+class ReleaseStatisticsTest(CurationTestCase):
+    """ Test the statistics of the current release """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        reset_release_statistics()
+
+    def tearDown(self):
+        reset_release_statistics()
+
+    def test_live_statistics(self):
+        statistics = get_release_statistics()
+        self.assertEqual(statistics['date'], date(2020, 2, 12))
+        self.assertEqual(statistics['total_score_count'], Score.objects.count())
+        # In-process value
+        with self.assertNumQueries(0):
+            self.assertEqual(get_release_statistics(), statistics)
+        response = self.client.get('/rest/info')
+        self.assertEqual(response.json()['latest_release']['scores'], Score.objects.count())
+
+    def test_release_snapshot(self):
+        release = Release.objects.latest('date')
+        release.update_statistics()
+        self.assertEqual(release.total_score_count, Score.objects.count())
+        Release.objects.filter(pk=release.pk).update(total_score_count=1000, total_efotrait_count=50)
+        with self.assertNumQueries(1):
+            statistics = get_release_statistics()
+        self.assertEqual(statistics['total_score_count'], 1000)
+        latest_release = self.client.get('/rest/info').json()['latest_release']
+        self.assertEqual((latest_release['scores'], latest_release['traits']), (1000, 50))
+        self.assertContains(self.client.get('/'), '1,000')
+
+        # Live counts on the curation site
+        reset_release_statistics()
+        with override_settings(PGS_ON_CURATION_SITE=True):
+            self.assertEqual(get_release_statistics()['total_score_count'], Score.objects.count())
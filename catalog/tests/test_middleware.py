@@ -0,0 +1,188 @@
+import gzip
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+from catalog.current_release import reset_current_release_date
+from catalog.middleware.compression import brotli, compression_counters
+from catalog.middleware.metrics import reset_metrics
+from core.testing import CurationTestCase
+
+
+etag_middleware = 'catalog.middleware.release_etag.ReleaseETagMiddleware'
+
+
+@override_settings(MIDDLEWARE=[etag_middleware, *[m for m in settings.MIDDLEWARE if m != etag_middleware]])
+class ReleaseETagMiddlewareTest(CurationTestCase):
+    """ Test the ETag/Last-Modified headers derived from the current release """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        reset_current_release_date()
+
+    def tearDown(self):
+        reset_current_release_date()
+
+    def test_etag(self):
+        url = '/rest/info'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response['Last-Modified'], 'Wed, 12 Feb 2020 00:00:00 GMT')
+
+        # Conditional request: no view and no database query
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Weak version of the ETag (e.g. compressed response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_variations(self):
+        etag = self.client.get('/rest/score/all').get('ETag')
+        self.assertNotEqual(etag, self.client.get('/rest/score/all?limit=1').get('ETag'))
+        self.assertNotEqual(etag, self.client.get('/rest/score/all', HTTP_ACCEPT='text/html').get('ETag'))
+        self.assertNotEqual(etag, self.client.get('/rest/performance/all').get('ETag'))
+
+    def test_if_modified_since(self):
+        response = self.client.get('/rest/release/current', HTTP_IF_MODIFIED_SINCE='Wed, 12 Feb 2020 00:00:00 GMT')
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/rest/release/current', HTTP_IF_MODIFIED_SINCE='Tue, 11 Feb 2020 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_excluded_pages(self):
+        response = self.client.get('/about/')
+        self.assertFalse(response.has_header('ETag'))
+        response = self.client.post('/rest/info')
+        self.assertFalse(response.has_header('ETag'))
+
+
+cache_policies = {policy: {**values, 'timeout': 60} for policy, values in settings.CACHE_POLICIES.items()}
+
+
+class CompressionMiddlewareTest(CurationTestCase):
+    """ Test the compression of the responses (gzip/brotli) """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    url = '/rest/score/all'
+
+    def setUp(self):
+        caches['responses'].clear()
+        reset_current_release_date()
+
+    def tearDown(self):
+        caches['responses'].clear()
+
+    def test_gzip(self):
+        content = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), content)
+
+        # Compression not accepted
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        content = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), content)
+
+    def test_not_compressed(self):
+        with override_settings(COMPRESSION_MIN_SIZE=10**7):
+            self.assertFalse(self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        with override_settings(COMPRESSION_CONTENT_TYPES=['text/html']):
+            self.assertFalse(self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+    def test_csrf_token_not_compressed(self):
+        # Page with a form (CSRF token)
+        response = self.client.get('/browse/scores/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_stream(self):
+        params = {'format': 'ndjson', 'stream': 1}
+        content = b''.join(self.client.get(self.url, params).streaming_content)
+        response = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), content)
+
+    @override_settings(CACHE_POLICIES=cache_policies)
+    def test_cached_response(self):
+        ''' The compressed forms of the response are stored in the cache and not computed again '''
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        precompressed = compression_counters['precompressed']
+        with patch('catalog.middleware.compression.compress') as compress:
+            cached_response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            compress.assert_not_called()
+        self.assertEqual(compression_counters['precompressed'], precompressed + 1)
+        self.assertEqual(cached_response.content, response.content)
+
+
+cache_policies = {policy: {**values, 'timeout': 60} for policy, values in settings.CACHE_POLICIES.items()}
+
+
+@override_settings(METRICS_TOKEN='metrics-token', METRICS_SAMPLE_RATE=1.0, CACHE_POLICIES=cache_policies)
+class MetricsMiddlewareTest(CurationTestCase):
+    """ Test the metrics of the requests and the /metrics endpoint """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        caches['responses'].clear()
+        reset_metrics()
+
+    def tearDown(self):
+        caches['responses'].clear()
+
+    def get_metrics(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer metrics-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_metrics(self):
+        self.client.get('/rest/score/PGS000001')
+        self.client.get('/rest/score/PGS000001')
+        metrics = self.get_metrics()
+        self.assertIn('pgs_requests_total{view="getScore",status="200",cache="miss"} 1', metrics)
+        self.assertIn('pgs_requests_total{view="getScore",status="200",cache="hit"} 1', metrics)
+        self.assertIn('pgs_request_duration_seconds_count{view="getScore"} 2', metrics)
+        self.assertIn('pgs_request_db_duration_seconds_count{view="getScore",database="default"} 2', metrics)
+        self.assertIn('pgs_request_serialization_seconds_count{view="getScore"} 2', metrics)
+        self.assertIn('pgs_response_cache_total{policy="rest_detail",status="hit"}', metrics)
+        # The first request runs SQL queries, not the cache hit
+        self.assertIn('pgs_request_db_queries_bucket{view="getScore",le="0"} 1', metrics)
+        self.assertIn('pgs_request_db_queries_bucket{view="getScore",le="+Inf"} 2', metrics)
+
+    def test_sample_rate(self):
+        with override_settings(METRICS_SAMPLE_RATE=0):
+            self.client.get('/rest/score/PGS000001')
+        metrics = self.get_metrics()
+        self.assertIn('pgs_requests_total{view="getScore",status="200",cache="miss"} 1', metrics)
+        self.assertNotIn('pgs_request_duration_seconds_count{view="getScore"}', metrics)
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong-token').status_code, 401)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer metrics-token').status_code, 404)
@@ -1,4 +1,6 @@
+from importlib import import_module
 from psycopg.types.range import NumericRange
+from django.db import connection
 
 from catalog.models import *
 from core.testing import CurationTestCase
@@ -471,6 +473,8 @@ class PerformanceTest(CurationTestCase):
         cohorttest = CohortTest()
         cohort = cohorttest.get_cohort(cohort_name,cohort_desc,cohort_others)
         sampleset.samples.all()[0].cohorts.add(cohort)
+        # Associations from the CohortAssociation table, rebuilt after each import and release
+        self.assertEqual(CohortAssociation.update_associations([cohort.id]), 1)
         self.assertEqual(cohort.associated_pgs_ids, { 'development': [], 'evaluation': [performance.score.id] })
 
         id = 2000
@@ -960,7 +964,18 @@ class ScoreTest(CurationTestCase):
         cohorttest = CohortTest()
         cohort = cohorttest.get_cohort(cohort_name, cohort_desc, cohort_others)
         sample_t.cohorts.add(cohort)
+        # Associations from the CohortAssociation table (GWAS sample not linked to the cohort)
+        sample_v.cohorts.add(Cohort.objects.create(name_short='Other cohort', name_full='Other cohort'))
+        self.assertEqual(CohortAssociation.update_associations(), 2)
+        self.assertEqual(cohort.associations.count(), 1)
         self.assertEqual(cohort.associated_pgs_ids, { 'development': [score.id], 'evaluation': [] })
+        # Same associations filled by the migration creating the table
+        associations = set(CohortAssociation.objects.values_list('cohort_id', 'score_id', 'association_type'))
+        CohortAssociation.objects.all().delete()
+        migration = import_module('catalog.migrations.0004_cohortassociation').Migration
+        with connection.cursor() as cursor:
+            cursor.execute(migration.operations[-1].sql)
+        self.assertEqual(set(CohortAssociation.objects.values_list('cohort_id', 'score_id', 'association_type')), associations)
 
         # Score 2
         score_2 = self.get_score(default_num+1)
@@ -1084,6 +1099,71 @@ class EFOTrait_OntologyTest(CurationTestCase):
         self.assertRegex(efo_trait_1.display_child_traits_list[0], display_child)
 
 
+    def test_efo_trait_closure(self):
+        # Relations: trait_1 > trait_2 > trait_3, with a shortcut trait_1 > trait_3
+        trait_1 = self.create_efo_trait_ontology(efo_id='EFO_0000311', label='cancer', desc='', syn=None, terms=None)
+        trait_2 = self.create_efo_trait_ontology(efo_id='MONDO_0007254', label='breast cancer', desc='', syn=None, terms=None)
+        trait_3 = self.create_efo_trait_ontology(efo_id='EFO_1000649', label='estrogen-receptor positive breast cancer', desc='', syn=None, terms=None)
+        trait_1.child_traits.add(trait_2, trait_3)
+        trait_2.child_traits.add(trait_3)
+
+        self.assertEqual(EFOTraitClosure.update_closure(), 6)
+        depths = { (row.ancestor_id, row.descendant_id): row.depth for row in EFOTraitClosure.objects.all() }
+        self.assertEqual(depths[(trait_1.id, trait_1.id)], 0)
+        self.assertEqual(depths[(trait_1.id, trait_3.id)], 1)
+        self.assertEqual(depths[(trait_2.id, trait_3.id)], 1)
+        self.assertNotIn((trait_3.id, trait_1.id), depths)
+        self.assertEqual(set(trait_1.get_descendants()), {trait_2, trait_3})
+        self.assertEqual(set(trait_3.get_ancestors()), {trait_1, trait_2})
+        self.assertEqual(EFOTraitClosure.check_integrity(), [])
+
+        # Scores mapped to the traits (the EFOTrait entries of the ontology traits)
+        scoretest = ScoreTest()
+        efotraittest = EFOTraitTest()
+        score_1 = scoretest.get_score(default_num)
+        score_2 = scoretest.get_score(default_num+1)
+        score_1.trait_efo.add(efotraittest.get_efo_trait(trait_1.id, trait_1.label, ''))
+        score_2.trait_efo.add(efotraittest.get_efo_trait(trait_3.id, trait_3.label, ''), efotraittest.get_efo_trait(trait_2.id, trait_2.label, ''))
+        self.assertEqual(list(trait_1.get_scores().order_by('num')), [score_1, score_2])
+        self.assertEqual(list(trait_1.get_scores(include_children=False)), [score_1])
+        self.assertEqual(list(trait_1.get_scores(include_self=False)), [score_2])
+        self.assertEqual(list(trait_3.get_scores()), [score_2])
+
+        # Category roll-up
+        trait_category = TraitCategory.objects.create(label='Cancer', colour='#BC80BD', parent='neoplasm')
+        trait_category.efotraits_ontology.add(trait_2)
+        self.assertEqual(list(trait_category.get_scores()), [score_2])
+
+        # Integrity check: new relation not in the closure, wrong depth, closure row without relation
+        trait_3.child_traits.add(trait_2)
+        EFOTraitClosure.objects.filter(ancestor=trait_1, descendant=trait_2).update(depth=2)
+        EFOTraitClosure.objects.create(ancestor=trait_3, descendant=trait_1, depth=1)
+        self.assertEqual(EFOTraitClosure.check_integrity(), [
+            '2 direct relations missing from the closure (or with a depth other than 1)',
+            '3 missing transitive pairs (or with a depth too high)',
+            '1 closure rows not supported by the direct relations'
+        ])
+        # Cycle (trait_2 <> trait_3): the paths are bounded by 'max_depth'
+        EFOTraitClosure.update_closure()
+        self.assertEqual(EFOTraitClosure.check_integrity(), [])
+        self.assertEqual(set(trait_3.get_descendants()), {trait_2})
+
+    def test_efo_trait_scores_without_closure(self):
+        # Closure table not built yet: the scores mapped directly to the traits are still returned
+        trait_1 = self.create_efo_trait_ontology(efo_id='EFO_0000311', label='cancer', desc='', syn=None, terms=None)
+        trait_2 = self.create_efo_trait_ontology(efo_id='MONDO_0007254', label='breast cancer', desc='', syn=None, terms=None)
+        trait_1.child_traits.add(trait_2)
+        score = ScoreTest().get_score(default_num)
+        score.trait_efo.add(EFOTraitTest().get_efo_trait(trait_2.id, trait_2.label, ''))
+        self.assertFalse(EFOTraitClosure.objects.exists())
+        self.assertEqual(list(trait_2.get_scores()), [score])
+        self.assertEqual(list(trait_2.get_scores(include_children=False)), [score])
+        self.assertEqual(list(trait_1.get_scores()), [])
+        trait_category = TraitCategory.objects.create(label='Cancer', colour='#BC80BD', parent='neoplasm')
+        trait_category.efotraits_ontology.add(trait_2)
+        self.assertEqual(list(trait_category.get_scores()), [score])
+
+
 class EmbargoedPublicationTest(CurationTestCase):
     def create_embargoed_publication(self, publication_id, author_name, publication_title):
         return EmbargoedPublication.objects.create(id=publication_id, firstauthor=author_name, title=publication_title)
@@ -1,3 +1,5 @@
+from importlib import import_module
+from django.db import connection
 from django.test import TestCase
 from catalog.views import *
 from catalog.models import *
@@ -56,3 +58,69 @@ class EFOTraitDataTest(CurationTestCase):
         self.assertEqual(len(data),2)
         self.assertTrue(len(data[0]) > 0)
         self.assertTrue(len(data[1]) > 0)
+
+
+class ScoreAncestryJSONLookups:
+    ''' Previous lookups of the ancestry filters, on the JSON field Score.ancestries '''
+    @staticmethod
+    def has_stage(step):
+        return Q(ancestries__has_key=step)
+
+    @staticmethod
+    def has_ancestry(step, anc):
+        return Q(**{f'ancestries__{step}__dist__{anc}__isnull':False})
+
+    @staticmethod
+    def has_multi(step):
+        return Q(**{f'ancestries__{step}__has_any_keys':['multi','dist_count']})
+
+
+class ScoreAncestryFilterTest(CurationTestCase):
+    """ Test the ancestry filters of the Score browse page """
+
+    ancestries = [
+        None,
+        {},
+        {'gwas': {'dist': {'EUR': 100}, 'count': 1000}},
+        {'gwas': {'dist': {'EUR': 40.3, 'MAE': 53.3, 'SAS': 6.4}, 'count': 365042, 'multi': ['MAE_EUR', 'MAE_SAS']},
+         'dev': {'dist': {'EUR': 100}, 'count': 1},
+         'eval': {'dist': {'AFR': 16.7, 'AMR': 16.7, 'EUR': 58.3, 'MAE': 8.3}, 'count': 12}},
+        {'dev': {'dist': {'EAS': 100}, 'count': 500}},
+        {'gwas': {'dist': {'AFR': 50, 'EAS': 50}, 'count': 20}, 'eval': {'dist': {'AFR': 100}, 'count': 1}},
+        {'gwas': {'dist': {'MAO': 100}, 'count': 20, 'multi': ['MAO_AFR', 'MAO_EAS']}, 'eval': {'dist': {'MAO': 100}, 'count': 2, 'dist_count': 2}},
+        {'eval': {'dist': {'NR': 100}, 'count': 3}},
+        {'dev': {'dist': {'SAS': 60, 'OTH': 40}, 'count': 10}, 'eval': {'dist': {'EUR': 100}, 'count': 1}},
+        {'gwas': {'dist': {'GME': 100}, 'count': 10}, 'dev': {'dist': {'ASN': 100}, 'count': 10}, 'eval': {'dist': {'GME': 50, 'ASN': 50}, 'count': 2}}
+    ]
+
+    def test_ancestry_filters(self):
+        pub = Publication.objects.create(num=360,date_publication=datetime(2020,3,10),PMID=12341,journal='Nature')
+        for i, ancestries in enumerate(self.ancestries):
+            Score.objects.create(num=960+i,publication=pub,variants_number=10,name=f'Score{i}',ancestries=ancestries,
+                                 ancestry_keys=Score.get_ancestry_keys(ancestries))
+        queryset = Score.objects.filter(publication=pub)
+
+        # Same Scores with the indexed array as with the JSON field, for all the combinations of filters
+        results = set()
+        for anc_step in (None, 'any', 'all', 'gwas', 'dev', 'eval', 'dev_all'):
+            for anc_value in (None, *constants.ANCESTRY_LABELS.keys()):
+                for anc_include_eur in (None, True, False):
+                    for anc_include_multi in (None, True, False):
+                        args = (anc_step, anc_value, anc_include_eur, anc_include_multi)
+                        expected = set(filter_score_ancestries(queryset, *args, lookups=ScoreAncestryJSONLookups).values_list('num', flat=True))
+                        self.assertEqual(set(filter_score_ancestries(queryset, *args).values_list('num', flat=True)), expected, args)
+                        results.add(frozenset(expected))
+        self.assertTrue(len(results) > 20)
+
+        # Keys filled by the migration
+        migration = import_module('catalog.migrations.0010_score_ancestry_keys').Migration
+        Score.objects.filter(publication=pub).update(ancestry_keys=[])
+        with connection.cursor() as cursor:
+            cursor.execute(migration.operations[-1].sql)
+        for score in queryset:
+            self.assertEqual(sorted(score.ancestry_keys), sorted(Score.get_ancestry_keys(score.ancestries)))
+
+        response = self.client.post('/browse/scores/', {'browse_ancestry_type_list': 'gwas', 'browse_ancestry_filter_ind': 'EUR', 'browse_anc_cb_multi': 'on'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/browse/scores/', {'browse_ancestry_filter_ind': 'XYZ'})
+        self.assertEqual(response.status_code, 400)
@@ -1,15 +1,15 @@
 from django.conf import settings
 from django.urls import path
 from django.views.generic.base import RedirectView, TemplateView
-from django.views.decorators.cache import cache_page
 
 from . import views
+from .cache.release_cache import release_cache_page
 
-# Seconds * Minutes
-cache_time = 60 * 60
+# Cache policy of the pages (see CACHE_POLICIES)
+cache_policy = 'catalog_page'
 
 urlpatterns = [
-    path('', cache_page(cache_time)(views.index), name='index'),
+    path('', release_cache_page(cache_policy)(views.index), name='index'),
 
     # e.g.: /score/PGS000029/
     path('score/<str:pgs_id>/', views.pgs, name='Score'),
@@ -34,12 +34,12 @@ urlpatterns = [
     # e.g.: /browse/scores/
     path('browse/scores/', views.browse_scores, name='Browse Scores'),
     # e.g.: /browse/traits/
-    path('browse/traits/', cache_page(cache_time)(views.browse_traits), name='Browse Traits'),
+    path('browse/traits/', release_cache_page(cache_policy)(views.browse_traits), name='Browse Traits'),
     # e.g.: /browse/studies/
     path('browse/studies/', views.browse_publications, name='Browse Publications'),
 
     # e.g.: /latest_release/
-    path('latest_release/', cache_page(cache_time)(views.latest_release), name='Latest Release'),
+    path('latest_release/', release_cache_page(cache_policy)(views.latest_release), name='Latest Release'),
 
     # e.g.: /news/
     # path('news/', views.NewsView.as_view(), name='News'),
@@ -80,13 +80,16 @@ urlpatterns = [
     # Setup URL used to warmup the Django app in the Google App Engine
     path('_ah/warmup', views.warmup, name="Warmup"),
 
+    # Metrics of the requests (Prometheus format), e.g.: /metrics
+    path('metrics', views.metrics, name='Metrics'),
+
     # Setup robots.txt
     path("robots.txt", TemplateView.as_view(template_name="robots.txt", content_type="text/plain"))
 ]
 
 if settings.PGS_ON_CURATION_SITE:
     # e.g.: /browse/pending_studies/
-    urlpatterns.append(path('browse/pending_studies/', cache_page(cache_time)(views.browse_pending_publications), name='Browse Pending Publications'))
+    urlpatterns.append(path('browse/pending_studies/', release_cache_page(cache_policy)(views.browse_pending_publications), name='Browse Pending Publications'))
 
     # e.g.: /stats/
     urlpatterns.append(path('stats/', views.stats, name='Stats'))
@@ -1,6 +1,7 @@
 import operator
 from functools import reduce
-from django.http import Http404, HttpResponseBadRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import render,redirect
 from django.views.generic import TemplateView
 from django.views.generic.base import RedirectView
@@ -8,6 +9,8 @@ from django.conf import settings
 from django.db.models import Prefetch, Q
 
 from pgs_web import constants
+from .current_release import get_release_statistics
+from .middleware.metrics import export_metrics
 from .tables import *
 
 
@@ -119,11 +122,14 @@ def format_model_numbers(models_count):
 
 
 def index(request):
-    current_release = Release.objects.values('date','score_count','publication_count').order_by('-date').first()
+    statistics = get_release_statistics()
+    current_release = None
+    if statistics['date']:
+        current_release = {key: statistics[key] for key in ('date','score_count','publication_count')}
 
-    scores_count = Score.objects.count()
-    traits_count = EFOTrait.objects.count()
-    pubs_count = Publication.objects.count()
+    scores_count = statistics['total_score_count']
+    traits_count = statistics['total_efotrait_count']
+    pubs_count = statistics['total_publication_count']
 
     context = {
         'release' : current_release,
@@ -155,43 +161,26 @@ def index(request):
     return render(request, 'catalog/index.html', context)
 
 
-def browse_all(request):
-    return redirect('/browse/scores/', permanent=True)
-
-
-def browse_scores(request):
-    context = {}
+class ScoreAncestryLookups:
+    '''
+    Lookups of the ancestry filters of the Score browse page, on the indexed array Score.ancestry_keys
+    (see Score.get_ancestry_keys) instead of the JSON field Score.ancestries.
+    '''
+    @staticmethod
+    def has_stage(step):
+        return Q(ancestry_keys__contains=[step])
 
-    # Ancestry form
-    input_names = {
-        'browse_ancestry_type_list': 'sel',
-        'browse_ancestry_filter_ind': 'sel',
-        'browse_anc_cb_EUR': 'cb',
-        'browse_anc_cb_multi': 'cb',
-        'browse_search': 'in'
-    }
-    # Init form data
-    form_data = {}
-    for input_name in input_names.keys():
-        form_data[input_name] = None
+    @staticmethod
+    def has_ancestry(step, anc):
+        return Q(ancestry_keys__contains=[f'{step}:dist:{anc}'])
 
-    if request.method == "POST":
-        for input_name in input_names.keys():
-            type = input_names[input_name]
-            val = request.POST.get(input_name)
-            if type in ['sel','in']:
-                if val:
-                    form_data[input_name] = val
-            elif type == 'cb':
-                if val:
-                    form_data[input_name] = True
-                else:
-                    form_data[input_name] = False
+    @staticmethod
+    def has_multi(step):
+        return Q(ancestry_keys__contains=[f'{step}:multi'])
 
-    score_only_attributes = ['id','name','trait_efo','trait_reported','variants_number','ancestries','license','publication__id','publication__date_publication','publication__journal','publication__firstauthor']
-    queryset = Score.objects.only(*score_only_attributes).select_related('publication').all().prefetch_related(pgs_prefetch['trait']).distinct()
 
-    ## Filter ancestry ##
+def filter_score_ancestries(queryset, anc_step, anc_value, anc_include_eur, anc_include_multi, lookups=ScoreAncestryLookups):
+    ''' Filter the Scores by the ancestry distribution of their study stages (gwas, dev and eval). '''
     gwas_step = 'gwas'
     dev_step = 'dev'
     eval_step = 'eval'
@@ -200,62 +189,40 @@ def browse_scores(request):
     # Filters
     g_d_e = []
     g_e = []
-    # Ancestry Type
-    anc_step = form_data['browse_ancestry_type_list']
-    anc_value = form_data['browse_ancestry_filter_ind']
-    anc_include_eur = form_data['browse_anc_cb_EUR']
-    anc_include_multi = form_data['browse_anc_cb_multi']
-    browse_search = form_data['browse_search']
-
-    # Control if the ancestry filter value is correct (for security, as it is used as a lookup key in the ORM filtering).
-    # 'anc_step' is already checked further downstream for specific values. 'anc_include_*' are treated as booleans.
-    # 'browse_search' will be parameterised by Django's ORM filtering, so no need to escape before.
-    if anc_value and anc_value not in constants.ANCESTRY_LABELS.keys():
-        return HttpResponseBadRequest('Invalid ancestry filter parameter')
 
     # Study step (gwas,development,evaluation) and ancestry dropdown selection
     # [G | D | E]
     if not anc_step or anc_step == 'any':
         if anc_value:
-            filters = {}
-            for step in study_steps:
-                filters[step] = f'ancestries__{step}__dist__{anc_value}__isnull'
-            queryset = queryset.filter(Q(**{filters[gwas_step]:False}) | Q(**{filters[dev_step]:False}) | Q(**{filters[eval_step]:False}))
+            queryset = queryset.filter(reduce(operator.or_,[lookups.has_ancestry(step,anc_value) for step in study_steps]))
     elif anc_step:
         # [G + D + E] - Build "All" filter
         if anc_step == 'all':
             for step in study_steps:
-                g_d_e.append(Q(ancestries__has_key=step))
+                g_d_e.append(lookups.has_stage(step))
                 if step == 'dev':
-                    g_e.append(~Q(ancestries__has_key=step))
+                    g_e.append(~lookups.has_stage(step))
                 else:
-                    g_e.append(Q(ancestries__has_key=step))
+                    g_e.append(lookups.has_stage(step))
 
                 if anc_value:
-                    g_d_e.append(Q(**{f'ancestries__{step}__dist__{anc_value}__isnull':False}))
+                    g_d_e.append(lookups.has_ancestry(step,anc_value))
                     if step != 'dev':
-                        g_e.append(Q(**{f'ancestries__{step}__dist__{anc_value}__isnull':False}))
+                        g_e.append(lookups.has_ancestry(step,anc_value))
         # G | D | E
         elif anc_step in study_steps:
             query_list = []
-            query_list.append(Q(ancestries__has_key=anc_step))
+            query_list.append(lookups.has_stage(anc_step))
             if anc_value:
-                query_list.append(Q(**{f'ancestries__{anc_step}__dist__{anc_value}__isnull':False}))
+                query_list.append(lookups.has_ancestry(anc_step,anc_value))
             queryset = queryset.filter(reduce(operator.and_,query_list))
         # [G,D]
         elif anc_step == 'dev_all':
-            has_step = {}
-            for step in dev_all_steps:
-                has_step[step] = Q(ancestries__has_key=step)
-            for step in dev_all_steps:
-                if anc_value:
-                    filters = {}
-                    for step2 in dev_all_steps:
-                        filters[step2] = f'ancestries__{step2}__dist__{anc_value}__isnull'
-                    queryset = queryset.filter((has_step[gwas_step] & Q(**{filters[gwas_step]:False})) |
-                                               (has_step[dev_step] & Q(**{filters[dev_step]:False})))
-                else:
-                    queryset = queryset.filter(has_step[gwas_step] | has_step[dev_step])
+            if anc_value:
+                queryset = queryset.filter((lookups.has_stage(gwas_step) & lookups.has_ancestry(gwas_step,anc_value)) |
+                                           (lookups.has_stage(dev_step) & lookups.has_ancestry(dev_step,anc_value)))
+            else:
+                queryset = queryset.filter(lookups.has_stage(gwas_step) | lookups.has_stage(dev_step))
 
     # Filter out European ancestry (including multi-ancestry with european)
     if anc_include_eur == False:
@@ -267,7 +234,7 @@ def browse_scores(request):
             for anc_label in eur_anc_labels:
                 if not step in eur_filters.keys():
                     eur_filters[step] = {}
-                eur_filters[step][anc_label] = Q(**{f'ancestries__{step}__dist__{anc_label}__isnull':True})
+                eur_filters[step][anc_label] = ~lookups.has_ancestry(step,anc_label)
 
         # [G | D | E]
         if not anc_step or anc_step == 'any':
@@ -300,7 +267,7 @@ def browse_scores(request):
         multi_filters = {}
         multi_query_list = []
         for step in study_steps:
-            multi_filters[step] = Q(**{f'ancestries__{step}__has_any_keys':['multi','dist_count']})
+            multi_filters[step] = lookups.has_multi(step)
         # [G | D | E]
         if not anc_step or anc_step == 'any':
             for step in study_steps:
@@ -332,6 +299,58 @@ def browse_scores(request):
         g_e_filter = reduce(operator.and_,g_e)
         queryset = queryset.filter(g_d_e_filter | g_e_filter)
 
+    return queryset
+
+
+def browse_all(request):
+    return redirect('/browse/scores/', permanent=True)
+
+
+def browse_scores(request):
+    context = {}
+
+    # Ancestry form
+    input_names = {
+        'browse_ancestry_type_list': 'sel',
+        'browse_ancestry_filter_ind': 'sel',
+        'browse_anc_cb_EUR': 'cb',
+        'browse_anc_cb_multi': 'cb',
+        'browse_search': 'in'
+    }
+    # Init form data
+    form_data = {}
+    for input_name in input_names.keys():
+        form_data[input_name] = None
+
+    if request.method == "POST":
+        for input_name in input_names.keys():
+            type = input_names[input_name]
+            val = request.POST.get(input_name)
+            if type in ['sel','in']:
+                if val:
+                    form_data[input_name] = val
+            elif type == 'cb':
+                if val:
+                    form_data[input_name] = True
+                else:
+                    form_data[input_name] = False
+
+    score_only_attributes = ['id','name','trait_efo','trait_reported','variants_number','ancestries','license','publication__id','publication__date_publication','publication__journal','publication__firstauthor']
+    queryset = Score.objects.only(*score_only_attributes).select_related('publication').all().prefetch_related(pgs_prefetch['trait']).distinct()
+
+    ## Filter ancestry ##
+    anc_step = form_data['browse_ancestry_type_list']
+    anc_value = form_data['browse_ancestry_filter_ind']
+    browse_search = form_data['browse_search']
+
+    # Control if the ancestry filter value is correct (for security, as it is used as a lookup key in the ORM filtering).
+    # 'anc_step' is already checked further downstream for specific values. 'anc_include_*' are treated as booleans.
+    # 'browse_search' will be parameterised by Django's ORM filtering, so no need to escape before.
+    if anc_value and anc_value not in constants.ANCESTRY_LABELS.keys():
+        return HttpResponseBadRequest('Invalid ancestry filter parameter')
+
+    queryset = filter_score_ancestries(queryset, anc_step, anc_value, form_data['browse_anc_cb_EUR'], form_data['browse_anc_cb_multi'])
+
     # Filter term from the table search box
     if browse_search:
         queryset = queryset.filter(
@@ -724,26 +743,18 @@ def efo(request, efo_id):
             exclude_children = True
 
     try:
-        ontology_trait = EFOTrait_Ontology.objects.prefetch_related('scores_direct_associations','scores_child_associations','child_traits','traitcategory').get(id__exact=efo_id)
+        ontology_trait = EFOTrait_Ontology.objects.prefetch_related('child_traits','traitcategory').get(id__exact=efo_id)
     except EFOTrait_Ontology.DoesNotExist:
         raise Http404("Trait: \"{}\" does not exist".format(efo_id))
 
-    # Get list of PGS Scores
-    related_direct_scores = ontology_trait.scores_direct_associations.defer(*pgs_defer['generic']).select_related('publication').all().prefetch_related(pgs_prefetch['trait'])
-    related_child_scores = ontology_trait.scores_child_associations.defer(*pgs_defer['generic']).select_related('publication').all().prefetch_related(pgs_prefetch['trait'])
-    if exclude_children:
-        related_scores = related_direct_scores
-    else:
-        merged_related_scores = list(related_direct_scores) + list(related_child_scores)
-        # Remove potential duplicates (e.g. one of the trait is also a child of the second trait)
-        related_scores = list(set(merged_related_scores))
-        related_scores.sort(key=lambda x: x.id)
+    # Get list of PGS Scores (from the closure table of the ontology: no duplicates between the trait and its children)
+    related_scores = ontology_trait.get_scores(include_children=not exclude_children).defer(*pgs_defer['generic']).select_related('publication').prefetch_related(pgs_prefetch['trait']).order_by('num')
 
     context = {
         'trait': ontology_trait,
         'trait_id_with_colon': ontology_trait.id.replace('_', ':'),
-        'trait_scores_direct_count': len(related_direct_scores),
-        'trait_scores_child_count': len(related_child_scores),
+        'trait_scores_direct_count': ontology_trait.get_scores(include_children=False).count(),
+        'trait_scores_child_count': ontology_trait.get_scores(include_self=False).count(),
         'performance_disclaimer': performance_disclaimer(),
         'table_scores': ScoreTable(related_scores),
         'include_children': False if exclude_children else True,
@@ -774,14 +785,14 @@ def gwas_gcst(request, gcst_id):
     if not gcst_id.isdigit() and not gcst_id.isupper():
         return redirect_with_upper_case_id(request, '/gwas/', gcst_id)
 
-    samples = Sample.objects.filter(source_GWAS_catalog__exact=gcst_id).distinct()
-    if len(samples) == 0:
-        raise Http404("No PGS Samples are associated with the NHGRI-GWAS Catalog Study: \"{}\"".format(gcst_id))
-
-    related_scores = Score.objects.defer(*pgs_defer['generic']).select_related('publication').filter(samples_variants__in=samples).prefetch_related(pgs_prefetch['trait']).distinct()
-    if len(related_scores) == 0:
+    score_ids = GwasScoreAssociation.get_score_ids([gcst_id])[gcst_id]
+    if len(score_ids) == 0:
+        if not Sample.objects.filter(source_GWAS_catalog__exact=gcst_id).exists():
+            raise Http404("No PGS Samples are associated with the NHGRI-GWAS Catalog Study: \"{}\"".format(gcst_id))
         raise Http404("No PGS Scores are associated with the NHGRI-GWAS Catalog Study: \"{}\"".format(gcst_id))
 
+    related_scores = Score.objects.defer(*pgs_defer['generic']).select_related('publication').filter(id__in=score_ids).prefetch_related(pgs_prefetch['trait'])
+
     context = {
         'gwas_id': gcst_id,
         'performance_disclaimer': performance_disclaimer(),
@@ -1109,3 +1120,17 @@ def warmup(request):
                 pass
     content_type = 'text/plain; charset=utf-8'
     return HttpResponse("Warmup done.", content_type=content_type)
+
+
+def metrics(request):
+    """
+    Metrics of the requests (see catalog.middleware.metrics) in the Prometheus text exposition format.
+    Only available with the token METRICS_TOKEN, sent in the header 'Authorization: Bearer <token>'.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404("Page not found")
+    if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain; charset=utf-8')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(export_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
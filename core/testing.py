@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.core.cache import caches
 from django.test import TestCase
 
 
 class CurationTestCase(TestCase):
     """Base test case class for PGS Catalog tests that require database access in curation context."""
     databases = {'default', 'curation_tracker'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Reset the rate limit buckets (see rest_api.throttling) used by the previous test classes
+        caches[settings.REST_THROTTLE_CACHE].clear()
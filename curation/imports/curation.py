@@ -5,6 +5,7 @@ from curation.imports.reported_trait_cleaner import ReportedTraitCleaner
 from curation.imports.study import StudyImport
 from curation.imports.scoring_file import ScoringFileUpdate, VariantPositionsQC
 from curation_tracker.models import CurationPublicationAnnotation
+from catalog.models import CohortAssociation, GwasScoreAssociation
 
 
 curation_tracker = 'curation_tracker'
@@ -158,4 +159,10 @@ class CurationImport():
                     curation_pub.save()
                     print("  > Curation status updated in the Curation Tracker")
 
+        ## Cohort and GWAS/Score associations ##
+        count_associations = CohortAssociation.update_associations()
+        print(f'\n==> Cohort/Score associations updated: {count_associations}')
+        count_associations = GwasScoreAssociation.update_associations()
+        print(f'==> GWAS/Score associations updated: {count_associations}')
+
         self.global_report()
@@ -19,26 +19,25 @@ class CohortData(GenericData):
         Check if a Cohort model already exists.
         Return type: Cohort model
         '''
-        try:
-            cohort = Cohort.objects.get(name_short__iexact=self.name, name_full__iexact=self.name_long)
-            self.model = cohort
+        # Cohorts with the same short name (case insensitive), fetched with one indexed query
+        cohorts = list(Cohort.filter_by_names([self.name]))
+        same_name_long = [cohort for cohort in cohorts if cohort.name_full.upper() == self.name_long.upper()]
+        self.model = None
+        if len(same_name_long) == 1:
+            self.model = same_name_long[0]
             #print(f'Cohort {self.name} found in the DB')
-        except Cohort.DoesNotExist:
-            self.model = None
-            try:
-                cohort = Cohort.objects.get(name_short__iexact=self.name)
-                # Short name = long name
-                if self.name == self.name_long:
-                    self.model = cohort
-                else:
-                    print(f'A existing cohort has been found in the DB with the ID "{self.name}" ({self.name_long}). However the long name differs.')
-            except Cohort.DoesNotExist:
-                print(f'New cohort "{self.name}".')
-                self.model = None
-            except:
-                print(f'ERROR with cohort {self.name} duplicated!')
-        except:
+        elif len(same_name_long) > 1:
             print(f'ERROR with cohort {self.name} ({self.name_long}) duplicated!')
+        elif len(cohorts) == 1:
+            # Short name = long name
+            if self.name == self.name_long:
+                self.model = cohorts[0]
+            else:
+                print(f'A existing cohort has been found in the DB with the ID "{self.name}" ({self.name_long}). However the long name differs.')
+        elif len(cohorts) > 1:
+            print(f'ERROR with cohort {self.name} duplicated!')
+        else:
+            print(f'New cohort "{self.name}".')
 
 
     @transaction.atomic
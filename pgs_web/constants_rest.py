@@ -1,6 +1,25 @@
 # List the different versions of the REST API with their changelogs
 
 PGS_REST_API = [
+    {
+        'version': '1.9',
+        'date': '2026-10',
+        'changelog': [
+            "New parameter 'cursor' for the endpoints `/rest/score/all`, `/rest/performance/all`, `/rest/publication/all` and `/rest/sample_set/all` to paginate the results with a cursor (keyset pagination) instead of an offset.",
+            "New parameters 'format=ndjson' and 'stream=1' for the endpoints `/rest/score/all`, `/rest/performance/all`, `/rest/trait/all`, `/rest/publication/all` and `/rest/cohort/all` to stream all the results in one response, in the newline delimited JSON format.",
+            "New 'ETag' and 'Last-Modified' headers in the responses, based on the current release: the conditional requests (headers 'If-None-Match' or 'If-Modified-Since') return a 304 (Not Modified) response if the data haven't changed.",
+            "New endpoint `/rest/gwas/get_score_ids` returning the PGS IDs associated with each GWAS Catalog Study ID of a list (parameter 'filter_ids').",
+            "The exact search of the endpoint `/rest/trait/search` (parameter 'exact=1') matches the synonyms and mapped terms literally: the special characters of the term (e.g. parentheses) are no longer interpreted as a regular expression.",
+            "New endpoint `/rest/batch` (POST request) returning the Scores, Publications, Performance Metrics, Sample Sets and Traits of a list of IDs (parameter 'filter_ids'), with the lists of IDs not found and of retired IDs.",
+            "New parameters 'fields' and 'exclude' for the `/rest/score/`, `/rest/performance/` and `/rest/publication/` endpoints to select the fields returned for each result (comma-separated lists of fields).",
+            "Rate limit based on a budget of tokens shared by all the servers: each request uses a number of tokens depending on the endpoint (e.g. number of results per page), returned in the headers `X-RateLimit-Limit`, `X-RateLimit-Remaining`, `X-RateLimit-Reset` and `X-RateLimit-Cost`.",
+            "New parameter 'count' for the paginated endpoints: 'count=estimate' returns an estimated number of results for the endpoints without filter, and 'count=false' doesn't compute the number of results (field 'count' set to null).",
+            "New formats 'msgpack' (MessagePack, all the endpoints) and 'csv'/'tsv' (Scores, Performance Metrics, Sample Sets and Cohorts endpoints), also available in the streaming mode.",
+            "New endpoint `/rest/release/{release_date}/changes` returning the Scores, Performance Metrics, Publications, Traits, Sample Sets and Cohorts added, updated (with the list of changed fields), retired or removed in a release, or between two releases (parameter 'since').",
+            "New endpoint `/rest/release/{release_date}/parquet/{filename}` to download the metadata tables of a release as Parquet files, listed with their checksums in a manifest.",
+            "The cohort names of the parameter `filter_ids` of `/rest/cohort/all` are matched literally (case-insensitive), so that names with special characters (e.g. '+', '(' or '.') are supported."
+        ]
+    },
     {
         'version': '1.8.6',
         'date': '2023-01',
@@ -2,6 +2,7 @@
 Django settings for pgs_web project.
 """
 
+import importlib.util
 import os
 from pgs_web.constants import USEFUL_URLS
 from pgs_web.external_urls import STYLES_URLS
@@ -102,7 +103,10 @@ if DEBUG == True:
 
 
 MIDDLEWARE = [
+    'catalog.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'catalog.middleware.compression.CompressionMiddleware',
+    'rest_api.throttling.RateLimitHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -112,6 +116,13 @@ MIDDLEWARE = [
 ]
 
 
+# Metrics of the requests (see catalog.middleware.metrics), exposed on '/metrics' for the requests sending
+# the header 'Authorization: Bearer <METRICS_TOKEN>' (endpoint disabled if no token is set)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', None)
+# Proportion of the requests measured (number of SQL queries, durations, size), between 0 and 1
+METRICS_SAMPLE_RATE = 1.0
+
+
 # ----------------------------- #
 # Content Security Policy (CSP) #
 # ----------------------------- #
@@ -121,12 +132,6 @@ if not DEBUG:
         'csp.middleware.CSPMiddleware',
         'catalog.middleware.add_nonce.AddNonceToScriptsMiddleware'
     ])
-    CACHES = {
-        'default': {
-            # Custom cache class called if cache_page decorator is used
-            'BACKEND': 'catalog.cache.remove_nonce.RemoveNonceFromCacheBackend',
-        }
-    }
 
 CSP_INCLUDE_NONCE_IN = [
     'script-src'
@@ -183,6 +188,9 @@ CSP_FRAME_SRC = ("'self'",
 # Live middleware
 if PGS_ON_LIVE_SITE:
     MIDDLEWARE.insert(2, 'corsheaders.middleware.CorsMiddleware')
+# Release ETag / conditional requests (not on the curation site, where the data change between releases)
+if not PGS_ON_CURATION_SITE:
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'), 'catalog.middleware.release_etag.ReleaseETagMiddleware')
 # Debug toolbar
 if DEBUG == True:
     MIDDLEWARE.insert(5,'debug_toolbar.middleware.DebugToolbarMiddleware') # Debug SQL queries
@@ -235,6 +243,59 @@ else:
 
 
 WSGI_APPLICATION = 'pgs_web.wsgi.application'
+ASGI_APPLICATION = 'pgs_web.asgi.application'
+
+
+#-------#
+# Cache #
+#-------#
+# The cache is shared between the instances if a Redis server is provided (CACHE_REDIS_URL, e.g. 'redis://10.0.0.3:6379'),
+# otherwise each process has its own cache in memory.
+# Custom cache classes removing the CSP nonces of the pages cached by the 'cache_page'/'release_cache_page' decorators.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    cache_backend = {
+        'BACKEND': 'catalog.cache.remove_nonce.RemoveNonceFromRedisCacheBackend',
+        'LOCATION': CACHE_REDIS_URL
+    }
+else:
+    cache_backend = {
+        'BACKEND': 'catalog.cache.remove_nonce.RemoveNonceFromCacheBackend'
+    }
+CACHES = {
+    'default': cache_backend,
+    # Cache of the responses: the keys contain the current release date and the deployed version of the website
+    'responses': {
+        **cache_backend,
+        'KEY_PREFIX': os.environ.get('GAE_VERSION', ''),
+        'KEY_FUNCTION': 'catalog.cache.release_cache.make_release_key'
+    }
+}
+CACHE_MIDDLEWARE_ALIAS = 'responses'
+
+# Cache policies of the responses (see catalog.cache.release_cache.release_cache_page):
+# - timeout: number of seconds the response is kept in the cache (0: not cached)
+# - max_size: maximum size of a cached response (bytes)
+# - max_age: max-age (seconds) of the Cache-Control header (clients cache)
+# The REST API responses are not cached on the curation site, as the data change between releases.
+rest_cache_timeout = 0 if PGS_ON_CURATION_SITE else 60 * 60 * 24
+CACHE_POLICIES = {
+    'rest_list':    { 'timeout': rest_cache_timeout, 'max_size': 4 * 1024 * 1024, 'max_age': 0 },
+    'rest_search':  { 'timeout': rest_cache_timeout, 'max_size': 1024 * 1024, 'max_age': 0 },
+    'rest_detail':  { 'timeout': rest_cache_timeout, 'max_size': 1024 * 1024, 'max_age': 0 },
+    'rest_info':    { 'timeout': rest_cache_timeout, 'max_size': 256 * 1024, 'max_age': 0 },
+    'catalog_page': { 'timeout': 60 * 60, 'max_size': 8 * 1024 * 1024 }
+}
+
+# Compression of the responses (see catalog.middleware.compression): brotli if the library is installed, or gzip.
+# Only the responses larger than COMPRESSION_MIN_SIZE (bytes) and with a content type listed in COMPRESSION_CONTENT_TYPES are compressed.
+# The responses containing a CSRF token are never compressed (BREACH attack).
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = [
+    'application/json', 'application/x-ndjson', 'application/msgpack', 'application/javascript', 'application/xml',
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/csv', 'text/tab-separated-values', 'image/svg+xml'
+]
+COMPRESSION_LEVELS = { 'gzip': 6, 'br': 5 }
 
 
 #----------#
@@ -378,9 +439,19 @@ COMPRESS_PRECOMPILERS = (
 #REST_SAFELIST_IPS = [
 #    '127.0.0.1'
 #]
+# IP addresses or CIDR blocks (e.g. '10.1.0.0/20', '2001:db8::/32') blocked from the REST API (see rest_api.ip_lists)
 REST_BLACKLIST_IPS = [
     #'127.0.0.1'
 ]
+# IP addresses or CIDR blocks with a stricter rate limit ('restricted' throttle rate)
+REST_RESTRICTED_IPS = [
+    #'127.0.0.1'
+]
+# Optional files adding entries to these lists (one per line), reloaded when modified
+REST_BLACKLIST_IPS_FILE = os.getenv('REST_BLACKLIST_IPS_FILE', None)
+REST_RESTRICTED_IPS_FILE = os.getenv('REST_RESTRICTED_IPS_FILE', None)
+# Minimum number of seconds between two checks of the modification of the files
+REST_IP_LISTS_RELOAD_INTERVAL = 30
 
 REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
@@ -394,21 +465,53 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
         #'rest_framework.renderers.BrowsableAPIRenderer',
-        'rest_api.renderers.NoOptionBrowsableAPIRenderer'
-    ],
+        'rest_api.renderers.NoOptionBrowsableAPIRenderer',
+        'rest_api.renderers.NDJSONRenderer'
+    ] + (['rest_api.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
     'DEFAULT_PAGINATION_CLASS': 'rest_api.pagination.CustomPagination',
     'PAGE_SIZE': 50,
     'EXCEPTION_HANDLER': 'rest_api.views.custom_exception_handler',
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'rest_api.throttling.TokenBucketThrottle'
     ],
+    # Capacity and refill rate of the token buckets (see rest_api.throttling)
     'DEFAULT_THROTTLE_RATES' : {
         'anon': '100/min',
-        'user': '100/min'
+        'user': '100/min',
+        'restricted': '20/min'
     }
 }
 
+# Cache storing the token buckets of the rate limit (shared between the instances when using Redis)
+REST_THROTTLE_CACHE = 'default'
+# Number of tokens used by the requests (see rest_api.throttling.TokenBucketThrottle.get_cost):
+# - default: endpoints returning one entry, unless the view has its own 'throttle_weight'
+# - stream: streaming of all the results of a list endpoint (the paginated lists use one token per page of PAGE_SIZE results)
+REST_THROTTLE_COSTS = {
+    'default': 1,
+    'stream': 10
+}
+
+# Serve the REST detail/filter_ids results from the JSON documents generated at release time (see rest_api.documents).
+# Not used on the curation site as its data change between releases.
+REST_DOCUMENT_STORE = not PGS_ON_CURATION_SITE
+
+# Serialize the Score/Performance results from 'values()' rows instead of the model instances (see rest_api.values_serializers).
+REST_VALUES_SERIALIZERS = True
+
+# Number of seconds the counts of the paginated results are kept in the cache of the responses (see rest_api.pagination)
+REST_COUNT_CACHE_TIMEOUT = rest_cache_timeout
+
+# Run the independent queries of the paginated lists (count and page of results) at the same time, in worker threads
+# using their own database connections (see rest_api.concurrency). Maximum number of worker threads per process:
+REST_CONCURRENT_QUERIES = True
+REST_CONCURRENT_QUERIES_WORKERS = 4
+# Maximum age (seconds) of the persistent database connections of the worker threads
+REST_CONCURRENT_QUERIES_CONN_MAX_AGE = 600
+
+# Directory of the Parquet dumps of the releases (one sub-directory per release, see rest_api.parquet)
+REST_PARQUET_DIR = os.getenv('REST_PARQUET_DIR', os.path.join(BASE_DIR, 'parquet'))
+
 
 #-----------------#
 #  CORS Settings  #
@@ -468,6 +571,20 @@ DATA_UPLOAD_MAX_NUMBER_FILES=10
 # Site default ID, necessary for django.contrib.sites.
 SITE_ID = 1
 
+# Number of seconds the current release date is kept in memory (see catalog.current_release)
+CURRENT_RELEASE_CACHE_TIMEOUT = 300
+
+# Number of seconds the statistics of the current release are kept in memory (see catalog.current_release)
+RELEASE_STATISTICS_CACHE_TIMEOUT = 60
+
+# URL paths (regex) of the pages using the release-based ETag (see catalog.middleware.release_etag)
+RELEASE_ETAG_PATHS = [
+    r'^/rest/',
+    r'^/$',
+    r'^/browse/traits/$',
+    r'^/latest_release/$'
+]
+
 
 #---------------------#
 #  Auditlog Settings  #
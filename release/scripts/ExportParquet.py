@@ -0,0 +1,24 @@
+from catalog.models import Release
+from rest_api.parquet import export_parquet, get_release_dir
+
+
+class ExportParquet:
+
+    def __init__(self, release_date=None):
+        if release_date:
+            self.release_date = release_date
+        else:
+            self.release_date = Release.objects.latest('date').date
+
+    def export_parquet(self):
+        ''' Write the Parquet dumps of the release (metadata tables) and their manifest (requires pyarrow, see requirements_release.txt) '''
+        manifest = export_parquet(self.release_date)
+        print(f' > Parquet dumps directory: {get_release_dir(self.release_date)}')
+        for table in manifest['tables']:
+            print(f' > Parquet dumps - {table["name"]}: {table["rows"]} rows ({table["size"]} bytes)')
+
+
+def run():
+    """ Write the Parquet dumps (metadata tables) of the latest release."""
+    parquet_export = ExportParquet()
+    parquet_export.export_parquet()
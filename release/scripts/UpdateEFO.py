@@ -1,4 +1,4 @@
-from catalog.models import EFOTrait, TraitCategory, EFOTrait_Ontology, Score
+from catalog.models import EFOTrait, TraitCategory, EFOTrait_Ontology, EFOTraitClosure, Score
 from django.db import connections
 from core.services.ols_rest_client import OLSRestClient
 
@@ -438,6 +438,16 @@ class UpdateEFO:
                 print("ERROR: Can't retrieve the category '"+category_label+"'!")
 
 
+    def update_efo_closure(self):
+        ''' Rebuild the closure table of the parent/child relations (EFOTraitClosure) and validate it against the direct relations '''
+        count = EFOTraitClosure.update_closure()
+        print(f' -> {count} ancestor/descendant pairs stored')
+        for error in EFOTraitClosure.check_integrity():
+            closure_msg = f'EFO closure table: {error}'
+            print(f'ERROR: {closure_msg}')
+            self.warnings.append(closure_msg)
+
+
     def launch_efo_updates(self):
         ''' Method to run the full EFOTrait/EFOTrait_Ontology/TraitCategory update'''
 
@@ -476,6 +486,10 @@ class UpdateEFO:
         print('\n> Start updating Trait category associations in the database')
         self.update_efo_category_info()
 
+        # Update the closure table of the ontology
+        print('\n> Rebuild the closure table of the trait ontology')
+        self.update_efo_closure()
+
         if self.warnings:
             print("##### Warnings #####")
             for warning in self.warnings:
@@ -0,0 +1,16 @@
+from catalog.models import GwasScoreAssociation
+
+
+class UpdateGwasScoreAssociations:
+
+    def update_associations(self):
+        ''' Rebuild the GWAS study (GCST) / Score associations table '''
+        count = GwasScoreAssociation.update_associations()
+        count_gcst = GwasScoreAssociation.objects.values('gcst_id').distinct().count()
+        print(f' > GWAS/Score associations: {count} ({count_gcst} GWAS studies)')
+
+
+def run():
+    """ Rebuild the GWAS study (GCST) / Score associations table."""
+    gwas_associations = UpdateGwasScoreAssociations()
+    gwas_associations.update_associations()
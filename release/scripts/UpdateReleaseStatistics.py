@@ -0,0 +1,17 @@
+from catalog.models import Release
+
+
+class UpdateReleaseStatistics:
+
+    def update_statistics(self):
+        ''' Store the statistics snapshot (total numbers of entries) in the latest release '''
+        release = Release.objects.latest('date')
+        release.update_statistics()
+        for field in Release.statistics_fields:
+            print(f' > {Release._meta.get_field(field).verbose_name}: {getattr(release, field)}')
+
+
+def run():
+    """ Store the statistics snapshot (total numbers of entries) in the latest release."""
+    release_statistics = UpdateReleaseStatistics()
+    release_statistics.update_statistics()
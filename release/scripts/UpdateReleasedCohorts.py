@@ -1,4 +1,4 @@
-from catalog.models import Cohort, Score
+from catalog.models import Cohort, CohortAssociation
 from pgs_web import constants
 
 class UpdateReleasedCohorts:
@@ -7,22 +7,21 @@ class UpdateReleasedCohorts:
 
     def __init__(self):
         self.cohorts = Cohort.objects.only('id','released').all()
-        self.score_id_list = Score.objects.values_list('id', flat=True).filter(date_released__isnull=False)
 
     def update_cohorts(self):
-        count_all = 0
+        # Rebuild the cohort/score associations table
+        count_associations = CohortAssociation.update_associations()
+        print(f' > Cohort/Score associations: {count_associations}')
+
+        # Cohorts associated with at least one released score
+        released_cohort_ids = set(
+            CohortAssociation.objects.filter(score__date_released__isnull=False).values_list('cohort_id', flat=True).distinct()
+        )
         for cohort in self.cohorts:
-            c_associations = cohort.associated_pgs_ids
-            associations_list = set( c_associations['development'] + c_associations['evaluation'] )
-
-            released = False
-            if (set(self.score_id_list).intersection(associations_list)):
-                released = True
-
-            if released == False:
-                self.cohorts_not_released.append(cohort.id)
-            else:
+            if cohort.id in released_cohort_ids:
                 self.cohorts_released.append(cohort.id)
+            else:
+                self.cohorts_not_released.append(cohort.id)
 
         # Update DB with new values
         Cohort.objects.filter(id__in=self.cohorts_released).update(released=True)
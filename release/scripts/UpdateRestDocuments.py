@@ -0,0 +1,28 @@
+from django.db.models import Count
+from catalog.models import Release
+from rest_api.documents import update_documents
+from rest_api.models import ReleaseChange
+
+
+class UpdateRestDocuments:
+
+    def __init__(self, release_date=None):
+        if release_date:
+            self.release_date = release_date
+        else:
+            self.release_date = Release.objects.latest('date').date
+
+    def update_rest_documents(self):
+        ''' Serialize the REST API documents of the release and store them in the database '''
+        counts = update_documents(self.release_date)
+        for entity, count in counts.items():
+            print(f' > REST documents - {entity}: {count}')
+        changes = ReleaseChange.objects.filter(release_date=self.release_date).values('entity', 'change').annotate(count=Count('id')).order_by('entity', 'change')
+        for change in changes:
+            print(f' > Release changes - {change["entity"]} {change["change"]}: {change["count"]}')
+
+
+def run():
+    """ Generate the REST API JSON documents of the latest release."""
+    rest_documents = UpdateRestDocuments()
+    rest_documents.update_rest_documents()
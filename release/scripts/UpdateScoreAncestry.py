@@ -233,6 +233,7 @@ class UpdateScoreAncestry:
                     anc_data[stage]['multi'] = score_ancestry_data[stage]['multi']
 
             score.ancestries = anc_data
+            score.ancestry_keys = Score.get_ancestry_keys(anc_data)
             score.save()
 
         # Return message errors for the ancestries not found in the list of allowed ancestries
@@ -5,7 +5,11 @@ from release.scripts.OnlyUpdateEFOAssociations import OnlyUpdateEFOAssociations
 from release.scripts.UpdateScoreAncestry import UpdateScoreAncestry
 from release.scripts.UpdateScoreEvaluated import UpdateScoreEvaluated
 from release.scripts.UpdateReleasedCohorts import UpdateReleasedCohorts
+from release.scripts.UpdateGwasScoreAssociations import UpdateGwasScoreAssociations
 from release.scripts.UpdateEFO import UpdateEFO
+from release.scripts.UpdateReleaseStatistics import UpdateReleaseStatistics
+from release.scripts.UpdateRestDocuments import UpdateRestDocuments
+from release.scripts.ExportParquet import ExportParquet
 
 
 def run(*args):
@@ -31,6 +35,9 @@ def run(*args):
     # Update the cohorts (update the Cohort "released" field)
     update_released_cohorts()
 
+    # Update the GWAS study (GCST) / Score associations
+    update_gwas_score_associations()
+
     if 'update_efo_associations_only' in args:
         # Simply update trait associations without rebuilding the ontology
         update_efo_associations_only()
@@ -41,6 +48,15 @@ def run(*args):
     # Display the list of new EFO traits in the catalog
     display_new_efo()
 
+    # Store the statistics (total numbers of entries) of the release
+    update_release_statistics()
+
+    # Generate the REST API documents (pre-encoded JSON) of the release
+    update_rest_documents()
+
+    # Write the Parquet dumps (metadata tables) of the release
+    export_parquet()
+
 
 #-----------#
 #  Methods  #
@@ -74,6 +90,13 @@ def update_released_cohorts():
     released_cohorts.update_cohorts()
 
 
+def update_gwas_score_associations():
+    """ Rebuild the GWAS study (GCST) / Score associations table """
+    report_header("Rebuild the GWAS study (GCST) / Score associations table")
+    gwas_associations = UpdateGwasScoreAssociations()
+    gwas_associations.update_associations()
+
+
 def update_efo():
     """ Update the EFO entries and add/update the Trait categories (from GWAS Catalog) """
     report_header("Update the EFO entries and add/update the Trait categories (from GWAS Catalog)")
@@ -106,5 +129,26 @@ def display_new_efo():
         print(new_trait)
 
 
+def update_release_statistics():
+    """ Store the statistics snapshot (total numbers of entries) in the release """
+    report_header("Store the statistics snapshot (total numbers of entries) in the release")
+    release_statistics = UpdateReleaseStatistics()
+    release_statistics.update_statistics()
+
+
+def update_rest_documents():
+    """ Generate the REST API JSON documents of the release """
+    report_header("Generate the REST API JSON documents of the release")
+    rest_documents = UpdateRestDocuments()
+    rest_documents.update_rest_documents()
+
+
+def export_parquet():
+    """ Write the Parquet dumps (metadata tables) of the release """
+    report_header("Write the Parquet dumps (metadata tables) of the release")
+    parquet_export = ExportParquet()
+    parquet_export.export_parquet()
+
+
 def report_header(msg):
     print('\n# '+msg)
@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+executor = None
+# Time after which the database connection of a worker thread is closed (see run_in_worker)
+worker_connections = threading.local()
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=settings.REST_CONCURRENT_QUERIES_WORKERS, thread_name_prefix='rest_queries')
+    return executor
+
+
+def run_in_worker(function, using='default'):
+    '''
+    Run the function in a worker thread, with its own database connection. The connection stays open between the calls
+    (whatever CONN_MAX_AGE, so a new connection isn't opened for each request) and is checked before being used again:
+    it is closed if it is not usable anymore (e.g. database restarted) or older than REST_CONCURRENT_QUERIES_CONN_MAX_AGE.
+    '''
+    connection = connections[using]
+    if connection.connection is not None:
+        if time.monotonic() >= worker_connections.close_at or connection.errors_occurred or not connection.is_usable():
+            connection.close()
+    if connection.connection is None:
+        worker_connections.close_at = time.monotonic() + settings.REST_CONCURRENT_QUERIES_CONN_MAX_AGE
+    return function()
+
+
+def run_queries(*functions, using='default'):
+    '''
+    Call the functions (each running its own database queries) at the same time and return their results, in the same order.
+    The first function runs in the current thread and the others in worker threads (see run_in_worker).
+    The functions are called one after the other when the concurrent queries are disabled (REST_CONCURRENT_QUERIES)
+    or within a transaction, as the data of the transaction are not visible from the connections of the other threads (e.g. in the tests).
+    Note: the async ORM methods (e.g. 'acount()') run the queries in the same thread as the view, one at a time, so they
+    wouldn't reduce the duration of the request.
+    '''
+    if not settings.REST_CONCURRENT_QUERIES or len(functions) < 2 or connections[using].in_atomic_block:
+        return [function() for function in functions]
+    futures = [get_executor().submit(run_in_worker, function) for function in functions[1:]]
+    results = [functions[0]()]
+    results.extend(future.result() for future in futures)
+    return results
+
+
+async def iterate_in_thread(iterator):
+    '''
+    Asynchronous iterator over a synchronous iterator (e.g. rows fetched from the database), each item being fetched in
+    the thread of the synchronous views, so the ASGI server sends each item as soon as it is ready.
+    '''
+    iterator = iter(iterator)
+    end = object()
+    while True:
+        item = await sync_to_async(next, thread_sensitive=True)(iterator, end)
+        if item is end:
+            break
+        yield item
@@ -0,0 +1,142 @@
+import json
+from itertools import islice
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from catalog.models import Score, Performance, Publication, EFOTrait_Ontology, SampleSet, Cohort, Release, Retired
+from catalog.middleware.compression import compress, available_encodings, max_levels
+from .models import RestDocument, ReleaseChange
+from .serializers import *
+from .views import related_dict
+
+
+# Entities stored as pre-encoded JSON documents, with the serializer and the queryset used by the REST detail endpoints.
+# All the entities are compared with the documents of the previous release to record the changes (see update_documents),
+# the cohorts being identified by their short name ('object_id').
+document_types = {
+    'score': {
+        'serializer': ScoreSerializer,
+        'queryset': lambda: Score.objects.defer(*related_dict['score_defer']).select_related('publication').prefetch_related(*related_dict['score_prefetch'])
+    },
+    'performance': {
+        'serializer': PerformanceSerializer,
+        'queryset': lambda: Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).prefetch_related(*related_dict['perf_prefetch'])
+    },
+    'publication': {
+        'serializer': PublicationExtendedSerializer,
+        'queryset': lambda: Publication.objects.defer(*related_dict['publication_defer'])
+    },
+    'trait': {
+        'serializer': EFOTraitOntologyChildSerializer,
+        'queryset': lambda: EFOTrait_Ontology.objects.prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch'], *related_dict['ontology_child_traits_prefetch'])
+    },
+    'sample_set': {
+        'serializer': SampleSetSerializer,
+        'queryset': lambda: SampleSet.objects.prefetch_related('samples', 'samples__cohorts')
+    },
+    'cohort': {
+        'serializer': CohortExtendedSerializer,
+        'queryset': lambda: Cohort.objects.filter(released=True).prefetch_related(*related_dict['cohort_associations_prefetch']),
+        'object_id': 'name_short'
+    }
+}
+
+
+def render_documents(entity, chunk_size=500):
+    ''' Serialize all the entries of the entity and yield their ID and JSON document '''
+    document_type = document_types[entity]
+    serializer_class = document_type['serializer']
+    id_field = document_type.get('object_id', 'id')
+    renderer = JSONRenderer()
+
+    # The prefetches are run once per chunk of entries
+    for entry in document_type['queryset']().order_by('pk').iterator(chunk_size=chunk_size):
+        yield getattr(entry, id_field), renderer.render(serializer_class(entry).data)
+
+
+def compress_document(data):
+    ''' Compressed forms of a JSON document (with the highest compression levels, as they are generated once) '''
+    return {
+        'data_gzip': compress(data, 'gzip', max_levels['gzip']),
+        'data_br': compress(data, 'br', max_levels['br']) if 'br' in available_encodings() else None
+    }
+
+
+def get_changed_fields(previous_data, data):
+    ''' Top-level fields of a JSON document whose values differ from the previous version of the document '''
+    previous_document, document = json.loads(previous_data), json.loads(data)
+    missing = object()
+    return sorted(key for key in previous_document.keys() | document.keys() if previous_document.get(key, missing) != document.get(key, missing))
+
+
+def merge_changes(previous_changes, changes):
+    '''
+    Merge the changes found when the documents of a release are generated again with the changes recorded
+    the first time (the entries added in the release stay 'added', the changed fields are accumulated)
+    '''
+    merged = dict(previous_changes)
+    for key, (change, fields) in changes.items():
+        previous_change, previous_fields = merged.get(key, (None, []))
+        if previous_change == 'added' and change == 'updated':
+            continue
+        if previous_change == 'updated' and change == 'updated':
+            fields = sorted(set(previous_fields) | set(fields))
+        merged[key] = (change, fields)
+    return merged
+
+
+def update_documents(release_date=None, chunk_size=500):
+    '''
+    Replace the stored JSON documents by the documents of the given release (default: latest release).
+    The differences with the stored documents are recorded as the changes of the release (ReleaseChange):
+    entries added, updated (with the list of changed fields), retired or removed. Nothing is recorded for
+    an entity without stored documents (first generation of the documents).
+    Return the number of documents stored for each entity.
+    '''
+    if not release_date:
+        release_date = Release.objects.latest('date').date
+    counts = {}
+    changes = {}
+    with transaction.atomic():
+        RestDocument.objects.exclude(entity__in=list(document_types)).delete()
+        regenerated = RestDocument.objects.filter(release_date=release_date).exists()
+        retired_ids = set(Retired.objects.values_list('id', flat=True))
+        for entity in document_types:
+            record_changes = RestDocument.objects.filter(entity=entity).exists()
+            documents = render_documents(entity, chunk_size)
+            object_ids = set()
+            while True:
+                batch = list(islice(documents, chunk_size))
+                if not batch:
+                    break
+                batch_ids = [object_id for object_id, _ in batch]
+                previous_documents = RestDocument.objects.filter(entity=entity, object_id__in=batch_ids)
+                if record_changes:
+                    previous_data = { object_id: bytes(data) for object_id, data in previous_documents.values_list('object_id', 'data') }
+                    for object_id, data in batch:
+                        if object_id not in previous_data:
+                            changes[(entity, object_id)] = ('added', [])
+                        elif previous_data[object_id] != data:
+                            changes[(entity, object_id)] = ('updated', get_changed_fields(previous_data[object_id], data))
+                previous_documents.delete()
+                RestDocument.objects.bulk_create([
+                    RestDocument(entity=entity, object_id=object_id, release_date=release_date, data=data, **compress_document(data))
+                    for object_id, data in batch
+                ])
+                object_ids.update(batch_ids)
+            # Remaining documents: entries not available anymore
+            removed_ids = set(RestDocument.objects.filter(entity=entity).values_list('object_id', flat=True)) - object_ids
+            for object_id in removed_ids:
+                changes[(entity, object_id)] = ('retired' if object_id in retired_ids else 'removed', [])
+            RestDocument.objects.filter(entity=entity, object_id__in=removed_ids).delete()
+            counts[entity] = len(object_ids)
+
+        release_changes = ReleaseChange.objects.filter(release_date=release_date)
+        if regenerated:
+            previous_changes = { (entity, object_id): (change, fields) for entity, object_id, change, fields in release_changes.values_list('entity', 'object_id', 'change', 'changed_fields') }
+            changes = merge_changes(previous_changes, changes)
+        release_changes.delete()
+        ReleaseChange.objects.bulk_create([
+            ReleaseChange(release_date=release_date, entity=entity, object_id=object_id, change=change, changed_fields=fields)
+            for (entity, object_id), (change, fields) in sorted(changes.items())
+        ], batch_size=chunk_size)
+    return counts
@@ -0,0 +1,180 @@
+import ipaddress
+import logging
+import os
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from catalog.middleware.metrics import format_counters, register_collector
+
+logger = logging.getLogger(__name__)
+
+def parse_network(entry):
+    '''
+    Parse an entry of an IP list: IP address ('10.1.2.3', '2001:db8::1'), CIDR block ('10.1.0.0/20', '2001:db8::/32')
+    or IPv4 prefix in the previous format of the lists ('10.1.' or '10.1', read as '10.1.0.0/16').
+    Raise a ValueError if the entry is not valid.
+    '''
+    entry = entry.strip()
+    if '/' not in entry and ':' not in entry:
+        octets = entry.rstrip('.').split('.')
+        if len(octets) < 4:
+            entry = '.'.join(octets + ['0'] * (4 - len(octets))) + f'/{len(octets) * 8}'
+    return ipaddress.ip_network(entry, strict=False)
+
+
+class IPNetworkTrie:
+    """
+    Binary radix tree of IP networks (one tree for IPv4 and one for IPv6), walked bit by bit from
+    the first bit of the address: the lookup of an address costs at most 32 (IPv4) or 128 (IPv6) steps,
+    whatever the number of networks.
+    Each node is a list [child for bit 0, child for bit 1, network ending at this node].
+    """
+
+    def __init__(self, networks=()):
+        self.roots = {4: [None, None, None], 6: [None, None, None]}
+        self.size = 0
+        for network in networks:
+            self.add(network)
+
+    def add(self, network):
+        node = self.roots[network.version]
+        address = int(network.network_address)
+        for i in range(network.prefixlen):
+            bit = (address >> (network.max_prefixlen - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            self.size += 1
+        node[2] = network
+
+    def match(self, address):
+        ''' Return the most specific network containing the address (ipaddress object), or None '''
+        node = self.roots[address.version]
+        matched = node[2]
+        value = int(address)
+        for i in range(address.max_prefixlen - 1, -1, -1):
+            node = node[(value >> i) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                matched = node[2]
+        return matched
+
+
+class IPList:
+    """
+    List of IP networks, from a setting (list of entries) and optionally from a file (one entry per line,
+    '#' for comments), compiled once into an IPNetworkTrie.
+    The file is checked for changes at most every REST_IP_LISTS_RELOAD_INTERVAL seconds and the list is
+    reloaded when it has been modified, without restarting the server.
+    The matches are counted by network. The invalid entries are ignored when loading the list, but they are
+    logged and their number is exported with the metrics.
+    """
+
+    def __init__(self, setting, file_setting):
+        self.setting = setting
+        self.file_setting = file_setting
+        self.counters = Counter()
+        self.reset()
+
+    def reset(self):
+        self.trie = None
+        self.file_mtime = None
+        self.checked = 0
+        self.invalid_entries = []
+
+    def read_entries(self):
+        entries = list(getattr(settings, self.setting, []))
+        filename = getattr(settings, self.file_setting, None)
+        self.file_mtime = None
+        if filename and os.path.isfile(filename):
+            self.file_mtime = os.path.getmtime(filename)
+            with open(filename) as ip_file:
+                for line in ip_file:
+                    line = line.split('#')[0].strip()
+                    if line:
+                        entries.append(line)
+        return entries
+
+    def load(self):
+        trie = IPNetworkTrie()
+        invalid_entries = []
+        for entry in self.read_entries():
+            try:
+                trie.add(parse_network(entry))
+            except ValueError:
+                invalid_entries.append(entry)
+        if invalid_entries:
+            source = self.setting
+            if getattr(settings, self.file_setting, None):
+                source += f' / {self.file_setting}'
+            logger.warning(f"Invalid entries ignored in the IP list {source}: {', '.join(invalid_entries)}")
+        self.invalid_entries = invalid_entries
+        self.trie = trie
+        self.counters['reloads'] += 1
+
+    def file_changed(self):
+        filename = getattr(settings, self.file_setting, None)
+        if not filename:
+            return False
+        mtime = os.path.getmtime(filename) if os.path.isfile(filename) else None
+        return mtime != self.file_mtime
+
+    def get_trie(self):
+        now = time.monotonic()
+        if self.trie is None:
+            self.load()
+            self.checked = now
+        elif now - self.checked >= settings.REST_IP_LISTS_RELOAD_INTERVAL:
+            self.checked = now
+            if self.file_changed():
+                self.load()
+        return self.trie
+
+    def match(self, ip_address):
+        ''' Return the network of the list containing the IP address (string), or None '''
+        trie = self.get_trie()
+        if not trie.size:
+            return None
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        network = trie.match(address)
+        if network is not None:
+            self.counters[str(network)] += 1
+        return network
+
+    def __contains__(self, ip_address):
+        return self.match(ip_address) is not None
+
+
+ip_lists = {
+    'blacklist': IPList('REST_BLACKLIST_IPS', 'REST_BLACKLIST_IPS_FILE'),
+    'restricted': IPList('REST_RESTRICTED_IPS', 'REST_RESTRICTED_IPS_FILE')
+}
+
+
+@receiver(setting_changed)
+def reset_ip_lists(setting, **kwargs):
+    for ip_list in ip_lists.values():
+        if setting in (ip_list.setting, ip_list.file_setting):
+            ip_list.reset()
+
+
+@register_collector
+def export_ip_lists_counters():
+    samples = []
+    for name, ip_list in ip_lists.items():
+        samples += [((('list', name), ('network', network)), value) for network, value in ip_list.counters.items() if network != 'reloads']
+    lines = format_counters('pgs_ip_list_matches_total', 'Requests matching the IP lists (blacklist and restricted IPs), by network.', samples)
+    lines += format_counters('pgs_ip_list_reloads_total', 'Number of loads of the IP lists.',
+                             [((('list', name),), ip_list.counters['reloads']) for name, ip_list in ip_lists.items()])
+    lines += format_counters('pgs_ip_list_invalid_entries', 'Number of invalid entries ignored when loading the IP lists.',
+                             [((('list', name),), len(ip_list.invalid_entries)) for name, ip_list in ip_lists.items()], 'gauge')
+    return lines
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20, verbose_name='Entity type')),
+                ('object_id', models.CharField(max_length=30, verbose_name='Entity ID')),
+                ('release_date', models.DateField(verbose_name='Release date')),
+                ('data', models.BinaryField(verbose_name='JSON document')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('entity', 'object_id'), name='unique_rest_document')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restdocument',
+            name='data_br',
+            field=models.BinaryField(null=True, verbose_name='JSON document (brotli)'),
+        ),
+        migrations.AddField(
+            model_name='restdocument',
+            name='data_gzip',
+            field=models.BinaryField(null=True, verbose_name='JSON document (gzip)'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.14 on 2026-10-18 07:46
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0002_restdocument_compressed_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('release_date', models.DateField(verbose_name='Release date')),
+                ('entity', models.CharField(max_length=20, verbose_name='Entity type')),
+                ('object_id', models.CharField(max_length=30, verbose_name='Entity ID')),
+                ('change', models.CharField(choices=[('added', 'Added'), ('updated', 'Updated'), ('retired', 'Retired'), ('removed', 'Removed')], max_length=10, verbose_name='Type of change')),
+                ('changed_fields', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, size=None, verbose_name='Changed fields')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['release_date', 'id'], name='release_change_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('release_date', 'entity', 'object_id'), name='unique_release_change')],
+            },
+        ),
+    ]
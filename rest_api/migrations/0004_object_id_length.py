@@ -0,0 +1,23 @@
+# Generated by Django 5.2.14 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0003_releasechange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='releasechange',
+            name='object_id',
+            field=models.CharField(max_length=100, verbose_name='Entity ID'),
+        ),
+        migrations.AlterField(
+            model_name='restdocument',
+            name='object_id',
+            field=models.CharField(max_length=100, verbose_name='Entity ID'),
+        ),
+    ]
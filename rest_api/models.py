@@ -1,3 +1,76 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from catalog.models import Release
 
-# Create your models here.
+
+class RestDocument(models.Model):
+    """ REST API document (pre-encoded JSON) of a PGS Catalog entry, generated once per release """
+    entity = models.CharField('Entity type', max_length=20)
+    object_id = models.CharField('Entity ID', max_length=100)
+    release_date = models.DateField('Release date')
+    data = models.BinaryField('JSON document')
+    # Compressed forms of the JSON document, served as-is to the clients accepting them (see catalog.middleware.compression)
+    data_gzip = models.BinaryField('JSON document (gzip)', null=True)
+    data_br = models.BinaryField('JSON document (brotli)', null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['entity', 'object_id'], name='unique_rest_document')
+        ]
+
+    def __str__(self):
+        return f'{self.entity}: {self.object_id} ({self.release_date})'
+
+    @classmethod
+    def get_documents(cls, entity, ids):
+        '''
+        Return the JSON documents of the given entries, as a dictionary (ID -> bytes),
+        only if they have been generated for the current release.
+        '''
+        current_release_date = Release.objects.order_by('-date').values('date')[:1]
+        documents = cls.objects.filter(entity=entity, object_id__in=ids, release_date=models.Subquery(current_release_date))
+        return { object_id: bytes(data) for object_id, data in documents.values_list('object_id', 'data') }
+
+    @classmethod
+    def get_document(cls, entity, object_id):
+        '''
+        Return the JSON document of an entry and its compressed forms, as a tuple (bytes, dictionary encoding -> bytes),
+        only if it has been generated for the current release (None otherwise).
+        '''
+        current_release_date = Release.objects.order_by('-date').values('date')[:1]
+        document = cls.objects.filter(entity=entity, object_id=object_id, release_date=models.Subquery(current_release_date)).values_list('data', 'data_gzip', 'data_br').first()
+        if not document:
+            return None
+        data, data_gzip, data_br = document
+        variants = { encoding: bytes(value) for encoding, value in (('gzip', data_gzip), ('br', data_br)) if value is not None }
+        return bytes(data), variants
+
+
+class ReleaseChange(models.Model):
+    """
+    Change of a PGS Catalog entry in a release (added, updated or removed), recorded when the REST API documents
+    of the release replace the documents of the previous release (see rest_api.documents.update_documents)
+    """
+    CHANGE_TYPES = [
+        ('added', 'Added'),
+        ('updated', 'Updated'),
+        ('retired', 'Retired'),
+        ('removed', 'Removed')
+    ]
+    release_date = models.DateField('Release date')
+    entity = models.CharField('Entity type', max_length=20)
+    object_id = models.CharField('Entity ID', max_length=100)
+    change = models.CharField('Type of change', max_length=10, choices=CHANGE_TYPES)
+    # Top-level fields of the REST API document which have changed (only for the updated entries)
+    changed_fields = ArrayField(models.CharField(max_length=100), verbose_name='Changed fields', default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['release_date', 'entity', 'object_id'], name='unique_release_change')
+        ]
+        indexes = [
+            models.Index(fields=['release_date', 'id'], name='release_change_date_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.release_date} - {self.entity}: {self.object_id} ({self.change})'
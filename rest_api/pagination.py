@@ -1,7 +1,15 @@
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from collections import OrderedDict
+from .concurrency import run_queries
 
 
 class CustomPagination(LimitOffsetPagination):
@@ -9,8 +17,25 @@ class CustomPagination(LimitOffsetPagination):
     min_limit = 1
     max_limit = 250
 
+    # Keyset (cursor) pagination, only available for the views defining a 'cursor_field'
+    cursor_query_param = 'cursor'
+    cursor_mode = False
+
+    # Count of the results: 'exact' (default), 'estimate' (estimate of the database for the unfiltered lists) or 'false' (no count)
+    count_query_param = 'count'
+    count_modes = ('exact', 'estimate', 'false')
+    count_mode = 'exact'
+
     def get_paginated_response(self, data):
         ''' Customise the head of the pagination response '''
+        if self.cursor_mode:
+            # No count in the cursor mode: it would cost as much as the page itself
+            return Response(OrderedDict([
+                ('size', len(data)),
+                ('next', self.get_next_cursor_link()),
+                ('previous', self.get_previous_cursor_link()),
+                ('results', data)
+            ]))
         return Response(OrderedDict([
             ('size', len(data)),
             ('count', self.count),
@@ -35,4 +60,203 @@ class CustomPagination(LimitOffsetPagination):
                 error_dict['limit'] = error_msg
                 raise ValidationError(error_dict)
 
-        return super(self.__class__, self).paginate_queryset(queryset, request, view)
+        if self.cursor_query_param in request.query_params:
+            return self.paginate_queryset_by_cursor(queryset, request, view)
+
+        return self.paginate_queryset_by_offset(queryset, request, view)
+
+
+    def paginate_queryset_by_offset(self, queryset, request, view):
+        '''
+        Same as LimitOffsetPagination.paginate_queryset, with different ways to count the results (see get_count).
+        The views with 'concurrent_queries' run the count and the page of results (with its prefetch queries)
+        at the same time (see rest_api.concurrency).
+        Without an exact count, one extra result is fetched to know whether there is another page after this one.
+        '''
+        self.request = request
+        self.view = view
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count_mode = self.get_count_mode(request)
+        page_size = self.limit if self.count_mode == 'exact' else self.limit + 1
+
+        get_count = lambda: self.get_count(queryset)
+        get_page = lambda: list(queryset[self.offset:self.offset + page_size])
+        # Concurrent queries only when the count runs a COUNT query (not for the counts from the cache or the estimates)
+        if getattr(view, 'concurrent_queries', False) and hasattr(queryset, 'query') and self.count_mode == 'exact' and not self.is_count_cached(queryset):
+            self.count, results = run_queries(get_count, get_page)
+        else:
+            self.count = get_count()
+            results = get_page() if self.count != 0 else []
+
+        if self.count_mode != 'exact':
+            self.has_next = len(results) > self.limit
+            return results[:self.limit]
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return results
+
+
+    def get_count_mode(self, request):
+        count_mode = request.query_params.get(self.count_query_param, 'exact').lower()
+        if count_mode not in self.count_modes:
+            raise ValidationError({self.count_query_param: f'URL parameter \'{self.count_query_param}\' should be one of: {", ".join(self.count_modes)}'})
+        return count_mode
+
+
+    def get_count(self, queryset):
+        '''
+        Count the results, depending on the 'count' parameter:
+         - 'exact': number of results, stored in the cache for the current release (see get_cached_count)
+         - 'estimate': estimate of the number of rows of the table from the database statistics, for the lists without
+           filter (exact count for the other lists)
+         - 'false': no count (None)
+        '''
+        if self.count_mode == 'false':
+            return None
+        if self.count_mode == 'estimate':
+            count = self.get_estimated_count(queryset)
+            if count is not None:
+                return count
+        return self.get_cached_count(queryset)
+
+
+    def get_cached_count(self, queryset):
+        '''
+        Count the results and store the count in the cache of the responses, namespaced by release
+        (REST_COUNT_CACHE_TIMEOUT), so the count runs once when going through the pages of the results.
+        The cache key is built from the SQL query, i.e. from the normalised filters of the view.
+        '''
+        if not settings.REST_COUNT_CACHE_TIMEOUT or not hasattr(queryset, 'query'):
+            return super().get_count(queryset)
+        key = self.get_count_cache_key(queryset)
+        if key is None:
+            return 0
+        cache = caches[settings.CACHE_MIDDLEWARE_ALIAS]
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(key, count, settings.REST_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+    def get_count_cache_key(self, queryset):
+        ''' Cache key of the count of the results (None if the queryset has no results) '''
+        try:
+            # Same key whatever the ordering and the fields selected
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        view_name = type(self.view).__name__ if self.view else ''
+        return 'count:' + hashlib.sha1(f'{view_name}:{sql}:{params}'.encode()).hexdigest()
+
+
+    def is_count_cached(self, queryset):
+        if not settings.REST_COUNT_CACHE_TIMEOUT:
+            return False
+        key = self.get_count_cache_key(queryset)
+        return key is None or caches[settings.CACHE_MIDDLEWARE_ALIAS].get(key) is not None
+
+
+    def get_estimated_count(self, queryset):
+        ''' Number of rows of the table estimated by PostgreSQL (statistics of the table), only for a queryset without filter '''
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct or query.combinator:
+            return None
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1: no statistics yet (table never analysed)
+        if not row or row[0] < 0:
+            return None
+        return int(row[0])
+
+
+    def get_next_link(self):
+        if self.count_mode == 'exact':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+    def paginate_queryset_by_cursor(self, queryset, request, view):
+        '''
+        Fetch the page of results following (or preceding) the position stored in the cursor,
+        using a filter on the cursor field instead of an offset.
+        The position is the value of the cursor field (e.g. 'num') of the last (or first) result of the previous page.
+        '''
+        cursor_field = getattr(view, 'cursor_field', None)
+        if not cursor_field:
+            raise ValidationError({self.cursor_query_param: f'URL parameter \'{self.cursor_query_param}\' is not supported by this endpoint'})
+
+        self.cursor_mode = True
+        self.request = request
+        self.limit = self.get_limit(request)
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            lookup = 'lt' if reverse else 'gt'
+            queryset = queryset.filter(**{f'{cursor_field}__{lookup}': position})
+        queryset = queryset.order_by(f'-{cursor_field}' if reverse else cursor_field)
+
+        # Fetch one extra result to know whether there is another page after this one
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+
+        if results:
+            self.first_position = getattr(results[0], cursor_field)
+            self.last_position = getattr(results[-1], cursor_field)
+        else:
+            self.first_position = self.last_position = None
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return results
+
+
+    def decode_cursor(self, request):
+        ''' Return the position and the direction stored in the cursor (empty cursor = first page) '''
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            direction, position = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split(':')
+            if direction not in ('n', 'p'):
+                raise ValueError
+            return int(position), direction == 'p'
+        except (TypeError, ValueError, UnicodeError):
+            raise ValidationError({self.cursor_query_param: f'Invalid value for the URL parameter \'{self.cursor_query_param}\''})
+
+
+    def encode_cursor(self, position, reverse=False):
+        ''' Build the cursor URL of a page, starting after (or before if reverse) the given position '''
+        direction = 'p' if reverse else 'n'
+        token = urlsafe_b64encode(f'{direction}:{position}'.encode('ascii')).decode('ascii')
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+
+    def get_next_cursor_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position)
+
+
+    def get_previous_cursor_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
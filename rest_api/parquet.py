@@ -0,0 +1,311 @@
+'''
+Columnar dumps (Parquet files) of the PGS Catalog metadata, written once per release (see release/scripts/ExportParquet.py)
+and served as static downloads by the REST API (/rest/release/<release_date>/parquet/<file>).
+Each table is read by chunks of rows, each chunk being written as a row group of the Parquet file,
+so the memory used doesn't depend on the size of the table.
+The files of a release are listed in a manifest (manifest.json), with their number of rows, columns and SHA-256 checksum.
+pyarrow is only imported to write the dumps (release scripts, see requirements_release.txt), the web app only serves the files.
+'''
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from django.conf import settings
+from django.utils import timezone
+from catalog.models import Score, Performance, Publication, SampleSet, Sample, Cohort, EFOTrait_Ontology, TraitCategory, Metric, Release
+
+
+MANIFEST_FILENAME = 'manifest.json'
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+
+
+def import_pyarrow():
+    ''' Import pyarrow (and its Parquet module), only needed to write the dumps '''
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('The Parquet export requires the package pyarrow (see requirements_release.txt)')
+    return pyarrow
+
+
+def arrow_type(pyarrow, type_name):
+    ''' Arrow type from its name, e.g. 'string', 'int64', 'date32' or 'list<string>' '''
+    if type_name.startswith('list<'):
+        return pyarrow.list_(arrow_type(pyarrow, type_name[5:-1]))
+    return getattr(pyarrow, type_name)()
+
+
+def m2m_values(model, field_name, target=None):
+    '''
+    Column of lists: values of a many-to-many relation of the entries, e.g. the IDs of the traits of the Scores.
+    Read from the table of the relation, with one query per chunk of entries.
+    '''
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source, related = field.m2m_field_name(), field.m2m_reverse_field_name()
+    target_lookup = f'{related}__{target}' if target else f'{related}_id'
+
+    def get_values(pks):
+        values = defaultdict(list)
+        for pk, value in through.objects.filter(**{f'{source}_id__in': pks}).order_by('pk').values_list(f'{source}_id', target_lookup):
+            values[pk].append(value)
+        return [values.get(pk, []) for pk in pks]
+    return get_values
+
+
+def metric_key(metric_name):
+    return re.sub(r'[^a-z0-9]+', '_', metric_name.lower()).strip('_')
+
+
+def performance_metric_columns():
+    '''
+    Columns of the performance metrics, pivoted by metric (short name, or name): estimate, bounds of the
+    confidence interval and standard error, e.g. 'metric_or', 'metric_or_ci_lower', 'metric_or_ci_upper', 'metric_or_se'.
+    Only the first metric of a Performance is kept when several metrics have the same name.
+    '''
+    keys = sorted({ metric_key(name_short or name) for name_short, name in Metric.objects.values_list('name_short', 'name').distinct() })
+
+    @lru_cache(maxsize=1)
+    def get_metrics(pks):
+        metrics = {}
+        for performance_id, name_short, name, estimate, ci, se in Metric.objects.filter(performance_id__in=pks).order_by('id').values_list('performance_id', 'name_short', 'name', 'estimate', 'ci', 'se'):
+            ci_lower = float(ci.lower) if ci and ci.lower is not None else None
+            ci_upper = float(ci.upper) if ci and ci.upper is not None else None
+            metrics.setdefault((performance_id, metric_key(name_short or name)), (estimate, ci_lower, ci_upper, se))
+        return metrics
+
+    def metric_value(key, index):
+        def get_values(pks):
+            metrics = get_metrics(pks)
+            return [metrics[(pk, key)][index] if (pk, key) in metrics else None for pk in pks]
+        return get_values
+
+    columns = []
+    for key in keys:
+        for index, suffix in enumerate(('', '_ci_lower', '_ci_upper', '_se')):
+            columns.append((f'metric_{key}{suffix}', 'float64', metric_value(key, index)))
+    return columns
+
+
+# Tables of the dumps: queryset (ordered by primary key) and columns (name, type, field lookup or function returning
+# the values of a list of primary keys). The columns can also be generated when the table is written ('extra_columns').
+parquet_tables = {
+    'publications': {
+        'queryset': lambda: Publication.objects.order_by('num'),
+        'columns': [
+            ('id', 'string', 'id'),
+            ('title', 'string', 'title'),
+            ('doi', 'string', 'doi'),
+            ('pmid', 'int64', 'PMID'),
+            ('journal', 'string', 'journal'),
+            ('firstauthor', 'string', 'firstauthor'),
+            ('authors', 'string', 'authors'),
+            ('date_publication', 'date32', 'date_publication'),
+            ('date_released', 'date32', 'date_released')
+        ]
+    },
+    'scores': {
+        'queryset': lambda: Score.objects.order_by('num'),
+        'columns': [
+            ('id', 'string', 'id'),
+            ('name', 'string', 'name'),
+            ('publication_id', 'string', 'publication__id'),
+            ('trait_reported', 'string', 'trait_reported'),
+            ('trait_additional', 'string', 'trait_additional'),
+            ('trait_efo_ids', 'list<string>', m2m_values(Score, 'trait_efo')),
+            ('method_name', 'string', 'method_name'),
+            ('method_params', 'string', 'method_params'),
+            ('variants_number', 'int64', 'variants_number'),
+            ('variants_interactions', 'int64', 'variants_interactions'),
+            ('variants_genomebuild', 'string', 'variants_genomebuild'),
+            ('weight_type', 'string', 'weight_type'),
+            ('samples_variants_ids', 'list<int64>', m2m_values(Score, 'samples_variants')),
+            ('samples_training_ids', 'list<int64>', m2m_values(Score, 'samples_training')),
+            ('flag_asis', 'bool_', 'flag_asis'),
+            ('date_released', 'date32', 'date_released'),
+            ('license', 'string', 'license')
+        ]
+    },
+    'performances': {
+        'queryset': lambda: Performance.objects.order_by('num'),
+        'columns': [
+            ('id', 'string', 'id'),
+            ('score_id', 'string', 'score__id'),
+            ('publication_id', 'string', 'publication__id'),
+            ('sampleset_id', 'string', 'sampleset__id'),
+            ('phenotyping_reported', 'string', 'phenotyping_reported'),
+            ('phenotyping_efo_ids', 'list<string>', m2m_values(Performance, 'phenotyping_efo')),
+            ('covariates', 'string', 'covariates'),
+            ('performance_comments', 'string', 'performance_comments'),
+            ('date_released', 'date32', 'date_released')
+        ],
+        'extra_columns': performance_metric_columns
+    },
+    'sample_sets': {
+        'queryset': lambda: SampleSet.objects.order_by('num'),
+        'columns': [
+            ('id', 'string', 'id'),
+            ('sample_ids', 'list<int64>', m2m_values(SampleSet, 'samples'))
+        ]
+    },
+    'samples': {
+        'queryset': lambda: Sample.objects.order_by('id'),
+        'columns': [
+            ('id', 'int64', 'id'),
+            ('sample_number', 'int64', 'sample_number'),
+            ('sample_cases', 'int64', 'sample_cases'),
+            ('sample_controls', 'int64', 'sample_controls'),
+            ('sample_percent_male', 'float64', 'sample_percent_male'),
+            ('phenotyping_free', 'string', 'phenotyping_free'),
+            ('ancestry_broad', 'string', 'ancestry_broad'),
+            ('ancestry_free', 'string', 'ancestry_free'),
+            ('ancestry_country', 'string', 'ancestry_country'),
+            ('ancestry_additional', 'string', 'ancestry_additional'),
+            ('source_gwas_catalog', 'string', 'source_GWAS_catalog'),
+            ('source_pmid', 'int64', 'source_PMID'),
+            ('source_doi', 'string', 'source_DOI'),
+            ('cohorts', 'list<string>', m2m_values(Sample, 'cohorts', 'name_short')),
+            ('cohorts_additional', 'string', 'cohorts_additional')
+        ]
+    },
+    'cohorts': {
+        'queryset': lambda: Cohort.objects.filter(released=True).order_by('id'),
+        'columns': [
+            ('name_short', 'string', 'name_short'),
+            ('name_full', 'string', 'name_full'),
+            ('name_others', 'string', 'name_others')
+        ]
+    },
+    'efo_traits': {
+        'queryset': lambda: EFOTrait_Ontology.objects.order_by('id'),
+        'columns': [
+            ('id', 'string', 'id'),
+            ('label', 'string', 'label'),
+            ('description', 'string', 'description'),
+            ('url', 'string', 'url'),
+            ('synonyms', 'list<string>', 'synonyms_array'),
+            ('mapped_terms', 'list<string>', 'mapped_terms_array'),
+            ('associated_pgs_ids', 'list<string>', m2m_values(EFOTrait_Ontology, 'scores_direct_associations', 'id')),
+            ('child_associated_pgs_ids', 'list<string>', m2m_values(EFOTrait_Ontology, 'scores_child_associations', 'id'))
+        ]
+    },
+    'trait_categories': {
+        'queryset': lambda: TraitCategory.efotraits_ontology.through.objects.order_by('pk'),
+        'columns': [
+            ('trait_id', 'string', 'efotrait_ontology_id'),
+            ('category', 'string', 'traitcategory__label'),
+            ('category_parent', 'string', 'traitcategory__parent')
+        ]
+    },
+    'trait_parents': {
+        'queryset': lambda: EFOTrait_Ontology.child_traits.through.objects.order_by('pk'),
+        'columns': [
+            ('trait_id', 'string', 'to_efotrait_ontology_id'),
+            ('parent_id', 'string', 'from_efotrait_ontology_id')
+        ]
+    }
+}
+
+
+def get_table_columns(name):
+    table = parquet_tables[name]
+    columns = list(table['columns'])
+    if 'extra_columns' in table:
+        columns += table['extra_columns']()
+    return columns
+
+
+def read_chunks(name, columns, chunk_size=1000):
+    ''' Yield the rows of a table by chunks, as dictionaries (column name -> list of values) '''
+    lookups = [source for _, _, source in columns if isinstance(source, str)]
+    rows = parquet_tables[name]['queryset']().values_list('pk', *lookups).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        pks = tuple(row[0] for row in chunk)
+        data = {}
+        index = 1
+        for column_name, _, source in columns:
+            if isinstance(source, str):
+                data[column_name] = [row[index] for row in chunk]
+                index += 1
+            else:
+                data[column_name] = source(pks)
+        yield data
+
+
+def write_table(name, path, chunk_size=1000):
+    ''' Write a table in a Parquet file (one row group per chunk of rows) and return its description for the manifest '''
+    pyarrow = import_pyarrow()
+    columns = get_table_columns(name)
+    schema = pyarrow.schema([(column_name, arrow_type(pyarrow, type_name)) for column_name, type_name, _ in columns])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema, compression='zstd') as writer:
+        for data in read_chunks(name, columns, chunk_size):
+            writer.write_table(pyarrow.Table.from_pydict(data, schema=schema))
+            rows += len(data[columns[0][0]])
+    return {
+        'name': name,
+        'file': f'{name}.parquet',
+        'rows': rows,
+        'size': os.path.getsize(path),
+        'sha256': file_checksum(path),
+        'columns': [{'name': column_name, 'type': type_name} for column_name, type_name, _ in columns]
+    }
+
+
+def file_checksum(path):
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def get_release_dir(release_date):
+    return os.path.join(settings.REST_PARQUET_DIR, str(release_date))
+
+
+def export_parquet(release_date=None, chunk_size=1000):
+    '''
+    Write the Parquet files of the release (default: latest release) and their manifest,
+    replacing the previous files of the release. Return the manifest.
+    '''
+    pyarrow = import_pyarrow()
+    if not release_date:
+        release_date = Release.objects.latest('date').date
+    release_dir = get_release_dir(release_date)
+    # Files written in a temporary directory, renamed once complete
+    tmp_dir = f'{release_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {
+        'release_date': str(release_date),
+        'created': timezone.now().isoformat(timespec='seconds'),
+        'format': f'parquet (pyarrow {pyarrow.__version__})',
+        'tables': [write_table(name, os.path.join(tmp_dir, f'{name}.parquet'), chunk_size) for name in parquet_tables]
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    shutil.rmtree(release_dir, ignore_errors=True)
+    os.replace(tmp_dir, release_dir)
+    return manifest
+
+
+def get_export_file(release_date, filename):
+    ''' Path of a file of the Parquet dumps of a release (manifest or file listed in the manifest), or None '''
+    release_dir = get_release_dir(release_date)
+    manifest_path = os.path.join(release_dir, MANIFEST_FILENAME)
+    if not os.path.isfile(manifest_path):
+        return None
+    if filename == MANIFEST_FILENAME:
+        return manifest_path
+    with open(manifest_path) as manifest_file:
+        files = { table['file'] for table in json.load(manifest_file)['tables'] }
+    return os.path.join(release_dir, filename) if filename in files else None
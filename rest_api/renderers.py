@@ -1,4 +1,14 @@
-from rest_framework.renderers import BrowsableAPIRenderer
+import csv
+import io
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .tabular import format_cell, select_columns, tabular_columns
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 
 class NoOptionBrowsableAPIRenderer(BrowsableAPIRenderer):
     """Overrides the default BrowsableAPIRenderer to disable the OPTIONS button without having to modify the template"""
@@ -6,4 +16,106 @@ class NoOptionBrowsableAPIRenderer(BrowsableAPIRenderer):
     def get_context(self, data, accepted_media_type, renderer_context):
         context = super().get_context(data, accepted_media_type, renderer_context)
         context['options_form'] = None # This disables the rendering of the OPTIONS button
-        return context
\ No newline at end of file
+        return context
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Renders the results as newline delimited JSON (one JSON object per line)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Paginated results: only the list of results is rendered
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(self.render_rows([data], renderer_context))
+
+    def render_rows(self, chunks, renderer_context=None):
+        """Render an iterable of lists of serialized objects, line by line (used by the streaming mode)"""
+        for chunk in chunks:
+            for row in chunk:
+                yield super().render(row, renderer_context=renderer_context) + b'\n'
+
+
+def encode_msgpack_value(value):
+    """Convert the types not supported by MessagePack (dates, decimals, ...) as in the JSON responses"""
+    return JSONEncoder().default(value)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders the data in the MessagePack binary format, with the same structure as the JSON responses (requires the 'msgpack' library)"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_msgpack_value)
+
+    def render_rows(self, chunks, renderer_context=None):
+        """Render an iterable of lists of serialized objects as a sequence of MessagePack objects, one per result (used by the streaming mode)"""
+        packer = msgpack.Packer(default=encode_msgpack_value)
+        for chunk in chunks:
+            yield b''.join(packer.pack(row) for row in chunk)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders the results as CSV, one row per result, with the columns defined for the type of results of the view
+    ('tabular_columns' attribute, see rest_api.tabular), restricted to the fields selected with the parameters
+    'fields' or 'exclude'. The error messages are rendered with their own columns.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    delimiter = ','
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.status_code >= 400:
+            columns = [(key, lambda row, key=key: row.get(key)) for key in data]
+            return b''.join(self.render_rows([[data]], renderer_context, columns))
+        # Paginated results: only the list of results is rendered
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        if not isinstance(data, list):
+            # Detail endpoint: no row if the entry doesn't exist
+            data = [data] if data else []
+        return b''.join(self.render_rows([data], renderer_context))
+
+    def render_rows(self, chunks, renderer_context=None, columns=None):
+        """Render an iterable of lists of serialized objects: header, then one row per object (used by the streaming mode)"""
+        if columns is None:
+            view = renderer_context['view']
+            fields = view.get_sparse_fields() if hasattr(view, 'get_sparse_fields') else None
+            columns = select_columns(tabular_columns[view.tabular_columns], fields)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=self.delimiter, lineterminator='\n')
+
+        def flush():
+            content = buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+            return content
+
+        writer.writerow([name for name, _ in columns])
+        yield flush()
+        for chunk in chunks:
+            for row in chunk:
+                writer.writerow([format_cell(get_value(row)) for _, get_value in columns])
+            yield flush()
+
+
+class TSVRenderer(CSVRenderer):
+    """Renders the results as tab-separated values (see CSVRenderer)"""
+    media_type = 'text/tab-separated-values'
+    format = 'tsv'
+    delimiter = '\t'
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from django.conf import settings
+from .ip_lists import ip_lists
 
 
 #class SafelistPermission(permissions.BasePermission):
@@ -19,15 +19,13 @@ from django.conf import settings
 
 class BlacklistPermission(permissions.BasePermission):
     """
-    Check if the request's IP address is on the blacklist configured in Django settings.
+    Check if the request's IP address is on the blacklist configured in Django settings
+    (REST_BLACKLIST_IPS and the file REST_BLACKLIST_IPS_FILE: IP addresses or CIDR blocks, see rest_api.ip_lists).
+    The IP addresses on the restricted list (REST_RESTRICTED_IPS) are allowed, with a stricter rate limit (see rest_api.throttling).
     """
 
     def has_permission(self, request, view):
 
         remote_addr = request.META['REMOTE_ADDR']
 
-        for backlist_ip in settings.REST_BLACKLIST_IPS:
-            if remote_addr == backlist_ip or remote_addr.startswith(backlist_ip):
-                return False
-
-        return True
+        return remote_addr not in ip_lists['blacklist']
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+
+default_urls = [
+    '/rest/score/all?limit=100',
+    '/rest/performance/all?limit=100',
+    '/rest/performance/search?pgs_id=PGS000001',
+    '/rest/score/search?trait_id=EFO_0000305',
+    '/rest/publication/all?limit=100',
+    '/rest/sample_set/all?limit=100'
+]
+
+
+def run_wsgi(urls, concurrency):
+    ''' Send the requests through the WSGI handler, from 'concurrency' threads (as the threads of a WSGI server) '''
+    def get(url):
+        return Client().get(url).status_code
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(get, urls))
+
+
+def run_asgi(urls, concurrency):
+    ''' Send the requests through the ASGI handler, with 'concurrency' requests at a time on the event loop '''
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+        async def get(url):
+            async with semaphore:
+                response = await client.get(url)
+                return response.status_code
+        return await asyncio.gather(*(get(url) for url in urls))
+    return asyncio.run(run())
+
+
+def run(*args):
+    """
+        Compare the throughput of the REST API served through the WSGI and the ASGI handlers, with and without
+        the concurrent queries of the paginated lists (settings.REST_CONCURRENT_QUERIES), using the local database.
+        The caches of the responses are disabled, so each request runs its queries.
+        `python manage.py runscript benchmark_asgi`
+        To choose the URLs, the number of requests per URL and the number of concurrent requests:
+        `python manage.py runscript benchmark_asgi --script-args urls="/rest/score/all|/rest/trait/all" repeat=20 concurrency=8`
+    """
+    urls = default_urls
+    repeat = 10
+    concurrency = 8
+    for arg in args:
+        if arg.startswith('urls='):
+            urls = arg.split('=', 1)[1].split('|')
+        elif arg.startswith('repeat='):
+            repeat = int(arg.split('=', 1)[1])
+        elif arg.startswith('concurrency='):
+            concurrency = int(arg.split('=', 1)[1])
+
+    requests = urls * repeat
+    caches = {**settings.CACHES, 'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    no_rate_limit = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None, 'restricted': None}}
+
+    print(f'# Requests: {len(requests)} ({len(urls)} URLs x {repeat}) | concurrent requests: {concurrency}')
+    print(f'{"handler":<8} {"concurrent queries":<19} {"time (s)":>9} {"requests/s":>11} {"errors":>7}')
+    with override_settings(CACHES=caches, REST_FRAMEWORK=no_rate_limit, REST_DOCUMENT_STORE=False):
+        for concurrent_queries in (False, True):
+            with override_settings(REST_CONCURRENT_QUERIES=concurrent_queries):
+                for name, send_requests in (('WSGI', run_wsgi), ('ASGI', run_asgi)):
+                    # Warm up (connections, caches of the database)
+                    send_requests(urls, concurrency)
+                    start = time.perf_counter()
+                    status_codes = send_requests(requests, concurrency)
+                    duration = time.perf_counter() - start
+                    errors = len([code for code in status_codes if code != 200])
+                    print(f'{name:<8} {str(concurrent_queries):<19} {duration:>9.2f} {len(requests) / duration:>11.1f} {errors:>7}')
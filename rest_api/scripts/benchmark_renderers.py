@@ -0,0 +1,59 @@
+import gzip
+import json
+import time
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from rest_api.renderers import CSVRenderer, MessagePackRenderer, msgpack
+from rest_api.views import RestListCohorts, RestListPerformances, RestListScores, RestListSampleSets
+
+
+default_endpoints = {
+    'score': ('/rest/score/all?limit=250', RestListScores),
+    'performance': ('/rest/performance/all?limit=250', RestListPerformances),
+    'sample_set': ('/rest/sample_set/all?limit=250', RestListSampleSets),
+    'cohort': ('/rest/cohort/all?limit=250', RestListCohorts)
+}
+
+
+def run(*args):
+    """
+        Compare the JSON, MessagePack and CSV formats of the REST API: encoding (and decoding) time and size of
+        the payload (raw and gzip compressed), for a page of results of each tabular endpoint.
+        `python manage.py runscript benchmark_renderers`
+        To choose the number of repetitions:
+        `python manage.py runscript benchmark_renderers --script-args repeat=50`
+    """
+    repeat = 20
+    for arg in args:
+        if arg.startswith('repeat='):
+            repeat = int(arg.split('=', 1)[1])
+
+    renderers = {'json': JSONRenderer(), 'csv': CSVRenderer()}
+    decoders = {'json': json.loads}
+    if msgpack:
+        renderers['msgpack'] = MessagePackRenderer()
+        decoders['msgpack'] = msgpack.unpackb
+    else:
+        print('# msgpack is not installed: MessagePack format not tested')
+
+    client = Client()
+    print(f'# Repetitions: {repeat}')
+    print(f'{"endpoint":<12} {"format":<8} {"results":>8} {"encode (ms)":>12} {"decode (ms)":>12} {"size (KB)":>10} {"gzip (KB)":>10}')
+    for name, (url, view_class) in default_endpoints.items():
+        data = client.get(url, HTTP_ACCEPT='application/json').json()
+        renderer_context = {'view': view_class()}
+        for format, renderer in renderers.items():
+            start = time.perf_counter()
+            for i in range(repeat):
+                content = renderer.render(data, renderer_context=renderer_context)
+            encode_time = (time.perf_counter() - start) * 1000 / repeat
+
+            decode_time = ''
+            if format in decoders:
+                start = time.perf_counter()
+                for i in range(repeat):
+                    decoders[format](content)
+                decode_time = f'{(time.perf_counter() - start) * 1000 / repeat:.2f}'
+
+            gzip_size = len(gzip.compress(content, compresslevel=6))
+            print(f'{name:<12} {format:<8} {len(data["results"]):>8} {encode_time:>12.2f} {decode_time:>12} {len(content) / 1024:>10.1f} {gzip_size / 1024:>10.1f}')
@@ -0,0 +1,56 @@
+import time
+from django.db import connection
+from catalog.models import EFOTrait_Ontology
+from rest_api.search import search_traits, search_traits_regex
+
+
+default_terms = ['breast carcinoma', 'type 2 diabetes mellitus', 'Cancer', 'body mass index', 'heart', 'NCIT:C4872', 'EFO_0000305']
+
+
+def run(*args):
+    """
+        Compare the indexed trait search (REST endpoint '/rest/trait/search') with the previous regex/join based search:
+        result sets, query plans and timings.
+        `python manage.py runscript benchmark_trait_search`
+        To choose the search terms and the number of repetitions:
+        `python manage.py runscript benchmark_trait_search --script-args terms="breast carcinoma|Cancer" repeat=20`
+    """
+    terms = default_terms
+    repeat = 10
+    for arg in args:
+        if arg.startswith('terms='):
+            terms = arg.split('=', 1)[1].split('|')
+        elif arg.startswith('repeat='):
+            repeat = int(arg.split('=', 1)[1])
+
+    print(f'# Traits: {EFOTrait_Ontology.objects.count()} | repetitions: {repeat}')
+    print(f'{"term":<30} {"exact":<6} {"children":<9} {"results":>8} {"regex (ms)":>11} {"indexed (ms)":>13} {"speedup":>8}')
+    total_times = {'regex': 0, 'indexed': 0}
+    for term in terms:
+        for exact in (True, False):
+            for include_children in (True, False):
+                times = {}
+                results = {}
+                for name, search in (('regex', search_traits_regex), ('indexed', search_traits)):
+                    start = time.perf_counter()
+                    for i in range(repeat):
+                        ids = set(search(term, exact, include_children).values_list('id', flat=True))
+                    times[name] = (time.perf_counter() - start) * 1000 / repeat
+                    total_times[name] += times[name]
+                    results[name] = ids
+                speedup = times['regex'] / times['indexed'] if times['indexed'] else 0
+                print(f'{term[:30]:<30} {str(exact):<6} {str(include_children):<9} {len(results["indexed"]):>8} {times["regex"]:>11.2f} {times["indexed"]:>13.2f} {speedup:>7.1f}x')
+                if results['regex'] != results['indexed']:
+                    print(f'  /!\\ Different results - regex only: {sorted(results["regex"] - results["indexed"])} | indexed only: {sorted(results["indexed"] - results["regex"])}')
+
+    print(f'\n# Total - regex: {total_times["regex"]:.2f} ms | indexed: {total_times["indexed"]:.2f} ms')
+
+    # Query plans of the first term
+    for name, search in (('regex', search_traits_regex), ('indexed', search_traits)):
+        for exact in (True, False):
+            queryset = search(terms[0], exact, True).values_list('id', flat=True)
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN ANALYZE {sql}', params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            print(f'\n# Query plan - {name} (exact={exact}):\n{plan}')
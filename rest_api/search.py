@@ -0,0 +1,52 @@
+from django.db.models import Q
+from catalog.models import EFOTrait_Ontology, TraitCategory
+
+
+def search_traits(term, exact=False, include_children=True):
+    '''
+    Search the EFOTrait_Ontology entries matching a term, in the trait ID, label, synonyms, mapped terms
+    and categories (and in the ID/label of the parent traits with 'include_children').
+    Each condition is an indexed lookup on the trait table or a subquery returning trait IDs,
+    so the query doesn't need any join nor 'distinct()':
+     - exact: equality on the columns and containment ('@>') on the synonyms/mapped terms arrays (GIN indexes)
+     - not exact: case insensitive substring ('icontains'), using the trigram indexes when available
+    '''
+    categories = TraitCategory.efotraits_ontology.through.objects
+    parents = EFOTrait_Ontology.child_traits.through.objects
+    if exact:
+        query = (
+            Q(id=term) | Q(label=term) | Q(synonyms_array__contains=[term]) | Q(mapped_terms_array__contains=[term]) |
+            Q(id__in=categories.filter(traitcategory__label=term).values('efotrait_ontology_id'))
+        )
+        parents_query = Q(from_efotrait_ontology_id=term) | Q(from_efotrait_ontology__label=term)
+    else:
+        query = (
+            Q(id=term) | Q(label__icontains=term) | Q(synonyms__icontains=term) | Q(mapped_terms__icontains=term) |
+            Q(id__in=categories.filter(traitcategory__label__icontains=term).values('efotrait_ontology_id'))
+        )
+        parents_query = Q(from_efotrait_ontology_id=term) | Q(from_efotrait_ontology__label__icontains=term)
+    if include_children:
+        query |= Q(id__in=parents.filter(parents_query).values('to_efotrait_ontology_id'))
+    return EFOTrait_Ontology.objects.filter(query)
+
+
+def search_traits_regex(term, exact=False, include_children=True):
+    '''
+    Previous implementation of the trait search (regular expressions on the synonyms/mapped terms and joins
+    on the categories and parent traits), kept to benchmark the indexed search (see rest_api/scripts/benchmark_trait_search.py).
+    '''
+    if exact:
+        query = (
+            Q(id=term) | Q(label=term) | Q(synonyms__regex=r'(^|\| )'+term+r'( \||$)') |
+            Q(mapped_terms__regex=r'(^|\| )'+term+r'( \||$)') | Q(traitcategory__label=term)
+        )
+        if include_children:
+            query |= Q(parent_traits__id=term) | Q(parent_traits__label=term)
+    else:
+        query = (
+            Q(id=term) | Q(label__icontains=term) | Q(synonyms__icontains=term) | Q(mapped_terms__icontains=term) |
+            Q(traitcategory__label__icontains=term)
+        )
+        if include_children:
+            query |= Q(parent_traits__id=term) | Q(parent_traits__label__icontains=term)
+    return EFOTrait_Ontology.objects.filter(query).distinct()
@@ -1,5 +1,23 @@
 from rest_framework import serializers
 from catalog.models import *
+from .models import ReleaseChange
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Only return the fields listed in the serializer context ('fields'), when provided.
+    The selection only applies to the top level serializer, not to the nested ones.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected_fields = self.context.get('fields')
+        if selected_fields is None:
+            return fields
+        is_top_level = self.parent is None or (isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None)
+        if not is_top_level:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected_fields}
 
 
 class CohortSerializer(serializers.ModelSerializer):
@@ -138,7 +156,7 @@ class PublicationSerializer(serializers.ModelSerializer):
         read_only_fields = meta_fields
 
 
-class PublicationExtendedSerializer(PublicationSerializer):
+class PublicationExtendedSerializer(SparseFieldsSerializerMixin, PublicationSerializer):
     date_release = serializers.SerializerMethodField('get_date_released')
 
     class Meta(PublicationSerializer.Meta):
@@ -151,7 +169,7 @@ class PublicationExtendedSerializer(PublicationSerializer):
         return obj.date_released
 
 
-class ScoreSerializer(serializers.ModelSerializer):
+class ScoreSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     publication = PublicationSerializer(many=False, read_only=True)
     samples_variants = SampleSerializer(many=True, read_only=True)
     samples_training = SampleSerializer(many=True, read_only=True)
@@ -179,7 +197,7 @@ class ScoreSerializer(serializers.ModelSerializer):
         return obj.date_released
 
 
-class PerformanceSerializer(serializers.ModelSerializer):
+class PerformanceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     phenotype_efo = EFOTraitSerializer(many=True, read_only=True)
     publication = PublicationSerializer(many=False, read_only=True)
     sampleset = SampleSetSerializer(many=False, read_only=True)
@@ -202,6 +220,16 @@ class ReleaseSerializer(serializers.ModelSerializer):
         read_only_fields = meta_fields
 
 
+class ReleaseChangeSerializer(serializers.ModelSerializer):
+    id = serializers.CharField(source='object_id')
+
+    class Meta:
+        model = ReleaseChange
+        meta_fields = ('release_date', 'entity', 'id', 'change', 'changed_fields')
+        fields = meta_fields
+        read_only_fields = meta_fields
+
+
 class TraitCategorySerializer(serializers.ModelSerializer):
     efotraits = EFOTraitSerializer(many=True, read_only=True)
 
@@ -0,0 +1,194 @@
+'''
+Columns of the tabular formats (CSV/TSV, see rest_api.renderers) for each type of result: one row per result,
+the nested objects (publication, samples, traits, metrics, ...) being flattened into columns.
+Each column is a tuple (name, function returning the value of the column from the serialized result), the function
+having the name of the field of the result it reads ('field' attribute), to only render the columns of the fields
+selected with the parameters 'fields' or 'exclude'.
+The lists of values are joined with LIST_SEPARATOR.
+'''
+
+LIST_SEPARATOR = '|'
+
+
+def source_field(path):
+    ''' Field of the result read by a column, from the path of its value (field name or tuple of keys) '''
+    return path[0] if isinstance(path, tuple) else path
+
+
+def field(*path):
+    ''' Value of a (nested) field, e.g. field('publication', 'id') '''
+    def get_value(row):
+        for key in path:
+            if not isinstance(row, dict):
+                return None
+            row = row.get(key)
+        return row
+    get_value.field = path[0]
+    return get_value
+
+
+def list_field(path, key):
+    ''' Values of a field of the objects in a list, e.g. list_field('trait_efo', 'id') '''
+    get_list = field(*path) if isinstance(path, tuple) else field(path)
+    def get_values(row):
+        return [item.get(key) for item in get_list(row) or []]
+    get_values.field = source_field(path)
+    return get_values
+
+
+def samples_number(path):
+    ''' Total number of individuals of a list of samples '''
+    get_samples = field(*path) if isinstance(path, tuple) else field(path)
+    def get_value(row):
+        numbers = [sample.get('sample_number') for sample in get_samples(row) or [] if sample.get('sample_number') is not None]
+        return sum(numbers) if numbers else None
+    get_value.field = source_field(path)
+    return get_value
+
+
+def samples_cohorts(path):
+    ''' Short names of the cohorts of a list of samples (without duplicates) '''
+    get_samples = field(*path) if isinstance(path, tuple) else field(path)
+    def get_values(row):
+        cohorts = []
+        for sample in get_samples(row) or []:
+            for cohort in sample.get('cohorts') or []:
+                if cohort['name_short'] not in cohorts:
+                    cohorts.append(cohort['name_short'])
+        return cohorts
+    get_values.field = source_field(path)
+    return get_values
+
+
+def list_length(path):
+    ''' Number of items of a list field '''
+    get_list = field(*path) if isinstance(path, tuple) else field(path)
+    def get_value(row):
+        return len(get_list(row) or [])
+    get_value.field = source_field(path)
+    return get_value
+
+
+def format_metric(metric):
+    ''' e.g. "OR: 1.55 [1.32, 1.79] (per SD)" or "C-index: 0.622 (SE: 0.0112)" '''
+    value = f'{metric["name_short"]}: {metric["estimate"]}'
+    if 'ci_lower' in metric:
+        value += f' [{metric["ci_lower"]}, {metric["ci_upper"]}]'
+    elif 'se' in metric:
+        value += f' (SE: {metric["se"]})'
+    if metric.get('unit'):
+        value += f' ({metric["unit"]})'
+    return value
+
+
+def metrics(metric_type):
+    ''' Metrics of a type ('effect_sizes', 'class_acc' or 'othermetrics') of a performance '''
+    def get_values(row):
+        return [format_metric(metric) for metric in (row.get('performance_metrics') or {}).get(metric_type, [])]
+    get_values.field = 'performance_metrics'
+    return get_values
+
+
+def associated_pgs_ids(key):
+    def get_values(row):
+        return (row.get('associated_pgs_ids') or {}).get(key, [])
+    get_values.field = 'associated_pgs_ids'
+    return get_values
+
+
+publication_columns = [
+    ('publication_id', field('publication', 'id')),
+    ('publication_pmid', field('publication', 'PMID')),
+    ('publication_doi', field('publication', 'doi')),
+    ('publication_firstauthor', field('publication', 'firstauthor')),
+    ('publication_journal', field('publication', 'journal')),
+    ('publication_date', field('publication', 'date_publication'))
+]
+
+tabular_columns = {
+    'score': [
+        ('id', field('id')),
+        ('name', field('name')),
+        ('trait_reported', field('trait_reported')),
+        ('trait_additional', field('trait_additional')),
+        ('trait_efo_ids', list_field('trait_efo', 'id')),
+        ('trait_efo_labels', list_field('trait_efo', 'label')),
+        ('method_name', field('method_name')),
+        ('method_params', field('method_params')),
+        ('variants_number', field('variants_number')),
+        ('variants_interactions', field('variants_interactions')),
+        ('variants_genomebuild', field('variants_genomebuild')),
+        ('weight_type', field('weight_type')),
+        ('samples_variants_number', samples_number('samples_variants')),
+        ('samples_variants_ancestry', list_field('samples_variants', 'ancestry_broad')),
+        ('samples_variants_cohorts', samples_cohorts('samples_variants')),
+        ('samples_training_number', samples_number('samples_training')),
+        ('samples_training_ancestry', list_field('samples_training', 'ancestry_broad')),
+        ('samples_training_cohorts', samples_cohorts('samples_training')),
+        *publication_columns,
+        ('matches_publication', field('matches_publication')),
+        ('ftp_scoring_file', field('ftp_scoring_file')),
+        ('ftp_harmonized_scoring_file_grch37', field('ftp_harmonized_scoring_files', 'GRCh37', 'positions')),
+        ('ftp_harmonized_scoring_file_grch38', field('ftp_harmonized_scoring_files', 'GRCh38', 'positions')),
+        ('date_release', field('date_release')),
+        ('license', field('license'))
+    ],
+    'performance': [
+        ('id', field('id')),
+        ('associated_pgs_id', field('associated_pgs_id')),
+        ('phenotyping_reported', field('phenotyping_reported')),
+        ('phenotype_efo_ids', list_field('phenotype_efo', 'id')),
+        ('phenotype_efo_labels', list_field('phenotype_efo', 'label')),
+        ('sampleset_id', field('sampleset', 'id')),
+        ('sampleset_number', samples_number(('sampleset', 'samples'))),
+        ('sampleset_ancestry', list_field(('sampleset', 'samples'), 'ancestry_broad')),
+        ('sampleset_cohorts', samples_cohorts(('sampleset', 'samples'))),
+        ('effect_sizes', metrics('effect_sizes')),
+        ('classification_metrics', metrics('class_acc')),
+        ('other_metrics', metrics('othermetrics')),
+        ('covariates', field('covariates')),
+        ('performance_comments', field('performance_comments')),
+        *publication_columns
+    ],
+    'sample_set': [
+        ('id', field('id')),
+        ('samples_count', list_length('samples')),
+        ('samples_number', samples_number('samples')),
+        ('samples_cases', list_field('samples', 'sample_cases')),
+        ('samples_controls', list_field('samples', 'sample_controls')),
+        ('samples_percent_male', list_field('samples', 'sample_percent_male')),
+        ('samples_ancestry', list_field('samples', 'ancestry_broad')),
+        ('samples_ancestry_country', list_field('samples', 'ancestry_country')),
+        ('samples_phenotyping', list_field('samples', 'phenotyping_free')),
+        ('samples_cohorts', samples_cohorts('samples'))
+    ],
+    'cohort': [
+        ('name_short', field('name_short')),
+        ('name_full', field('name_full')),
+        ('name_others', field('name_others')),
+        ('associated_pgs_ids_development', associated_pgs_ids('development')),
+        ('associated_pgs_ids_evaluation', associated_pgs_ids('evaluation'))
+    ],
+    'release_change': [
+        ('release_date', field('release_date')),
+        ('entity', field('entity')),
+        ('id', field('id')),
+        ('change', field('change')),
+        ('changed_fields', field('changed_fields'))
+    ]
+}
+
+
+def select_columns(columns, fields):
+    ''' Columns of the selected fields of the results (all the columns if fields is None) '''
+    if fields is None:
+        return columns
+    return [column for column in columns if column[1].field in fields]
+
+
+def format_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join('' if item is None else str(item) for item in value)
+    return str(value)
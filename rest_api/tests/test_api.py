@@ -1,8 +1,18 @@
-from django.test import TestCase
+import json
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
+from catalog.models import Cohort, GwasScoreAssociation, Performance, Retired
 from core.testing import CurationTestCase
+from rest_api.views import RestBatch
 
 
 class ErrorRestTest(TestCase):
@@ -54,6 +64,39 @@ class ScoreRestTest(CurationTestCase):
         self.assertEqual(len(response.data['results']), 2)
 
 
+class SampleSetSearchRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_sample_set_search(self):
+        # Second evaluation of PGS000002 on the Sample Set PSS000001
+        Performance.objects.create(num=3, id='PPM000003', score_id=2, sampleset_id=1, publication_id=2)
+        url = reverse('searchSampleSet')
+
+        response = self.client.get(url, {'pgs_id': 'pgs000002'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([x['id'] for x in response.data['results']], ['PSS000001', 'PSS000002'])
+
+        # Distinct Sample Sets (2 evaluations on PSS000001 from PGP000001 and PGP000002)
+        response = self.client.get(url, {'pgs_id': 'PGS000001'})
+        self.assertEqual([x['id'] for x in response.data['results']], ['PSS000001'])
+        self.assertEqual(len(response.data['results'][0]['samples']), 2)
+
+        # Filters applied to the same Performance
+        response = self.client.get(url, {'pgs_id': 'PGS000001', 'pgp_id': 'PGP000002'})
+        self.assertEqual(response.data['count'], 0)
+
+        # Paginated in the database
+        response = self.client.get(url, {'pgp_id': 'PGP000002', 'limit': 1, 'offset': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([x['id'] for x in response.data['results']], ['PSS000002'])
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 0)
+
+
 class GCSTRestTest(CurationTestCase):
 
     # Load data in DB - Must live in the rest_api/fixtures/ directory
@@ -67,3 +110,263 @@ class GCSTRestTest(CurationTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, ["PGS000001","PGS000002"])
+
+        # From the GWAS/Score associations table
+        self.assertEqual(GwasScoreAssociation.update_associations(), 3)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                        reverse('pgs_score_ids_from_gwas_gcst_id', kwargs={'gcst_id': id.lower()}))
+        self.assertEqual(response.data, ["PGS000001","PGS000002"])
+
+    def test_gcst_batch(self):
+        url = reverse('pgs_score_ids_from_gwas_gcst_ids')
+        expected = {'GCST001937': ['PGS000001','PGS000002'], 'GCST004988': ['PGS000002'], 'GCST000000': []}
+
+        # One query on the associations table, including for the unknown GCST IDs
+        self.assertEqual(GwasScoreAssociation.update_associations(), 3)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'filter_ids': 'GCST001937,gcst004988,GCST000000'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected)
+
+        response = self.client.generic('GET', url, json.dumps({'filter_ids': ['GCST004988']}), content_type='application/json')
+        self.assertEqual(response.data, {'GCST004988': ['PGS000002']})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        # Reset the throttling history left by the previous tests
+        cache.clear()
+
+    def post_ids(self, ids):
+        return self.client.post(reverse('getBatch'), json.dumps({'filter_ids': ids}), content_type='application/json')
+
+    def test_batch(self):
+        Retired.objects.create(id='PGS000010', doi='10.1000/retired')
+        ids = ['pgs000002', 'PGP000001', 'PPM000001', 'PSS000001', 'efo:0000305', 'PGS000001', 'PGS000010', 'PGS999999', 'PGS000002']
+        response = self.post_ids(ids)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['results'].keys()), ['PGS000002', 'PGP000001', 'PPM000001', 'PSS000001', 'EFO_0000305', 'PGS000001'])
+        self.assertEqual(response.data['size'], 6)
+        self.assertEqual(response.data['not_found'], ['PGS999999'])
+        self.assertEqual(response.data['retired'], ['PGS000010'])
+        # Same data as the detail endpoints
+        for id, endpoint, kwargs in (('PGS000002', 'getScore', {'pgs_id': 'PGS000002'}), ('PSS000001', 'getSampleSet', {'pss_id': 'PSS000001'})):
+            self.assertEqual(response.json()['results'][id], self.client.get(reverse(endpoint, kwargs=kwargs)).json())
+
+    def test_batch_errors(self):
+        self.assertEqual(self.post_ids([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(reverse('getBatch')).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post_ids([f'PGS{i:06d}' for i in range(RestBatch.max_ids + 1)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('getBatch')).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_throttle_cost(self):
+        # One token of the rate limit per group of IDs
+        batch_request = Request(APIRequestFactory().post(reverse('getBatch'), {'filter_ids': [f'PGS{i:06d}' for i in range(250)]}, format='json'), parsers=[JSONParser()])
+        self.assertEqual(RestBatch().get_throttle_cost(batch_request), 3)
+        response = self.post_ids(['PGS000001', 'PGS000002'])
+        self.assertEqual(response['X-RateLimit-Cost'], '1')
+
+
+class SparseFieldsRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def get_queries(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields(self):
+        url = reverse('getAllScores')
+        fields = ['id', 'name', 'ftp_scoring_file', 'trait_efo']
+        full_results = self.client.get(url).json()['results']
+        response, sql = self.get_queries(url, {'fields': 'trait_efo,id,name,ftp_scoring_file'})
+        results = response.json()['results']
+        self.assertEqual([list(x.keys()) for x in results], [fields, fields])
+        self.assertEqual(results, [{field: x[field] for field in fields} for x in full_results])
+        # The relations of the other fields are not queried
+        for table in ('catalog_publication', 'catalog_sample', 'catalog_cohort'):
+            self.assertNotIn(table, sql)
+        self.assertIn('catalog_efotrait', sql)
+
+        # Same selection for the detail, search and stream endpoints
+        response, sql = self.get_queries(reverse('getScore', kwargs={'pgs_id': 'PGS000001'}), {'fields': 'id,trait_efo'})
+        self.assertEqual(list(response.json().keys()), ['id', 'trait_efo'])
+        response, sql = self.get_queries(reverse('searchScores'), {'pgp_id': 'PGP000001', 'exclude': 'samples_variants,samples_training,publication'})
+        self.assertNotIn('publication', response.json()['results'][0])
+        self.assertNotIn('catalog_sample', sql)
+        response = self.client.get(url, {'format': 'ndjson', 'stream': 1, 'fields': 'id'})
+        self.assertEqual(b''.join(response.streaming_content), b'{"id":"PGS000001"}\n{"id":"PGS000002"}\n')
+
+    def test_fields_performance(self):
+        response, sql = self.get_queries(reverse('getAllPerformanceMetrics'), {'fields': 'id,associated_pgs_id,performance_metrics'})
+        self.assertEqual(list(response.json()['results'][0].keys()), ['id', 'associated_pgs_id', 'performance_metrics'])
+        self.assertNotIn('catalog_sample', sql)
+        response, sql = self.get_queries(reverse('getPublication', kwargs={'pgp_id': 'PGP000001'}), {'exclude': 'associated_pgs_ids'})
+        self.assertNotIn('associated_pgs_ids', response.json())
+        self.assertNotIn('catalog_score', sql)
+
+    def test_unknown_fields(self):
+        response = self.client.get(reverse('getAllScores'), {'fields': 'id,pizza'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pizza', response.json()['message'])
+
+
+class CursorPaginationRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_cursor_pages(self):
+        response = self.client.get(reverse('getAllScores'), {'cursor': '', 'limit': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual([x['id'] for x in response.data['results']], ['PGS000001'])
+        self.assertIsNone(response.data['previous'])
+
+        # Follow the 'next' link
+        response = self.client.get(response.data['next'])
+        self.assertEqual([x['id'] for x in response.data['results']], ['PGS000002'])
+        self.assertIsNone(response.data['next'])
+
+        # Go back with the 'previous' link
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([x['id'] for x in response.data['results']], ['PGS000001'])
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_cursor_all_results(self):
+        for endpoint in ('getAllScores', 'getAllPerformanceMetrics', 'getAllPublications', 'getAllSampleSets'):
+            offset_response = self.client.get(reverse(endpoint))
+            cursor_response = self.client.get(reverse(endpoint), {'cursor': ''})
+
+            self.assertEqual(cursor_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(cursor_response.json()['results'], offset_response.json()['results'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('getAllScores'), {'cursor': 'not_a_cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Endpoint without cursor support
+        response = self.client.get(reverse('getAllCohorts'), {'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CountPaginationRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_no_count(self):
+        response = self.client.get(reverse('getAllScores'), {'count': 'false', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(response.data['size'], 1)
+        self.assertEqual([x['id'] for x in response.data['results']], ['PGS000001'])
+
+        # Follow the 'next' link
+        response = self.client.get(response.data['next'])
+        self.assertEqual([x['id'] for x in response.data['results']], ['PGS000002'])
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE catalog_score')
+        response = self.client.get(reverse('getAllScores'), {'count': 'estimate', 'limit': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertIsNotNone(response.data['next'])
+        # Exact count for the filtered lists
+        response = self.client.get(reverse('getAllScores'), {'count': 'estimate', 'filter_ids': 'PGS000002'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_invalid_count(self):
+        response = self.client.get(reverse('getAllScores'), {'count': 'approximate'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_COUNT_CACHE_TIMEOUT=60)
+    def test_cached_count(self):
+        caches['responses'].clear()
+        url = reverse('searchPerformanceMetrics')
+        response = self.client.get(url, {'pgs_id': 'PGS000001', 'limit': 1})
+        self.assertEqual(response.data['count'], 1)
+        # The next pages (and the same filters in another order) use the count stored in the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': 1, 'offset': 1, 'pgs_id': 'pgs000001'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        caches['responses'].clear()
+
+
+class StreamRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_stream_ndjson(self):
+        for endpoint in ('getAllScores', 'getAllPerformanceMetrics', 'getAllTraits', 'getAllPublications', 'getAllCohorts'):
+            paginated_response = self.client.get(reverse(endpoint))
+            response = self.client.get(reverse(endpoint), {'format': 'ndjson', 'stream': 1})
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            self.assertEqual([json.loads(line) for line in lines], paginated_response.json()['results'])
+
+    def test_stream_json_not_supported(self):
+        response = self.client.get(reverse('getAllScores'), {'stream': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CohortRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_cohort_names(self):
+        # Regex special characters in the names are matched literally
+        for name_short in ('A+B', 'C(D)', 'E.F', 'EXF'):
+            Cohort.objects.create(name_short=name_short, name_full=f'Cohort {name_short}', released=True)
+        Cohort.objects.create(name_short='G[H]', name_full='Cohort G[H]')
+
+        response = self.client.get(reverse('getAllCohorts'), {'filter_ids': 'a+b,c(d),e.f'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(x['name_short'] for x in response.data['results']), ['A+B', 'C(D)', 'E.F'])
+
+        response = self.client.get(reverse('getCohorts', kwargs={'cohort_symbol': 'c(d)'}))
+        self.assertEqual([x['name_short'] for x in response.data['results']], ['C(D)'])
+
+        # Cohorts not released
+        response = self.client.get(reverse('getAllCohorts'), {'filter_ids': 'g[h]'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('getAllCohorts'), {'filter_ids': 'g[h]', 'fetch_all': 1})
+        self.assertEqual([x['name_short'] for x in response.data['results']], ['G[H]'])
+
+        self.assertEqual(list(Cohort.filter_by_names(['e.f']).values_list('name_short', flat=True)), ['E.F'])
+
+
+class TraitRestTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_traits_include_parents(self):
+        # Closure table of the ontology not built: the requested traits are still returned
+        response = self.client.get(reverse('getAllTraits'), {'include_parents': 1, 'filter_ids': 'EFO_0000305'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], 'EFO_0000305')
@@ -0,0 +1,93 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.testing import CurationTestCase
+from rest_api import concurrency
+
+
+class ConcurrentQueriesTest(TransactionTestCase):
+    """ Test the paginated lists running the count and the page of results in different threads """
+
+    databases = {'default', 'curation_tracker'}
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def test_concurrent_pagination(self):
+        threads = set()
+        run_in_worker = concurrency.run_in_worker
+        def record_thread(function):
+            threads.add(threading.current_thread().name)
+            return run_in_worker(function)
+
+        url = reverse('getAllScores')
+        with override_settings(REST_CONCURRENT_QUERIES=False):
+            sequential_response = self.client.get(url, {'limit': 1, 'offset': 1})
+        caches[settings.CACHE_MIDDLEWARE_ALIAS].clear()
+        with mock.patch.object(concurrency, 'run_in_worker', record_thread):
+            response = self.client.get(url, {'limit': 1, 'offset': 1})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(threads)
+            self.assertTrue(all(name.startswith('rest_queries') for name in threads))
+            self.assertEqual(response.json()['count'], 2)
+            self.assertEqual(response.content, sequential_response.content)
+
+            # Count in the cache or no count: no concurrent queries
+            with override_settings(REST_COUNT_CACHE_TIMEOUT=60):
+                self.client.get(url, {'limit': 1, 'offset': 1})
+                threads.clear()
+                response = self.client.get(url, {'limit': 1, 'offset': 0})
+                self.assertEqual(response.json()['count'], 2)
+                self.assertFalse(threads)
+            caches[settings.CACHE_MIDDLEWARE_ALIAS].clear()
+            response = self.client.get(url, {'limit': 1, 'count': 'false'})
+            self.assertEqual(response.json()['count'], None)
+            self.assertFalse(threads)
+
+        response = self.client.get(reverse('searchPerformanceMetrics'), {'pgs_id': 'PGS000001'})
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_worker_connection(self):
+        ''' The database connection of a worker thread is kept between the calls, until it is too old '''
+        def open_connection():
+            connections['default'].ensure_connection()
+            return connections['default'].connection
+
+        def get_connections():
+            first = concurrency.run_in_worker(open_connection)
+            second = concurrency.run_in_worker(open_connection)
+            concurrency.worker_connections.close_at = time.monotonic()
+            third = concurrency.run_in_worker(open_connection)
+            connections['default'].close()
+            return first, second, third
+
+        first, second, third = concurrency.get_executor().submit(get_connections).result()
+        self.assertIs(first, second)
+        self.assertIsNot(second, third)
+
+
+class AsgiRestTest(CurationTestCase):
+    """ Test the REST API served through the ASGI handler """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    async def test_asgi_requests(self):
+        client = AsyncClient()
+        response = await client.get(reverse('getAllScores'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 2)
+
+        # The streamed results are sent as an asynchronous iterator
+        response = await client.get(reverse('getAllScores'), {'format': 'ndjson', 'stream': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 2)
@@ -0,0 +1,150 @@
+import gzip
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from catalog.middleware.compression import compression_counters
+from catalog.models import Cohort, Release, Retired, Score
+from core.testing import CurationTestCase
+from rest_api.documents import document_types, update_documents
+from rest_api.models import RestDocument, ReleaseChange
+
+
+class RestDocumentTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    detail_endpoints = {
+        'score': ('getScore', 'pgs_id'),
+        'performance': ('getPerformanceMetric', 'ppm_id'),
+        'publication': ('getPublication', 'pgp_id'),
+        'trait': ('getTrait', 'trait_id')
+    }
+    # Documents only used to record the changes of the releases
+    other_endpoints = {
+        'sample_set': ('getSampleSet', 'pss_id'),
+        'cohort': ('getCohorts', 'cohort_symbol')
+    }
+
+    def setUp(self):
+        self.counts = update_documents()
+
+    @override_settings(REST_DOCUMENT_STORE=False)
+    def test_documents_parity(self):
+        ''' Compare the stored documents with the live serializer output '''
+        for entity in document_types:
+            self.assertEqual(self.counts[entity], document_types[entity]['queryset']().count())
+            endpoint, kwarg = {**self.detail_endpoints, **self.other_endpoints}[entity]
+            for document in RestDocument.objects.filter(entity=entity):
+                response = self.client.get(reverse(endpoint, kwargs={kwarg: document.object_id}))
+                if entity == 'cohort':
+                    self.assertEqual(json.loads(bytes(document.data)), response.json()['results'][0])
+                else:
+                    self.assertEqual(bytes(document.data), response.content)
+
+    def test_detail_from_documents(self):
+        for entity, (endpoint, kwarg) in self.detail_endpoints.items():
+            document = RestDocument.objects.filter(entity=entity).first()
+            url = reverse(endpoint, kwargs={kwarg: document.object_id})
+            with override_settings(REST_DOCUMENT_STORE=False):
+                live_response = self.client.get(url)
+            with override_settings(REST_DOCUMENT_STORE=True):
+                with self.assertNumQueries(1):
+                    response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], live_response['Content-Type'])
+            self.assertEqual(response.content, live_response.content)
+
+    def test_filter_ids_from_documents(self):
+        for endpoint, ids in (('getAllScores', 'PGS000002,pgs000001'), ('getAllPerformanceMetrics', 'PPM000001'), ('getAllPublications', 'PGP000001,PGP000002')):
+            url = reverse(endpoint)
+            for params in ({'filter_ids': ids}, {'filter_ids': ids, 'limit': 1}, {'filter_ids': ids, 'cursor': ''}):
+                with override_settings(REST_DOCUMENT_STORE=False):
+                    live_response = self.client.get(url, params)
+                with override_settings(REST_DOCUMENT_STORE=True):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.content, live_response.content)
+
+    @override_settings(REST_DOCUMENT_STORE=True)
+    def test_compressed_documents(self):
+        ''' The compressed forms of the documents are served as-is '''
+        url = reverse('getScore', kwargs={'pgs_id': 'PGS000001'})
+        document = RestDocument.objects.get(entity='score', object_id='PGS000001')
+        precompressed = compression_counters['precompressed']
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, bytes(document.data_gzip))
+        self.assertEqual(gzip.decompress(response.content), bytes(document.data))
+        self.assertEqual(compression_counters['precompressed'], precompressed + 1)
+
+    @override_settings(REST_DOCUMENT_STORE=True)
+    def test_outdated_documents(self):
+        ''' Documents generated for a previous release are not used '''
+        RestDocument.objects.update(release_date='2019-12-18')
+        response = self.client.get(reverse('getScore', kwargs={'pgs_id': 'PGS000001'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], 'PGS000001')
+        self.assertEqual(RestDocument.get_documents('score', ['PGS000001']), {})
+
+
+class ReleaseChangeTest(CurationTestCase):
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        # Documents of the previous release
+        update_documents('2019-12-18')
+        RestDocument.objects.filter(entity='score', object_id='PGS000002').delete()
+        for object_id in ('PGS000098', 'PGS000099'):
+            RestDocument.objects.create(entity='score', object_id=object_id, release_date='2019-12-18', data=b'{}')
+        Retired.objects.create(id='PGS000099', doi='10.1000/test')
+        Score.objects.filter(id='PGS000001').update(name='PGS_updated')
+        RestDocument.objects.filter(entity='sample_set', object_id='PSS000002').delete()
+        Cohort.objects.filter(name_short='ABC').update(name_full='ABC cohort (updated)')
+        Cohort.objects.filter(name_short='DEF').update(released=False)
+        update_documents('2020-02-12')
+
+    def test_release_changes(self):
+        self.assertFalse(ReleaseChange.objects.filter(release_date='2019-12-18').exists())
+        changes = { (change.entity, change.object_id): (change.change, change.changed_fields) for change in ReleaseChange.objects.filter(release_date='2020-02-12') }
+        self.assertEqual(changes, {
+            ('score', 'PGS000001'): ('updated', ['name']),
+            ('score', 'PGS000002'): ('added', []),
+            ('score', 'PGS000098'): ('removed', []),
+            ('score', 'PGS000099'): ('retired', []),
+            ('sample_set', 'PSS000002'): ('added', []),
+            ('cohort', 'ABC'): ('updated', ['name_full']),
+            ('cohort', 'DEF'): ('removed', [])
+        })
+        self.assertFalse(RestDocument.objects.filter(object_id__in=['PGS000098', 'PGS000099']).exists())
+
+        # Documents generated again for the same release: the previous changes are kept
+        Score.objects.filter(id='PGS000002').update(name='PGS_updated_2')
+        update_documents('2020-02-12')
+        self.assertEqual(ReleaseChange.objects.get(object_id='PGS000002').change, 'added')
+        self.assertEqual(ReleaseChange.objects.filter(release_date='2020-02-12').count(), 7)
+
+    def test_release_changes_endpoint(self):
+        url = reverse('getReleaseChanges', kwargs={'release_date': '2020-02-12'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 7)
+        data = self.client.get(url, {'entity': 'score'}).json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['results'][0], {'release_date': '2020-02-12', 'entity': 'score', 'id': 'PGS000001', 'change': 'updated', 'changed_fields': ['name']})
+
+        self.assertEqual(self.client.get(reverse('getReleaseChanges', kwargs={'release_date': 'current'})).json()['count'], 7)
+        self.assertEqual(self.client.get(url, {'change': 'retired'}).json()['results'][0]['id'], 'PGS000099')
+        self.assertEqual(self.client.get(url, {'since': '2020-02-12'}).json()['count'], 0)
+        self.assertEqual(self.client.get(reverse('getReleaseChanges', kwargs={'release_date': '2019-12-18'})).json()['count'], 0)
+        self.assertEqual(self.client.get(url, {'since': 'last'}).status_code, status.HTTP_400_BAD_REQUEST)
+        Release.objects.all().delete()
+        self.assertEqual(self.client.get(reverse('getReleaseChanges', kwargs={'release_date': 'current'})).status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(url, {'format': 'ndjson', 'stream': 1})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 7)
@@ -1,6 +1,7 @@
 import re
 
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 
 
@@ -80,6 +81,11 @@ class BrowseEndpointTest(APITestCase):
     ]
 
 
+    def setUp(self):
+        # Reset the throttling history left by the previous tests
+        cache.clear()
+
+
     def send_request(self, url):
         """ Send REST API request and check the reponse status code """
         resp = self.client.get(url)
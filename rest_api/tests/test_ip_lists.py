@@ -0,0 +1,67 @@
+import ipaddress
+import os
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.testing import CurationTestCase
+from rest_api.ip_lists import IPNetworkTrie, parse_network, ip_lists, export_ip_lists_counters
+
+
+class IPListsTest(CurationTestCase):
+    """ Test the IP lists (blacklist and restricted IPs) compiled into radix trees """
+
+    def test_parse_network(self):
+        self.assertEqual(parse_network('10.1.2.3'), ipaddress.ip_network('10.1.2.3/32'))
+        self.assertEqual(parse_network('10.1.16.0/20'), ipaddress.ip_network('10.1.16.0/20'))
+        self.assertEqual(parse_network('10.1.'), ipaddress.ip_network('10.1.0.0/16'))
+        self.assertEqual(parse_network('10.1'), ipaddress.ip_network('10.1.0.0/16'))
+        self.assertEqual(parse_network('2001:db8::/32'), ipaddress.ip_network('2001:db8::/32'))
+        with self.assertRaises(ValueError):
+            parse_network('10.1.300.0/24')
+
+    def test_trie(self):
+        trie = IPNetworkTrie(parse_network(entry) for entry in ('10.1', '10.1.16.0/20', '192.168.1.5', '2001:db8::/32'))
+        self.assertEqual(trie.size, 4)
+        # Most specific network
+        self.assertEqual(str(trie.match(ipaddress.ip_address('10.1.20.1'))), '10.1.16.0/20')
+        self.assertEqual(str(trie.match(ipaddress.ip_address('10.1.32.1'))), '10.1.0.0/16')
+        # '10.1' doesn't match '10.10.x.x'
+        self.assertIsNone(trie.match(ipaddress.ip_address('10.10.0.1')))
+        self.assertIsNotNone(trie.match(ipaddress.ip_address('192.168.1.5')))
+        self.assertIsNone(trie.match(ipaddress.ip_address('192.168.1.50')))
+        self.assertEqual(str(trie.match(ipaddress.ip_address('2001:db8:ab::1'))), '2001:db8::/32')
+        self.assertIsNone(trie.match(ipaddress.ip_address('2001:db9::1')))
+
+    @override_settings(REST_BLACKLIST_IPS=['127.0.0.0/30', 'not an IP'])
+    def test_blacklist(self):
+        url = reverse('getScore', kwargs={'pgs_id': 'PGS000001'})
+        matches = ip_lists['blacklist'].counters['127.0.0.0/30']
+        with self.assertLogs('rest_api.ip_lists', level='WARNING') as logs:
+            response = self.client.get(url)
+        self.assertIn('REST_BLACKLIST_IPS', logs.output[0])
+        self.assertIn('not an IP', logs.output[0])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(ip_lists['blacklist'].counters['127.0.0.0/30'], matches + 1)
+        self.assertEqual(ip_lists['blacklist'].invalid_entries, ['not an IP'])
+        self.assertIn('pgs_ip_list_invalid_entries{list="blacklist"} 1', export_ip_lists_counters())
+        self.assertNotEqual(self.client.get(url, REMOTE_ADDR='127.0.0.4').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reload_file(self):
+        url = reverse('getScore', kwargs={'pgs_id': 'PGS000001'})
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as ip_file:
+            ip_file.write('# Blocked IPs\n10.0.0.0/8\n')
+        try:
+            with override_settings(REST_BLACKLIST_IPS=[], REST_BLACKLIST_IPS_FILE=ip_file.name, REST_IP_LISTS_RELOAD_INTERVAL=0):
+                self.assertEqual(self.client.get(url, REMOTE_ADDR='10.2.3.4').status_code, status.HTTP_403_FORBIDDEN)
+                self.assertNotEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+                with open(ip_file.name, 'a') as f:
+                    f.write('127.0.0.1\n')
+                # Make sure the modification time changes
+                mtime = os.path.getmtime(ip_file.name) + 10
+                os.utime(ip_file.name, (mtime, mtime))
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        finally:
+            os.remove(ip_file.name)
@@ -0,0 +1,92 @@
+import json
+import sys
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipIf
+from psycopg.types.range import NumericRange
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from catalog.models import Metric, Performance, Publication, Sample, Score
+from core.testing import CurationTestCase
+from release.scripts.ExportParquet import ExportParquet
+from rest_api.parquet import export_parquet, file_checksum, get_release_dir
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@skipIf(pyarrow is None, 'pyarrow is not installed')
+class ParquetExportTest(CurationTestCase):
+    """ Test the Parquet dumps of the releases """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(REST_PARQUET_DIR=self.tmp_dir.name)
+        self.settings_override.enable()
+        performance = Performance.objects.get(id='PPM000001')
+        Metric.objects.create(performance=performance, type='Effect Size', name='Odds Ratio', name_short='OR', estimate=1.55, unit='per SD', ci=NumericRange(Decimal('1.32'), Decimal('1.79'), bounds='[]'))
+        Metric.objects.create(performance=performance, type='Classification Metric', name='Concordance Statistic', name_short='C-index', estimate=0.622, unit='', se=0.0112)
+        # One row per row group
+        self.manifest = export_parquet('2020-02-12', chunk_size=1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+
+    def read_table(self, name):
+        return pyarrow.parquet.read_table(f'{get_release_dir("2020-02-12")}/{name}.parquet')
+
+    def test_export(self):
+        tables = { table['name']: table for table in self.manifest['tables'] }
+        for name, model in (('scores', Score), ('publications', Publication), ('performances', Performance), ('samples', Sample)):
+            self.assertEqual(tables[name]['rows'], model.objects.count())
+            path = f'{get_release_dir("2020-02-12")}/{tables[name]["file"]}'
+            self.assertEqual(tables[name]['sha256'], file_checksum(path))
+            self.assertEqual(pyarrow.parquet.ParquetFile(path).metadata.num_row_groups, model.objects.count())
+
+        scores = self.read_table('scores')
+        self.assertEqual(scores.schema.field('trait_efo_ids').type.value_type, pyarrow.string())
+        self.assertEqual(scores.schema.field('date_released').type, pyarrow.date32())
+        score = scores.to_pylist()[0]
+        self.assertEqual(score['id'], 'PGS000001')
+        self.assertEqual(score['publication_id'], 'PGP000001')
+        self.assertEqual(score['trait_efo_ids'], ['EFO_0000305'])
+
+        performance = { row['id']: row for row in self.read_table('performances').to_pylist() }['PPM000001']
+        self.assertEqual(performance['metric_or'], 1.55)
+        self.assertEqual((performance['metric_or_ci_lower'], performance['metric_or_ci_upper']), (1.32, 1.79))
+        self.assertEqual((performance['metric_c_index'], performance['metric_c_index_se']), (0.622, 0.0112))
+        self.assertIsNone(performance['metric_c_index_ci_lower'])
+
+    def test_download(self):
+        response = self.client.get(reverse('getReleaseParquet', kwargs={'release_date': '2020-02-12'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), self.manifest)
+
+        response = self.client.get(reverse('getReleaseParquet', kwargs={'release_date': 'current', 'filename': 'scores.parquet'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertEqual(len(b''.join(response.streaming_content)), self.manifest['tables'][1]['size'])
+
+        for release_date, filename in (('2020-02-12', 'unknown.parquet'), ('2020-02-12', '..'), ('2019-12-18', 'scores.parquet')):
+            response = self.client.get(reverse('getReleaseParquet', kwargs={'release_date': release_date, 'filename': filename}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # Release date checked before being used in the path of the files
+        for release_date in ('..', '2020-02-12.tmp'):
+            response = self.client.get(reverse('getReleaseParquet', kwargs={'release_date': release_date, 'filename': 'scores.parquet'}))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_without_pyarrow(self):
+        # The release step fails instead of skipping the dumps
+        with mock.patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.parquet': None}):
+            with self.assertRaisesMessage(ImportError, 'requirements_release.txt'):
+                ExportParquet('2020-02-12').export_parquet()
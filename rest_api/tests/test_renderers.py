@@ -0,0 +1,107 @@
+import csv
+import io
+from decimal import Decimal
+from unittest import skipIf
+from psycopg.types.range import NumericRange
+
+from django.urls import reverse
+from rest_framework import status
+
+from catalog.models import Metric, Performance
+from core.testing import CurationTestCase
+from rest_api.renderers import msgpack
+
+
+class RenderersRestTest(CurationTestCase):
+    """ Test the MessagePack and CSV/TSV formats """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def read_csv(self, content, delimiter=','):
+        return list(csv.DictReader(io.StringIO(content.decode()), delimiter=delimiter))
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self):
+        for url in (reverse('getAllScores'), reverse('getPerformanceMetric', kwargs={'ppm_id': 'PPM000001'}), reverse('getInfo')):
+            response = self.client.get(url, {'format': 'msgpack'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            # Same structure as the JSON response
+            self.assertEqual(msgpack.unpackb(response.content), self.client.get(url).json())
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_stream(self):
+        url = reverse('getAllScores')
+        response = self.client.get(url, {'format': 'msgpack', 'stream': 1})
+        self.assertTrue(response.streaming)
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(b''.join(response.streaming_content))
+        self.assertEqual(list(unpacker), self.client.get(url).json()['results'])
+
+    def test_csv(self):
+        response = self.client.get(reverse('getAllScores'), {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self.read_csv(response.content)
+        self.assertEqual([row['id'] for row in rows], ['PGS000001', 'PGS000002'])
+        self.assertEqual(rows[0]['trait_efo_ids'], 'EFO_0000305')
+        self.assertEqual(rows[0]['publication_id'], 'PGP000001')
+        self.assertEqual(rows[0]['samples_variants_number'], '150')
+
+        # Detail endpoint: one row, and no row for an unknown entry
+        response = self.client.get(reverse('getSampleSet', kwargs={'pss_id': 'PSS000001'}), {'format': 'tsv'})
+        self.assertEqual(response['Content-Type'], 'text/tab-separated-values; charset=utf-8')
+        rows = self.read_csv(response.content, '\t')
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['samples_ancestry'], 'European|African')
+        self.assertEqual(rows[0]['samples_number'], str(4563 + 6943))
+        response = self.client.get(reverse('getScore', kwargs={'pgs_id': 'PGS999999'}), {'format': 'csv'})
+        self.assertEqual(self.read_csv(response.content), [])
+
+    def test_csv_metrics(self):
+        performance = Performance.objects.get(id='PPM000001')
+        Metric.objects.create(performance=performance, type='Effect Size', name='Odds Ratio', name_short='OR', estimate=1.55, unit='per SD', ci=NumericRange(Decimal('1.32'), Decimal('1.79'), bounds='[]'))
+        Metric.objects.create(performance=performance, type='Classification Metric', name='Concordance Statistic', name_short='C-index', estimate=0.622, unit='', se=0.0112)
+        response = self.client.get(reverse('searchPerformanceMetrics'), {'pgs_id': 'PGS000001', 'format': 'csv'})
+        row = self.read_csv(response.content)[0]
+        self.assertEqual(row['effect_sizes'], 'OR: 1.55 [1.32, 1.79] (per SD)')
+        self.assertEqual(row['classification_metrics'], 'C-index: 0.622 (SE: 0.0112)')
+        self.assertEqual(row['sampleset_id'], 'PSS000001')
+
+    def test_csv_stream(self):
+        url = reverse('getAllCohorts')
+        response = self.client.get(url, {'format': 'csv', 'stream': 1})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self.read_csv(b''.join(response.streaming_content))
+        self.assertEqual(rows, self.read_csv(self.client.get(url, {'format': 'csv', 'limit': 250}).content))
+        self.assertEqual([row['name_short'] for row in rows], [x['name_short'] for x in self.client.get(url).json()['results']])
+
+    def test_csv_fields(self):
+        url = reverse('getAllScores')
+        for params in ({'format': 'csv'}, {'format': 'csv', 'stream': 1}):
+            response = self.client.get(url, {**params, 'fields': 'id'})
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            self.assertEqual(self.read_csv(content), [{'id': 'PGS000001'}, {'id': 'PGS000002'}])
+
+            response = self.client.get(url, {**params, 'fields': 'id,publication,samples_variants'})
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            row = self.read_csv(content)[0]
+            self.assertEqual(list(row.keys())[:4], ['id', 'samples_variants_number', 'samples_variants_ancestry', 'samples_variants_cohorts'])
+            self.assertEqual(row['publication_id'], 'PGP000001')
+            self.assertNotIn('trait_efo_ids', row)
+
+            response = self.client.get(url, {**params, 'exclude': 'publication'})
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            row = self.read_csv(content)[0]
+            self.assertIn('trait_efo_ids', row)
+            self.assertNotIn('publication_id', row)
+
+    def test_csv_errors(self):
+        response = self.client.get(reverse('getAllScores'), {'format': 'csv', 'limit': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.read_csv(response.content)[0]['status_code'], '400')
+        # Not a tabular endpoint
+        response = self.client.get(reverse('getAllPublications'), {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
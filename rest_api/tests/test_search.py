@@ -0,0 +1,48 @@
+from django.urls import reverse
+from rest_framework import status
+
+from core.testing import CurationTestCase
+from catalog.models import EFOTrait_Ontology
+from rest_api.search import search_traits, search_traits_regex
+
+
+class TraitSearchTest(CurationTestCase):
+    """ Test that the indexed trait search returns the same results as the regex/join based search """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    terms = [
+        'breast carcinoma', 'Breast', 'CARCINOMA', 'Carcinoma of breast NOS', 'Carcinoma of breast',
+        'NCIT:C4872', 'NCIT', 'EFO_0000305', 'MONDO_0007254', 'Cancer', 'canc', 'neoplasm', 'unknown trait'
+    ]
+
+    def setUp(self):
+        # Parent/child traits
+        EFOTrait_Ontology.objects.get(id='MONDO_0007254').child_traits.add(EFOTrait_Ontology.objects.get(id='EFO_0000305'))
+
+    def test_search_parity(self):
+        for term in self.terms:
+            for exact in (True, False):
+                for include_children in (True, False):
+                    indexed_ids = list(search_traits(term, exact, include_children).order_by('id').values_list('id', flat=True))
+                    regex_ids = list(search_traits_regex(term, exact, include_children).order_by('id').values_list('id', flat=True))
+                    self.assertEqual(indexed_ids, regex_ids, f'term={term}, exact={exact}, include_children={include_children}')
+
+    def test_search_arrays(self):
+        trait = EFOTrait_Ontology.objects.get(id='EFO_0000305')
+        self.assertEqual(trait.synonyms_array, trait.synonyms_list)
+        self.assertEqual(trait.mapped_terms_array, trait.mapped_terms_list)
+        self.assertIsNone(EFOTrait_Ontology.objects.get(id='MONDO_0007254').synonyms_array)
+        # Arrays updated by the database when the source columns change
+        trait.synonyms = 'Breast tumour'
+        trait.save()
+        self.assertEqual(EFOTrait_Ontology.objects.get(id='EFO_0000305').synonyms_array, ['Breast tumour'])
+
+    def test_search_endpoint(self):
+        response = self.client.get(reverse('searchTraits'), {'term': 'breast cancer', 'exact': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Parent trait matched + child trait (include_children, by default)
+        self.assertEqual([x['id'] for x in response.json()['results']], ['MONDO_0007254', 'EFO_0000305'])
+        response = self.client.get(reverse('searchTraits'), {'term': 'breast cancer', 'exact': 1, 'include_children': 0})
+        self.assertEqual([x['id'] for x in response.json()['results']], ['MONDO_0007254'])
@@ -0,0 +1,76 @@
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.testing import CurationTestCase
+
+try:
+    import lupa
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+rest_framework_settings = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon': '10/min', 'user': '10/min', 'restricted': '2/min'}}
+
+
+@override_settings(REST_FRAMEWORK=rest_framework_settings)
+class TokenBucketThrottleTest(CurationTestCase):
+    """ Test the token bucket rate limit and its cost per endpoint """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        # Reset the token buckets left by the previous tests
+        caches[settings.REST_THROTTLE_CACHE].clear()
+
+    def check_rate_limit(self, response, limit, remaining, cost):
+        self.assertEqual(response['X-RateLimit-Limit'], str(limit))
+        self.assertEqual(response['X-RateLimit-Remaining'], str(remaining))
+        self.assertEqual(response['X-RateLimit-Cost'], str(cost))
+
+    def test_costs(self):
+        self.check_rate_limit(self.client.get(reverse('getScore', kwargs={'pgs_id': 'PGS000001'})), 10, 9, 1)
+        self.check_rate_limit(self.client.get(reverse('getInfo')), 10, 8, 0.25)
+        # One token per page of 50 results
+        self.check_rate_limit(self.client.get(reverse('getAllScores'), {'limit': 120}), 10, 5, 3)
+        self.check_rate_limit(self.client.get(reverse('getAllScores'), {'limit': 250}), 10, 0, 5)
+        response = self.client.get(reverse('getScore', kwargs={'pgs_id': 'PGS000001'}))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.check_rate_limit(response, 10, 0, 1)
+        # 0.75 token left, refilled at 1 token every 6 seconds
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertIn(int(response['X-RateLimit-Reset']), range(50, 57))
+
+    def test_stream_cost(self):
+        # The cost is limited to the capacity of the bucket
+        response = self.client.get(reverse('getAllScores'), {'format': 'ndjson', 'stream': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.check_rate_limit(response, 10, 0, 10)
+        self.assertEqual(self.client.get(reverse('getInfo')).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_RESTRICTED_IPS=['127.0.0.'])
+    def test_restricted_ips(self):
+        url = reverse('getScore', kwargs={'pgs_id': 'PGS000001'})
+        self.check_rate_limit(self.client.get(url), 2, 1, 1)
+        self.check_rate_limit(self.client.get(url), 2, 0, 1)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @skipIf(fakeredis is None, 'fakeredis (with Lua support) is not installed')
+    def test_redis_buckets(self):
+        ''' Token buckets stored in Redis (in-memory Redis server), updated by the Lua script '''
+        redis_caches = {
+            **settings.CACHES,
+            'default': {
+                'BACKEND': 'catalog.cache.remove_nonce.RemoveNonceFromRedisCacheBackend',
+                'LOCATION': 'redis://127.0.0.1:6379',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection, 'server': fakeredis.FakeServer()}
+            }
+        }
+        with override_settings(CACHES=redis_caches):
+            self.test_costs()
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from psycopg.types.range import NumericRange
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.testing import CurationTestCase
+from catalog.models import *
+from rest_api.values_serializers import ScoreValuesSerializer, PerformanceValuesSerializer
+
+
+class ValuesSerializerTest(CurationTestCase):
+    """ Test that the values-based serializers return the same output as the ModelSerializers """
+
+    # Load data in DB - Must live in the rest_api/fixtures/ directory
+    fixtures = ['db_test.json']
+
+    def setUp(self):
+        # Add data not covered by the fixtures: demographics, cohorts, metrics, ancestries, multiple traits
+        sample_1 = Sample.objects.get(id=1)
+        sample_1.sample_age = Demographic.objects.create(estimate=55.2, estimate_type='Median', unit='Years', range=NumericRange(Decimal('40.5'), Decimal('70'), bounds='[]'), range_type='IQR')
+        sample_1.followup_time = Demographic.objects.create(estimate=8, range=NumericRange(Decimal('6.1'), Decimal('9.9'), bounds='[]'), range_type='ci', variability=1.5, variability_type='SD')
+        sample_1.sample_percent_male = 48.25
+        sample_1.save()
+        sample_3 = Sample.objects.get(id=3)
+        sample_3.sample_age = Demographic.objects.create(range=NumericRange(Decimal('18'), Decimal('80'), bounds='[]'), unit='months')
+        sample_3.save()
+        sample_3.cohorts.add(*Cohort.objects.all())
+        Sample.objects.get(id=2).cohorts.add(Cohort.objects.order_by('id').last())
+
+        score = Score.objects.get(id='PGS000002')
+        score.ancestries = {'gwas': {'dist': {'EUR': 100}, 'count': 1000}}
+        score.save()
+        score.trait_efo.add(EFOTrait.objects.get(id='EFO_0000305'))
+        score.samples_training.add(Sample.objects.get(id=4))
+
+        performance = Performance.objects.get(id='PPM000001')
+        performance.covariates = 'age, sex'
+        performance.save()
+        Metric.objects.create(performance=performance, type='Effect Size', name='Odds Ratio', name_short='OR', estimate=1.55, unit='per SD', ci=NumericRange(Decimal('1.32'), Decimal('1.79'), bounds='[]'))
+        Metric.objects.create(performance=performance, type='Classification Metric', name='Concordance Statistic', name_short='C-index', estimate=0.622, unit='', se=0.0112)
+        Metric.objects.create(performance=performance, type='Other Metric', name='Reclassification', estimate=0.000001, unit='')
+
+
+    def check_parity(self, url, params={}):
+        with override_settings(REST_VALUES_SERIALIZERS=False):
+            model_response = self.client.get(url, params)
+        with override_settings(REST_VALUES_SERIALIZERS=True):
+            values_response = self.client.get(url, params)
+        self.assertEqual(values_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(values_response.content, model_response.content)
+        return values_response
+
+
+    def test_list_parity(self):
+        for endpoint in ('getAllScores', 'getAllPerformanceMetrics'):
+            url = reverse(endpoint)
+            response = self.check_parity(url)
+            self.assertEqual(response.json()['count'], 2)
+            self.check_parity(url, {'limit': 1, 'offset': 1})
+            self.check_parity(url, {'filter_ids': 'PGS000002,PPM000001'})
+            self.check_parity(url, {'cursor': ''})
+        self.check_parity(reverse('searchScores'), {'trait_id': 'EFO_0000305'})
+        self.check_parity(reverse('searchPerformanceMetrics'), {'pgs_id': 'PGS000001'})
+
+
+    def test_stream_parity(self):
+        for endpoint in ('getAllScores', 'getAllPerformanceMetrics'):
+            url = reverse(endpoint)
+            with override_settings(REST_VALUES_SERIALIZERS=False):
+                model_response = self.client.get(url, {'format': 'ndjson', 'stream': 1})
+            with override_settings(REST_VALUES_SERIALIZERS=True):
+                values_response = self.client.get(url, {'format': 'ndjson', 'stream': 1})
+            self.assertEqual(b''.join(values_response.streaming_content), b''.join(model_response.streaming_content))
+
+
+    def test_serializer(self):
+        performance = PerformanceValuesSerializer(Performance.objects.get(id='PPM000001')).data
+        self.assertEqual(performance['performance_metrics']['othermetrics'][0]['name_short'], 'Reclassification')
+        self.assertEqual(performance['performance_metrics']['class_acc'][0]['se'], 0.0112)
+        self.assertEqual(len(performance['sampleset']['samples']), 2)
+
+        # Results in the same order as the entries, with a constant number of queries
+        scores = Score.objects.order_by('-num')
+        with self.assertNumQueries(7):
+            data = ScoreValuesSerializer(scores, many=True).data
+        self.assertEqual([x['id'] for x in data], ['PGS000002', 'PGS000001'])
+        self.assertEqual(ScoreValuesSerializer(None).data, {})
@@ -0,0 +1,154 @@
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.mixins import ListModelMixin
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from .ip_lists import ip_lists
+
+
+# Token bucket update, run atomically in Redis: refill the bucket since the last request, then remove the cost if possible.
+# Return whether the request is allowed and the number of tokens left (as a string, as Lua numbers are converted to integers).
+token_bucket_script = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill_rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[5]))
+return {allowed, tostring(tokens)}
+"""
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Rate limit with a token bucket per client, stored in the shared cache (REST_THROTTLE_CACHE), so the limit
+    applies to all the instances of the website.
+    The bucket of a scope ('anon', 'user' or 'restricted' for the IPs listed in REST_RESTRICTED_IPS) holds up to
+    N tokens and is refilled at N tokens per period, from the rate of the scope (DEFAULT_THROTTLE_RATES, e.g. '100/min').
+    Each request costs a number of tokens depending on the endpoint (see get_cost) and the state of the bucket
+    is sent in the X-RateLimit-* headers of the response (see RateLimitHeadersMiddleware).
+    """
+    timer = time.time
+
+    def get_scope(self, request):
+        if request.META.get('REMOTE_ADDR', '') in ip_lists['restricted']:
+            return 'restricted'
+        if request.user and request.user.is_authenticated:
+            return 'user'
+        return 'anon'
+
+
+    def get_cache_key(self, request, scope):
+        if scope == 'user':
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'throttle_bucket_{scope}_{ident}'
+
+
+    def parse_rate(self, rate):
+        ''' Return the capacity of the bucket and its refill rate (tokens per second), e.g. '100/min' -> (100, 1.67) '''
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), int(num) / duration
+
+
+    def get_cost(self, request, view):
+        '''
+        Number of tokens used by the request:
+         - the cost given by the view ('get_throttle_cost' method), e.g. depending on the number of IDs requested
+         - list endpoints: one token per page of PAGE_SIZE results ('limit' parameter), or REST_THROTTLE_COSTS['stream']
+           to stream all the results
+         - other endpoints: the 'throttle_weight' of the view (default: REST_THROTTLE_COSTS['default'])
+        '''
+        if hasattr(view, 'get_throttle_cost'):
+            return view.get_throttle_cost(request)
+        if isinstance(view, ListModelMixin):
+            if hasattr(view, 'stream_list') and request.query_params.get('stream') in ('1', 'true'):
+                return settings.REST_THROTTLE_COSTS['stream']
+            page_size = api_settings.PAGE_SIZE
+            try:
+                limit = int(request.query_params.get('limit', page_size))
+            except ValueError:
+                limit = page_size
+            return max(1, math.ceil(limit / page_size))
+        return getattr(view, 'throttle_weight', settings.REST_THROTTLE_COSTS['default'])
+
+
+    def consume(self, key, capacity, refill_rate, cost):
+        ''' Remove the cost from the bucket if it has enough tokens. Return whether the request is allowed and the tokens left '''
+        cache = caches[settings.REST_THROTTLE_CACHE]
+        now = self.timer()
+        # Time for an empty bucket to be full again (expiry of the bucket)
+        timeout = math.ceil(capacity / refill_rate) + 1
+        if isinstance(cache, RedisCache):
+            cache_key = cache.make_and_validate_key(key)
+            client = cache._cache.get_client(cache_key, write=True)
+            allowed, tokens = client.register_script(token_bucket_script)(keys=[cache_key], args=[capacity, refill_rate, now, cost, timeout])
+            return bool(allowed), float(tokens)
+        # Other cache backends (e.g. local memory cache): not atomic
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - updated) * refill_rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        cache.set(key, (tokens, now), timeout)
+        return allowed, tokens
+
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, self.refill_rate = self.parse_rate(rate)
+        # A request can't cost more than the capacity of the bucket
+        self.cost = min(self.get_cost(request, view), capacity)
+        allowed, self.tokens = self.consume(self.get_cache_key(request, scope), capacity, self.refill_rate, self.cost)
+
+        # State of the bucket, sent in the response headers
+        request._request.rate_limit = {
+            'limit': capacity,
+            'remaining': math.floor(self.tokens),
+            'reset': math.ceil((capacity - self.tokens) / self.refill_rate),
+            'cost': self.cost
+        }
+        return allowed
+
+
+    def wait(self):
+        ''' Number of seconds before the bucket has enough tokens for the request '''
+        return max(0, (self.cost - self.tokens) / self.refill_rate)
+
+
+class RateLimitHeadersMiddleware:
+    """
+    This middleware class adds the X-RateLimit-* headers to the REST API responses, with the state of the
+    token bucket of the client (see TokenBucketThrottle):
+     - X-RateLimit-Limit: capacity of the bucket
+     - X-RateLimit-Remaining: number of tokens left
+     - X-RateLimit-Reset: number of seconds before the bucket is full again
+     - X-RateLimit-Cost: number of tokens used by the request
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit:
+            for name, value in rate_limit.items():
+                response[f'X-RateLimit-{name.capitalize()}'] = str(value)
+        return response
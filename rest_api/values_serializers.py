@@ -0,0 +1,265 @@
+from collections import defaultdict
+from pgs_web import constants
+from catalog.models import Score, Performance, Sample, SampleSet, Metric
+
+
+class ValuesSerializer:
+    """
+    Lightweight alternative to the DRF ModelSerializers, building the same data
+    from 'values()' rows and pre-grouped related rows, with plain dict construction.
+    It takes the entries to serialize (model instances or primary keys) and
+    fetches their data itself, so the view only needs to select their primary keys.
+    The subclasses implement 'serialize(pks)', returning the list of serialized entries
+    in the same order as the list of primary keys.
+    """
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+
+    @property
+    def data(self):
+        if self.instance is None:
+            return [] if self.many else {}
+        entries = self.instance if self.many else [self.instance]
+        pks = [getattr(entry, 'pk', entry) for entry in entries]
+        results = self.serialize(pks)
+        if self.many:
+            return results
+        return results[0] if results else {}
+
+
+## Helpers ##
+
+def format_date(value):
+    return value.isoformat() if value is not None else None
+
+
+def group_rows(rows, key):
+    ''' Group the rows by the value of the given key '''
+    grouped_rows = defaultdict(list)
+    for row in rows:
+        grouped_rows[row[key]].append(row)
+    return grouped_rows
+
+
+publication_fields = ('id', 'title', 'doi', 'PMID', 'journal', 'firstauthor', 'date_publication')
+
+def publication_values(row, prefix='publication__'):
+    ''' Same data as PublicationSerializer, from a row with the publication fields prefixed '''
+    publication = {field: row[prefix+field] for field in publication_fields}
+    publication['date_publication'] = format_date(publication['date_publication'])
+    return publication
+
+
+demographic_fields = ('id', 'estimate', 'estimate_type', 'unit', 'range', 'range_type', 'variability', 'variability_type')
+
+def demographic_values(row, prefix):
+    ''' Same data as Demographic.display_values_dict(), from a row with the demographic fields prefixed '''
+    if row[prefix+'id'] is None:
+        return None
+    l = {}
+    estimate_value = row[prefix+'estimate']
+    range_value = row[prefix+'range']
+
+    # Estimate
+    estimate = ''
+    if estimate_value != None:
+        estimate = estimate_value
+        if range_value != None and row[prefix+'range_type'].lower() == 'ci':
+            estimate = f'{estimate} {range_value}'
+        if estimate:
+            l['estimate_type'] = row[prefix+'estimate_type'].lower()
+            l['estimate'] = estimate
+
+    # Range
+    if range_value != None and '[' not in str(estimate):
+        l['interval'] = {
+            'type': row[prefix+'range_type'].lower(),
+            'lower': float(range_value.lower),
+            'upper': float(range_value.upper)
+        }
+    # Variability
+    if row[prefix+'variability'] != None:
+        l['variability_type'] = row[prefix+'variability_type'].lower()
+        l['variability'] = row[prefix+'variability']
+
+    # Unit
+    if row[prefix+'unit'] != None:
+        l['unit'] = row[prefix+'unit'].lower()
+
+    return l
+
+
+sample_fields = ('id', 'sample_number', 'sample_cases', 'sample_controls', 'sample_percent_male',
+                 'phenotyping_free', 'ancestry_broad', 'ancestry_free', 'ancestry_country', 'ancestry_additional',
+                 'source_GWAS_catalog', 'source_PMID', 'source_DOI', 'cohorts_additional')
+
+def get_samples(sample_ids):
+    ''' Same data as SampleSerializer, for each sample ID (dictionary) '''
+    sample_ids = set(sample_ids)
+    if not sample_ids:
+        return {}
+    demographic_lookups = [f'{demographic}__{field}' for demographic in ('sample_age', 'followup_time') for field in demographic_fields]
+    sample_rows = Sample.objects.filter(id__in=sample_ids).values(*sample_fields, *demographic_lookups)
+    cohort_rows = Sample.cohorts.through.objects.filter(sample_id__in=sample_ids).values(
+        'sample_id', 'cohort__name_short', 'cohort__name_full', 'cohort__name_others'
+    ).order_by('cohort_id')
+    cohorts_by_sample = group_rows(cohort_rows, 'sample_id')
+
+    samples = {}
+    for row in sample_rows:
+        samples[row['id']] = {
+            'sample_number': row['sample_number'],
+            'sample_cases': row['sample_cases'],
+            'sample_controls': row['sample_controls'],
+            'sample_percent_male': row['sample_percent_male'],
+            'sample_age': demographic_values(row, 'sample_age__'),
+            'phenotyping_free': row['phenotyping_free'],
+            'followup_time': demographic_values(row, 'followup_time__'),
+            'ancestry_broad': row['ancestry_broad'],
+            'ancestry_free': row['ancestry_free'],
+            'ancestry_country': row['ancestry_country'],
+            'ancestry_additional': row['ancestry_additional'],
+            'source_GWAS_catalog': row['source_GWAS_catalog'],
+            'source_PMID': row['source_PMID'],
+            'source_DOI': row['source_DOI'],
+            'cohorts': [
+                {
+                    'name_short': cohort['cohort__name_short'],
+                    'name_full': cohort['cohort__name_full'],
+                    'name_others': cohort['cohort__name_others']
+                } for cohort in cohorts_by_sample[row['id']]
+            ],
+            'cohorts_additional': row['cohorts_additional']
+        }
+    return samples
+
+
+def get_sample_ids(through_model, key, pks):
+    ''' Fetch the sample IDs (ordered) linked to each entry, from a ManyToMany table '''
+    rows = through_model.objects.filter(**{f'{key}__in': pks}).values(key, 'sample_id').order_by('sample_id')
+    sample_ids = defaultdict(list)
+    for row in rows:
+        sample_ids[row[key]].append(row['sample_id'])
+    return sample_ids
+
+
+## Scores ##
+
+class ScoreValuesSerializer(ValuesSerializer):
+    """ Same output as ScoreSerializer """
+
+    score_fields = ('num', 'id', 'name', 'flag_asis', 'trait_reported', 'trait_additional', 'method_name', 'method_params',
+                    'variants_number', 'variants_interactions', 'variants_genomebuild', 'weight_type', 'ancestries',
+                    'date_released', 'license')
+
+    def serialize(self, pks):
+        score_rows = Score.objects.filter(num__in=pks).values(*self.score_fields, *[f'publication__{field}' for field in publication_fields])
+        trait_rows = Score.trait_efo.through.objects.filter(score_id__in=pks).values(
+            'score_id', 'efotrait__id', 'efotrait__label', 'efotrait__description', 'efotrait__url'
+        ).order_by('efotrait_id')
+        traits_by_score = group_rows(trait_rows, 'score_id')
+        samples_variants_ids = get_sample_ids(Score.samples_variants.through, 'score_id', pks)
+        samples_training_ids = get_sample_ids(Score.samples_training.through, 'score_id', pks)
+        samples = get_samples([id for ids in (*samples_variants_ids.values(), *samples_training_ids.values()) for id in ids])
+
+        ftp_root = constants.USEFUL_URLS['PGS_FTP_HTTP_ROOT']
+        scores = {}
+        for row in score_rows:
+            pgs_id = row['id']
+            url_base_position = f'{ftp_root}/scores/{pgs_id}/ScoringFiles/Harmonized/{pgs_id}_hmPOS_'
+            scores[row['num']] = {
+                'id': pgs_id,
+                'name': row['name'],
+                'ftp_scoring_file': f'{ftp_root}/scores/{pgs_id}/ScoringFiles/{pgs_id}.txt.gz',
+                'ftp_harmonized_scoring_files': {gb: {'positions': f'{url_base_position}{gb}.txt.gz'} for gb in constants.GENEBUILDS},
+                'publication': publication_values(row),
+                'matches_publication': row['flag_asis'],
+                'samples_variants': [samples[id] for id in samples_variants_ids[row['num']]],
+                'samples_training': [samples[id] for id in samples_training_ids[row['num']]],
+                'trait_reported': row['trait_reported'],
+                'trait_additional': row['trait_additional'],
+                'trait_efo': [
+                    {
+                        'id': trait['efotrait__id'],
+                        'label': trait['efotrait__label'],
+                        'description': trait['efotrait__description'],
+                        'url': trait['efotrait__url']
+                    } for trait in traits_by_score[row['num']]
+                ],
+                'method_name': row['method_name'],
+                'method_params': row['method_params'],
+                'variants_number': row['variants_number'],
+                'variants_interactions': row['variants_interactions'],
+                'variants_genomebuild': row['variants_genomebuild'],
+                'weight_type': row['weight_type'],
+                'ancestry_distribution': row['ancestries'],
+                'date_release': format_date(row['date_released']),
+                'license': row['license']
+            }
+        return [scores[pk] for pk in pks if pk in scores]
+
+
+## Performance metrics ##
+
+class PerformanceValuesSerializer(ValuesSerializer):
+    """ Same output as PerformanceSerializer """
+
+    performance_fields = ('num', 'id', 'score__id', 'phenotyping_reported', 'sampleset_id', 'sampleset__id',
+                          'covariates', 'performance_comments')
+
+    # Metric types, with their key in 'performance_metrics'
+    metric_types = {
+        'Effect Size': 'effect_sizes',
+        'Classification Metric': 'class_acc',
+        'Other Metric': 'othermetrics'
+    }
+
+    def serialize(self, pks):
+        performance_rows = list(Performance.objects.filter(num__in=pks).values(*self.performance_fields, *[f'publication__{field}' for field in publication_fields]))
+        sample_ids = get_sample_ids(SampleSet.samples.through, 'sampleset_id', {row['sampleset_id'] for row in performance_rows})
+        samples = get_samples([id for ids in sample_ids.values() for id in ids])
+        metric_rows = Metric.objects.filter(performance_id__in=pks).values(
+            'performance_id', 'type', 'name', 'name_short', 'estimate', 'unit', 'ci', 'se'
+        ).order_by('id')
+        metrics_by_performance = group_rows(metric_rows, 'performance_id')
+
+        performances = {}
+        for row in performance_rows:
+            performances[row['num']] = {
+                'id': row['id'],
+                'associated_pgs_id': row['score__id'],
+                'phenotyping_reported': row['phenotyping_reported'],
+                'publication': publication_values(row),
+                'sampleset': {
+                    'id': row['sampleset__id'],
+                    'samples': [samples[id] for id in sample_ids[row['sampleset_id']]]
+                },
+                'performance_metrics': self.performance_metrics(metrics_by_performance[row['num']]),
+                'covariates': row['covariates'],
+                'performance_comments': row['performance_comments']
+            }
+        return [performances[pk] for pk in pks if pk in performances]
+
+
+    def performance_metrics(self, metric_rows):
+        ''' Same data as Performance.performance_metrics, in one pass over the metrics '''
+        perf_metrics = {key: [] for key in self.metric_types.values()}
+        for metric in metric_rows:
+            key = self.metric_types.get(metric['type'])
+            if not key:
+                continue
+            name_short = metric['name'] if metric['name_short'] is None else metric['name_short']
+            values = { 'name_long': metric['name'], 'name_short': name_short, 'estimate': metric['estimate'] }
+            if metric['ci'] != None:
+                values['ci_lower'] = float(metric['ci'].lower)
+                values['ci_upper'] = float(metric['ci'].upper)
+            elif metric['se'] != None:
+                values['se'] = metric['se']
+            if metric['unit'] != '':
+                values['unit'] = metric['unit']
+            perf_metrics[key].append(values)
+        return perf_metrics
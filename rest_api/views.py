@@ -1,22 +1,43 @@
+import re
+from datetime import date
+from itertools import islice
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.utils.decorators import method_decorator
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 from rest_framework.exceptions import Throttled
+from rest_framework.renderers import JSONRenderer
 from rest_framework.serializers import ValidationError
+from rest_framework.settings import api_settings
 from pgs_web import constants
 from pgs_web import constants_rest
 from django.db.models import Prefetch, Q
 from catalog.models import *
+from catalog.cache.release_cache import release_cache_page
+from catalog.current_release import get_release_statistics
+from catalog.middleware.compression import set_precompressed
 from .serializers import *
+from .values_serializers import ScoreValuesSerializer, PerformanceValuesSerializer
+from .models import RestDocument, ReleaseChange
+from .search import search_traits
+from .concurrency import iterate_in_thread
+from .renderers import CSVRenderer, TSVRenderer
+from .parquet import MANIFEST_FILENAME, PARQUET_MEDIA_TYPE, get_export_file
+
+# Renderers of the views returning tabular data: default renderers, CSV and TSV (see rest_api.tabular)
+tabular_renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, TSVRenderer]
 
 generic_defer = ['curation_notes']
 related_dict = {
     'score_prefetch' : [
-        Prefetch('trait_efo', queryset=EFOTrait.objects.defer('synonyms','mapped_terms').all()),
-        Prefetch('samples_variants', queryset=Sample.objects.select_related('sample_age','followup_time').all().order_by('id').prefetch_related('cohorts')),
-        Prefetch('samples_training', queryset=Sample.objects.select_related('sample_age','followup_time').all().order_by('id').prefetch_related('cohorts')),
+        Prefetch('trait_efo', queryset=EFOTrait.objects.defer('synonyms','mapped_terms').all().order_by('id')),
+        Prefetch('samples_variants', queryset=Sample.objects.select_related('sample_age','followup_time').all().order_by('id').prefetch_related(Prefetch('cohorts', queryset=Cohort.objects.order_by('id')))),
+        Prefetch('samples_training', queryset=Sample.objects.select_related('sample_age','followup_time').all().order_by('id').prefetch_related(Prefetch('cohorts', queryset=Cohort.objects.order_by('id')))),
     ],
     'perf_select': ['score', 'publication', 'sampleset'],
     'associated_scores_prefetch': [Prefetch('associated_scores', queryset=Score.objects.only('id','trait_efo__id').all())],
@@ -26,20 +47,80 @@ related_dict = {
                                            ],
     'traitcategory_prefetch': [Prefetch('traitcategory', queryset=TraitCategory.objects.only('label','efotraits__id').all())],
     'traitcategory_ontology_prefetch': [Prefetch('traitcategory', queryset=TraitCategory.objects.only('label','efotraits_ontology__id').all())],
+    'ontology_child_traits_prefetch': [Prefetch('child_traits', queryset=EFOTrait_Ontology.objects.prefetch_related(
+                                             Prefetch('scores_direct_associations', queryset=Score.objects.only('id','trait_efo__id').all()),
+                                             Prefetch('scores_child_associations', queryset=Score.objects.only('id','trait_efo__id').all()),
+                                             Prefetch('traitcategory', queryset=TraitCategory.objects.only('label','efotraits_ontology__id').all())
+                                         ))],
     'efotraits_ontology_set_prefetch': [Prefetch('efotraits_ontology_set', queryset=EFOTrait_Ontology.objects.only('label','child_traits__id').all())],
     'efotraits_prefetch': [Prefetch('efotraits', queryset=EFOTrait.objects.defer('synonyms','mapped_terms').all())],
-    'sample_set_prefetch' : [
-                              Prefetch('sample_set', queryset=Sample.objects.only('id').all()),
-                              'sample_set__sampleset',
-                              Prefetch('sample_set__score_variants', queryset=Score.objects.only('id').all()),
-                              Prefetch('sample_set__score_training', queryset=Score.objects.only('id').all())
-                            ],
-    'sampleset_samples_cohorts_prefetch': [Prefetch('sampleset__samples__cohorts', queryset=Cohort.objects.only('id','name_short','name_full').all())],
+    'cohort_associations_prefetch': [Prefetch('associations', queryset=CohortAssociation.objects.select_related('score').only('cohort_id','association_type','score__id').all())],
+    'perf_prefetch': [
+        Prefetch('sampleset__samples', queryset=Sample.objects.all().order_by('id')),
+        Prefetch('sampleset__samples__cohorts', queryset=Cohort.objects.all().order_by('id')),
+        Prefetch('performance_metric', queryset=Metric.objects.all().order_by('id'))
+    ],
     'score_defer': [*generic_defer,'publication__curation_status','publication__curation_notes','publication__date_released','publication__authors'],
     'perf_defer': [*generic_defer,'date_released','score__ancestries','score__curation_notes','score__date_released','publication__curation_status','publication__curation_notes','publication__date_released','publication__authors'],
     'publication_defer': [*generic_defer,'curation_status']
 }
 
+def get_prefetch(key, lookup):
+    ''' Return the Prefetch objects of related_dict[key] for the given lookup '''
+    return [prefetch for prefetch in related_dict[key] if prefetch.prefetch_to == lookup]
+
+
+publication_only = ['publication', *[f'publication__{field}' for field in PublicationSerializer.Meta.fields]]
+
+# Columns ('only'), relations ('select' and 'prefetch') needed by each field of the serializers,
+# to load the minimal data when only some fields are requested (see SparseFieldsMixin)
+fields_plans = {
+    'score': {
+        'id': {'only': ['id']},
+        'name': {'only': ['name']},
+        'ftp_scoring_file': {'only': ['id']},
+        'ftp_harmonized_scoring_files': {'only': ['id']},
+        'publication': {'only': publication_only, 'select': ['publication']},
+        'matches_publication': {'only': ['flag_asis']},
+        'samples_variants': {'prefetch': get_prefetch('score_prefetch', 'samples_variants')},
+        'samples_training': {'prefetch': get_prefetch('score_prefetch', 'samples_training')},
+        'trait_reported': {'only': ['trait_reported']},
+        'trait_additional': {'only': ['trait_additional']},
+        'trait_efo': {'prefetch': get_prefetch('score_prefetch', 'trait_efo')},
+        'method_name': {'only': ['method_name']},
+        'method_params': {'only': ['method_params']},
+        'variants_number': {'only': ['variants_number']},
+        'variants_interactions': {'only': ['variants_interactions']},
+        'variants_genomebuild': {'only': ['variants_genomebuild']},
+        'weight_type': {'only': ['weight_type']},
+        'ancestry_distribution': {'only': ['ancestries']},
+        'date_release': {'only': ['date_released']},
+        'license': {'only': ['license']}
+    },
+    'performance': {
+        'id': {'only': ['id']},
+        'associated_pgs_id': {'only': ['score', 'score__id'], 'select': ['score']},
+        'phenotyping_reported': {'only': ['phenotyping_reported']},
+        'phenotype_efo': {},
+        'publication': {'only': publication_only, 'select': ['publication']},
+        'sampleset': {
+            'only': ['sampleset', 'sampleset__id'],
+            'select': ['sampleset'],
+            'prefetch': [*get_prefetch('perf_prefetch', 'sampleset__samples'), *get_prefetch('perf_prefetch', 'sampleset__samples__cohorts')]
+        },
+        'performance_metrics': {'prefetch': get_prefetch('perf_prefetch', 'performance_metric')},
+        'covariates': {'only': ['covariates']},
+        'performance_comments': {'only': ['performance_comments']}
+    },
+    'publication': {
+        **{field: {'only': [field]} for field in PublicationSerializer.Meta.fields},
+        'date_release': {'only': ['date_released']},
+        'authors': {'only': ['authors']},
+        'associated_pgs_ids': {}
+    }
+}
+
+
 def custom_exception_handler(exc, context):
     # Call REST framework's default exception handler first,
     # to get the standard error response.
@@ -94,13 +175,217 @@ def get_ids_list(object):
     return ids_list
 
 
+def format_trait_id(trait_id):
+    trait_id = trait_id.upper().replace(':', '_')
+
+    # Check if the trait ID belongs to a source where the prefix is not in upper case (e.g. Orphanet)
+    trait_id_lc = trait_id.lower()
+    for source in constants.TRAIT_SOURCE_TO_REPLACE:
+        source_lc = source.lower()
+        if trait_id_lc.startswith(source_lc):
+            trait_id = trait_id_lc.replace(source_lc,source)
+            break
+    return trait_id
+
+
+class StreamListMixin:
+    """
+    Stream all the results of a list endpoint in one response (no pagination),
+    e.g. with the URL parameters 'format=ndjson&stream=1'.
+    The queryset is fetched by chunks (the prefetches being run once per chunk)
+    and each chunk is serialized and sent before fetching the next one.
+    """
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('stream') in ('1', 'true'):
+            return self.stream_list(request)
+        return super().list(request, *args, **kwargs)
+
+
+    def stream_list(self, request):
+        renderer = request.accepted_renderer
+        if not hasattr(renderer, 'render_rows'):
+            raise ValidationError({'stream': f'URL parameter \'stream\' is not supported with the format \'{renderer.format}\''})
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = self.get_serializer_class()
+        serializer_context = self.get_serializer_context()
+
+        def serialized_chunks():
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            while True:
+                chunk = list(islice(rows, self.stream_chunk_size))
+                if not chunk:
+                    break
+                yield serializer_class(chunk, many=True, context=serializer_context).data
+
+        renderer_context = self.get_renderer_context()
+        content = renderer.render_rows(serialized_chunks(), renderer_context)
+        if isinstance(request._request, ASGIRequest):
+            # Served by an ASGI server: send each chunk as soon as it is ready, instead of the whole content at the end
+            content = iterate_in_thread(content)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        return StreamingHttpResponse(content, content_type=content_type)
+
+
+class ValuesSerializerMixin:
+    """
+    Serialize the results with a values-based serializer (see rest_api.values_serializers) instead of the
+    DRF ModelSerializer, when enabled (settings.REST_VALUES_SERIALIZERS).
+    The queryset only selects the primary keys of the results, the serializer fetching their data.
+    """
+    values_serializer_class = None
+
+    def use_values_serializer(self):
+        return settings.REST_VALUES_SERIALIZERS and self.values_serializer_class is not None
+
+
+    def get_serializer_class(self):
+        if self.use_values_serializer():
+            return self.values_serializer_class
+        return super().get_serializer_class()
+
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_values_serializer() and hasattr(queryset, 'only'):
+            queryset = queryset.select_related(None).prefetch_related(None).only('pk')
+        return queryset
+
+
+class SparseFieldsMixin:
+    """
+    Select the fields returned for each result with the parameters 'fields' or 'exclude' (comma-separated lists of fields).
+    The queryset only loads the columns and relations needed by the selected fields (see 'fields_plans'),
+    so the relations of the other fields are not queried.
+    """
+    fields_plan = None
+
+    def get_sparse_fields(self):
+        ''' Return the list of selected fields, or None if all the fields are returned '''
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            plan = fields_plans[self.fields_plan]
+            for param in ('fields', 'exclude'):
+                value = self.request.query_params.get(param)
+                if value is None:
+                    continue
+                names = [name.strip() for name in value.split(',') if name.strip()]
+                unknown_names = [name for name in names if name not in plan]
+                if unknown_names:
+                    raise ValidationError({param: f'Unknown field(s) in the parameter \'{param}\': {", ".join(unknown_names)}. Available fields: {", ".join(plan.keys())}'})
+                if param == 'fields':
+                    self._sparse_fields = [name for name in plan if name in names]
+                else:
+                    self._sparse_fields = [name for name in plan if name not in names]
+                break
+        return self._sparse_fields
+
+
+    def apply_fields_plan(self, queryset):
+        ''' Restrict the queryset to the columns and relations needed by the selected fields '''
+        fields = self.get_sparse_fields()
+        if fields is None or not hasattr(queryset, 'only'):
+            return queryset
+        only, select, prefetch = [], [], []
+        for field in fields:
+            plan = fields_plans[self.fields_plan][field]
+            only.extend(plan.get('only', []))
+            select.extend(plan.get('select', []))
+            prefetch.extend(plan.get('prefetch', []))
+        queryset = queryset.select_related(None).prefetch_related(None).only(*dict.fromkeys(only))
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            context['fields'] = fields
+        return context
+
+
+    def use_values_serializer(self):
+        return self.get_sparse_fields() is None and super().use_values_serializer()
+
+
+    def filter_queryset(self, queryset):
+        return self.apply_fields_plan(super().filter_queryset(queryset))
+
+
+def use_documents(request):
+    ''' Check if the results can be served from the JSON documents generated at release time '''
+    if 'fields' in request.query_params or 'exclude' in request.query_params:
+        return False
+    return settings.REST_DOCUMENT_STORE and request.accepted_renderer.format == 'json'
+
+
+def get_document_response(request, entity, object_id):
+    ''' Return the JSON document of an entry as response, or None if there is no document available '''
+    if not use_documents(request):
+        return None
+    document = RestDocument.get_document(entity, object_id)
+    if not document:
+        return None
+    data, compressed_data = document
+    response = HttpResponse(data, content_type=request.accepted_renderer.media_type)
+    set_precompressed(response, compressed_data)
+    return response
+
+
+class DocumentListMixin:
+    """
+    Serve the results filtered by IDs ('filter_ids' parameter) from the JSON documents generated at release time,
+    only fetching the IDs of the page from the entity table.
+    The view falls back to the serializers if any document is missing.
+    """
+    document_entity = None
+
+    def list(self, request, *args, **kwargs):
+        if self.document_entity and use_documents(request) and get_ids_list(self):
+            response = self.list_documents(request)
+            if response:
+                return response
+        return super().list(request, *args, **kwargs)
+
+
+    def list_documents(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None).only('num', 'id')
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return None
+        ids = [entry.id for entry in page]
+        documents = RestDocument.get_documents(self.document_entity, ids)
+        if len(documents) != len(set(ids)):
+            return None
+
+        # Render the pagination envelope with an empty list of results, then insert the documents
+        envelope = self.get_paginated_response(ids).data
+        envelope['results'] = []
+        content = JSONRenderer().render(envelope)
+        content = content[:-len(b'[]}')] + b'[' + b','.join(documents[id] for id in ids) + b']}'
+        return HttpResponse(content, content_type=request.accepted_renderer.media_type)
+
+
 ## Publications ##
 
-class RestListPublications(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestListPublications(StreamListMixin, DocumentListMixin, SparseFieldsMixin, generics.ListAPIView):
     """
     Retrieve the PGS Publications
     """
     serializer_class = PublicationExtendedSerializer
+    cursor_field = 'num'
+    document_entity = 'publication'
+    fields_plan = 'publication'
+    concurrent_queries = True
 
     def get_queryset(self):
         # Fetch all the Publications
@@ -114,29 +399,37 @@ class RestListPublications(generics.ListAPIView):
         return queryset
 
 
-class RestPublication(generics.RetrieveAPIView):
+@method_decorator(release_cache_page('rest_detail'), name='get')
+class RestPublication(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     Retrieve one PGS Publication
     """
+    fields_plan = 'publication'
 
     def get(self, request, pgp_id):
         if pgp_id.isdigit():
             pgp_id = 'PGP'+pgp_id.zfill(6)
             return redirect('getPublication', pgp_id=pgp_id, permanent=True)
         pgp_id = pgp_id.upper()
+        response = get_document_response(request, 'publication', pgp_id)
+        if response:
+            return response
         try:
-            queryset = Publication.objects.defer(*related_dict['publication_defer']).get(id=pgp_id)
+            queryset = self.apply_fields_plan(Publication.objects.defer(*related_dict['publication_defer'])).get(id=pgp_id)
         except Publication.DoesNotExist:
             queryset = None
-        serializer = PublicationExtendedSerializer(queryset,many=False)
+        serializer = PublicationExtendedSerializer(queryset,many=False,context=self.get_serializer_context())
         return Response(serializer.data)
 
 
-class RestPublicationSearch(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_search'), name='get')
+class RestPublicationSearch(SparseFieldsMixin, generics.ListAPIView):
     """
     Retrieve the Publication(s) using query
     """
     serializer_class = PublicationExtendedSerializer
+    fields_plan = 'publication'
+    concurrent_queries = True
 
     def get_queryset(self):
         queryset = Publication.objects.defer(*related_dict['publication_defer']).all().order_by('num')
@@ -174,11 +467,19 @@ class RestPublicationSearch(generics.ListAPIView):
 
 ## Scores ##
 
-class RestListScores(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestListScores(StreamListMixin, DocumentListMixin, SparseFieldsMixin, ValuesSerializerMixin, generics.ListAPIView):
     """
     Retrieve the Polygenic Scores
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'score'
     serializer_class = ScoreSerializer
+    values_serializer_class = ScoreValuesSerializer
+    cursor_field = 'num'
+    document_entity = 'score'
+    fields_plan = 'score'
+    concurrent_queries = True
 
     def get_queryset(self):
         # Fetch all the Scores
@@ -192,29 +493,42 @@ class RestListScores(generics.ListAPIView):
         return queryset
 
 
-class RestScore(generics.RetrieveAPIView):
+@method_decorator(release_cache_page('rest_detail'), name='get')
+class RestScore(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     Retrieve one Polygenic Score (PGS)
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'score'
+    fields_plan = 'score'
 
     def get(self, request, pgs_id):
         if pgs_id.isdigit():
             pgs_id = 'PGS'+pgs_id.zfill(6)
             return redirect('getScore', pgs_id=pgs_id, permanent=True)
         pgs_id = pgs_id.upper()
+        response = get_document_response(request, 'score', pgs_id)
+        if response:
+            return response
         try:
-            queryset = Score.objects.defer(*related_dict['score_defer']).select_related('publication').prefetch_related(*related_dict['score_prefetch']).get(id=pgs_id)
+            queryset = self.apply_fields_plan(Score.objects.defer(*related_dict['score_defer']).select_related('publication').prefetch_related(*related_dict['score_prefetch'])).get(id=pgs_id)
         except Score.DoesNotExist:
             queryset = None
-        serializer = ScoreSerializer(queryset,many=False)
+        serializer = ScoreSerializer(queryset,many=False,context=self.get_serializer_context())
         return Response(serializer.data)
 
 
-class RestScoreSearch(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_search'), name='get')
+class RestScoreSearch(SparseFieldsMixin, ValuesSerializerMixin, generics.ListAPIView):
     """
     Search the Polygenic Score(s) using query
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'score'
     serializer_class = ScoreSerializer
+    values_serializer_class = ScoreValuesSerializer
+    fields_plan = 'score'
+    concurrent_queries = True
 
     def get_queryset(self):
         queryset = Score.objects.defer(*related_dict['score_defer']).select_related('publication').all().prefetch_related(*related_dict['score_prefetch']).order_by('num')
@@ -256,15 +570,23 @@ class RestScoreSearch(generics.ListAPIView):
 
 ## Performance metrics ##
 
-class RestListPerformances(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestListPerformances(StreamListMixin, DocumentListMixin, SparseFieldsMixin, ValuesSerializerMixin, generics.ListAPIView):
     """
     Retrieve the PGS Performance Metrics
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'performance'
     serializer_class = PerformanceSerializer
+    values_serializer_class = PerformanceValuesSerializer
+    cursor_field = 'num'
+    document_entity = 'performance'
+    fields_plan = 'performance'
+    concurrent_queries = True
 
     def get_queryset(self):
         # Fetch all the Performances
-        queryset = Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).all().prefetch_related('sampleset__samples',*related_dict['sampleset_samples_cohorts_prefetch'],'performance_metric').order_by('num')
+        queryset = Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).all().prefetch_related(*related_dict['perf_prefetch']).order_by('num')
 
         # Filter by list of Performance IDs
         ids_list = get_ids_list(self)
@@ -274,16 +596,21 @@ class RestListPerformances(generics.ListAPIView):
         return queryset
 
 
-class RestPerformanceSearch(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_search'), name='get')
+class RestPerformanceSearch(SparseFieldsMixin, ValuesSerializerMixin, generics.ListAPIView):
     """
     Retrieve the Performance metric(s) using query
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'performance'
     serializer_class = PerformanceSerializer
-
+    values_serializer_class = PerformanceValuesSerializer
+    fields_plan = 'performance'
+    concurrent_queries = True
 
     def get_queryset(self):
 
-        queryset = Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).all().prefetch_related('sampleset__samples',*related_dict['sampleset_samples_cohorts_prefetch'],'performance_metric').order_by('num')
+        queryset = Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).all().prefetch_related(*related_dict['perf_prefetch']).order_by('num')
         params = 0
 
         # Search by Score ID
@@ -312,37 +639,46 @@ class RestPerformanceSearch(generics.ListAPIView):
         return queryset
 
 
-class RestPerformance(generics.RetrieveAPIView):
+@method_decorator(release_cache_page('rest_detail'), name='get')
+class RestPerformance(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     Retrieve one Performance metric
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'performance'
+    fields_plan = 'performance'
 
     def get(self, request, ppm_id):
         if ppm_id.isdigit():
             ppm_id = 'PPM'+ppm_id.zfill(6)
             return redirect('getPerformanceMetric', ppm_id=ppm_id, permanent=True)
         ppm_id = ppm_id.upper()
+        response = get_document_response(request, 'performance', ppm_id)
+        if response:
+            return response
         try:
-            queryset = Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).prefetch_related('sampleset__samples',*related_dict['sampleset_samples_cohorts_prefetch'],'performance_metric').get(id=ppm_id)
+            queryset = self.apply_fields_plan(Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).prefetch_related(*related_dict['perf_prefetch'])).get(id=ppm_id)
         except Performance.DoesNotExist:
             queryset = None
-        serializer = PerformanceSerializer(queryset,many=False)
+        serializer = PerformanceSerializer(queryset,many=False,context=self.get_serializer_context())
         return Response(serializer.data)
 
 
 ## Traits ##
 
-class RestListEFOTraits(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestListEFOTraits(StreamListMixin, generics.ListAPIView):
     """
     Retrieve all the EFO Traits
     """
+    concurrent_queries = True
 
     def get_queryset(self):
         include_parents = self.get_include_parents_param()
         include_children_pgs_ids = self.get_include_children_pgs_ids_param()
 
         if include_parents or include_children_pgs_ids:
-            queryset = EFOTrait_Ontology.objects.all().prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch']).order_by('label').distinct()
+            queryset = EFOTrait_Ontology.objects.all().prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch']).order_by('label')
         else:
             queryset = EFOTrait.objects.all().prefetch_related(*related_dict['associated_scores_prefetch'], *related_dict['traitcategory_prefetch']).order_by('label')
 
@@ -350,7 +686,8 @@ class RestListEFOTraits(generics.ListAPIView):
         ids_list = get_ids_list(self)
         if ids_list:
             if include_parents:
-                queryset = queryset.filter(Q(id__in=ids_list) | Q(child_traits__id__in=ids_list))
+                # The traits and their ancestors, from the closure table of the ontology
+                queryset = queryset.filter(Q(id__in=ids_list) | Q(id__in=EFOTraitClosure.objects.filter(descendant_id__in=ids_list).values('ancestor_id')))
             else:
                 queryset = queryset.filter(id__in=ids_list)
 
@@ -387,26 +724,14 @@ class RestListEFOTraits(generics.ListAPIView):
         return False
 
 
+@method_decorator(release_cache_page('rest_detail'), name='get')
 class RestEFOTrait(generics.RetrieveAPIView):
     """
     Retrieve one EFO Trait
     """
 
     def get(self, request, trait_id):
-        trait_id = trait_id.upper().replace(':', '_')
-
-        # Check if the trait ID belongs to a source where the prefix is not in upper case (e.g. Orphanet)
-        trait_id_lc = trait_id.lower()
-        for source in constants.TRAIT_SOURCE_TO_REPLACE:
-            source_lc = source.lower()
-            if trait_id_lc.startswith(source_lc):
-                trait_id = trait_id_lc.replace(source_lc,source)
-                break
-
-        try:
-            queryset = EFOTrait_Ontology.objects.prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch']).get(id=trait_id)
-        except EFOTrait_Ontology.DoesNotExist:
-            queryset = None
+        trait_id = format_trait_id(trait_id)
 
         # 'include_children' parameter
         include_children = True
@@ -415,6 +740,19 @@ class RestEFOTrait(generics.RetrieveAPIView):
             if  param_include_children == '0' or param_include_children == 0:
                 include_children = False
 
+        if include_children:
+            response = get_document_response(request, 'trait', trait_id)
+            if response:
+                return response
+
+        queryset = EFOTrait_Ontology.objects.prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch'])
+        if include_children:
+            queryset = queryset.prefetch_related(*related_dict['ontology_child_traits_prefetch'])
+        try:
+            queryset = queryset.get(id=trait_id)
+        except EFOTrait_Ontology.DoesNotExist:
+            queryset = None
+
         if include_children:
            serializer = EFOTraitOntologyChildSerializer(queryset,many=False)
         else:
@@ -423,16 +761,16 @@ class RestEFOTrait(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
+@method_decorator(release_cache_page('rest_search'), name='get')
 class RestEFOTraitSearch(generics.ListAPIView):
     """
     Retrieve the EFO Trait(s) using query
     """
     serializer_class = EFOTraitOntologySerializer
+    concurrent_queries = True
 
     def get_queryset(self):
 
-        queryset = EFOTrait_Ontology.objects.all().prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch']).order_by('label').distinct()
-
         # 'include_children' parameter
         include_children = True
         param_include_children = self.request.query_params.get('include_children')
@@ -450,29 +788,8 @@ class RestEFOTraitSearch(generics.ListAPIView):
         # Search by trait term
         term = self.request.query_params.get('term')
         if term and term is not None:
-            if include_children:
-                if exact_term:
-                    queryset = queryset.filter(
-                        Q(id=term) | Q(label=term) | Q(synonyms__regex=r'(^|\| )'+term+r'( \||$)') |
-                        Q(mapped_terms__regex=r'(^|\| )'+term+r'( \||$)') | Q(traitcategory__label=term) |
-                        Q(parent_traits__id=term) | Q(parent_traits__label=term)
-                    )
-                else:
-                    queryset = queryset.filter(
-                        Q(id=term) | Q(label__icontains=term) | Q(synonyms__icontains=term) | Q(mapped_terms__icontains=term) |
-                        Q(traitcategory__label__icontains=term) | Q(parent_traits__id=term) | Q(parent_traits__label__icontains=term)
-                    )
-            else:
-                if exact_term:
-                    queryset = queryset.filter(
-                        Q(id=term) | Q(label=term) | Q(synonyms__regex=r'(^|\| )'+term+r'( \||$)') |
-                        Q(mapped_terms__regex=r'(^|\| )'+term+r'( \||$)') | Q(traitcategory__label=term)
-                    )
-                else:
-                    queryset = queryset.filter(
-                        Q(id=term) | Q(label__icontains=term) | Q(synonyms__icontains=term) | Q(mapped_terms__icontains=term) |
-                        Q(traitcategory__label__icontains=term)
-                    )
+            queryset = search_traits(term, exact=exact_term, include_children=include_children)
+            queryset = queryset.prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch']).order_by('label')
         else:
             queryset = []
         return queryset
@@ -480,6 +797,7 @@ class RestEFOTraitSearch(generics.ListAPIView):
 
 ## Trait Categories ##
 
+@method_decorator(release_cache_page('rest_list'), name='get')
 class RestListTraitCategories(generics.ListAPIView):
     """
     Retrieve all the Trait categories
@@ -490,16 +808,21 @@ class RestListTraitCategories(generics.ListAPIView):
 
 ## Samples / Sample Sets ##
 
+@method_decorator(release_cache_page('rest_list'), name='get')
 class RestListSampleSets(generics.ListAPIView):
     """
     Retrieve all the Cohorts
     """
-    queryset = SampleSet.objects.all().prefetch_related('samples', 'samples__cohorts').order_by('id')
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'sample_set'
+    queryset = SampleSet.objects.all().prefetch_related('samples', 'samples__cohorts').order_by('num')
     serializer_class = SampleSetSerializer
+    cursor_field = 'num'
+    concurrent_queries = True
 
     def get_queryset(self):
         # Fetch all the SampleSets
-        queryset = SampleSet.objects.all().prefetch_related('samples', 'samples__cohorts').order_by('id')
+        queryset = SampleSet.objects.all().prefetch_related('samples', 'samples__cohorts').order_by('num')
 
         # Filter by list of SampleSet IDs
         ids_list = get_ids_list(self)
@@ -509,10 +832,13 @@ class RestListSampleSets(generics.ListAPIView):
         return queryset
 
 
+@method_decorator(release_cache_page('rest_detail'), name='get')
 class RestSampleSet(generics.RetrieveAPIView):
     """
     Retrieve one Sample Set
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'sample_set'
 
     def get(self, request, pss_id):
         if pss_id.isdigit():
@@ -527,11 +853,15 @@ class RestSampleSet(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
+@method_decorator(release_cache_page('rest_search'), name='get')
 class RestSampleSetSearch(generics.ListAPIView):
     """
     Retrieve the Sample Set(s) using query
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'sample_set'
     serializer_class = SampleSetSerializer
+    concurrent_queries = True
 
     def get_queryset(self):
 
@@ -545,38 +875,38 @@ class RestSampleSetSearch(generics.ListAPIView):
         pmid = self.request.query_params.get('pmid')
 
         if (pgs_id and pgs_id is not None) or (pgp_id and pgp_id is not None) or (pmid and pmid.isnumeric()):
+            # Filters on the Performances using the Sample Sets (applied together, on the same Performance)
             filters = {}
             if pgs_id and pgs_id is not None:
                 pgs_id = pgs_id.upper()
-                filters['score__id'] = pgs_id
+                filters['sampleset_performance__score__id'] = pgs_id
 
             if pgp_id and pgp_id is not None:
                 pgp_id = pgp_id.upper()
-                filters['publication__id'] = pgp_id
+                filters['sampleset_performance__publication__id'] = pgp_id
 
             if pmid and pmid.isnumeric():
-                filters['publication__PMID'] = pmid
+                filters['sampleset_performance__publication__PMID'] = pmid
 
-            perfs = Performance.objects.only('score_id','publication_id','sampleset_id').select_related('sampleset').filter(**filters).prefetch_related('sampleset__samples',*related_dict['sampleset_samples_cohorts_prefetch'])
-            for perf in perfs:
-                sampleset = perf.sampleset
-                if not sampleset in queryset:
-                    queryset.append(sampleset)
-            queryset.sort(key=lambda x: x.id, reverse=False)
+            # The samples are only fetched for the page of results
+            queryset = SampleSet.objects.filter(**filters).distinct().prefetch_related('samples', 'samples__cohorts').order_by('id')
 
         return queryset
 
 
 ## Cohorts ##
 
-class RestListCohorts(generics.ListAPIView):
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestListCohorts(StreamListMixin, generics.ListAPIView):
     """
     Retrieve all the Cohorts
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'cohort'
     serializer_class = CohortExtendedSerializer
 
     def get_queryset(self):
-        queryset = Cohort.objects.all().prefetch_related(*related_dict['sample_set_prefetch']).order_by('name_short')
+        queryset = Cohort.objects.all().prefetch_related(*related_dict['cohort_associations_prefetch']).order_by('name_short')
 
         # 'fetch_all' parameter: fetch released and non released Cohorts
         fetch_all_cohorts = False
@@ -592,21 +922,20 @@ class RestListCohorts(generics.ListAPIView):
 
         # Filter the query depending on the parameters used
         if names_list:
-            names_list = r'^('+'|'.join(names_list)+')$'
-            if fetch_all_cohorts:
-                queryset = queryset.filter(name_short__iregex=names_list)
-            else:
-                queryset = queryset.filter(name_short__iregex=names_list, released=True)
-        elif fetch_all_cohorts == False:
+            queryset = Cohort.filter_by_names(names_list, queryset)
+        if fetch_all_cohorts == False:
             queryset = queryset.filter(released=True)
 
         return queryset
 
 
+@method_decorator(release_cache_page('rest_detail'), name='get')
 class RestCohorts(generics.ListAPIView):
     """
     Retrieve Cohort(s)
     """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'cohort'
     serializer_class = CohortExtendedSerializer
 
     def get_queryset(self):
@@ -615,7 +944,7 @@ class RestCohorts(generics.ListAPIView):
         try:
             cohort_symbol = self.kwargs['cohort_symbol']
             # Database filtering
-            queryset = Cohort.objects.filter(name_short__iexact=cohort_symbol, released=True).prefetch_related(*related_dict['sample_set_prefetch'])
+            queryset = Cohort.objects.filter(name_short__iexact=cohort_symbol, released=True).prefetch_related(*related_dict['cohort_associations_prefetch'])
         except Cohort.DoesNotExist:
             queryset = []
         return queryset
@@ -623,6 +952,7 @@ class RestCohorts(generics.ListAPIView):
 
 ## Releases ##
 
+@method_decorator(release_cache_page('rest_list'), name='get')
 class RestListReleases(generics.ListAPIView):
     """
     Retrieve all the Release information
@@ -631,6 +961,7 @@ class RestListReleases(generics.ListAPIView):
     serializer_class = ReleaseSerializer
 
 
+@method_decorator(release_cache_page('rest_detail'), name='get')
 class RestRelease(generics.RetrieveAPIView):
     """
     Retrieve one Release information
@@ -645,10 +976,80 @@ class RestRelease(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
+@method_decorator(release_cache_page('rest_list'), name='get')
+class RestReleaseChanges(StreamListMixin, generics.ListAPIView):
+    """
+    Retrieve the entries added, updated, retired or removed in a Release (or between two Releases)
+    """
+    renderer_classes = tabular_renderer_classes
+    tabular_columns = 'release_change'
+    serializer_class = ReleaseChangeSerializer
+    concurrent_queries = True
+
+    def parse_date(self, param, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({param: f'Invalid date \'{value}\' (format: YYYY-MM-DD)'})
+
+    def get_queryset(self):
+        release_date = self.kwargs['release_date']
+        if release_date == 'current':
+            release_date = Release.objects.order_by('-date').values_list('date', flat=True).first()
+            if not release_date:
+                raise Http404
+        else:
+            release_date = self.parse_date('release_date', release_date)
+
+        # Changes since the given release (excluded), by default since the previous release
+        since = self.request.query_params.get('since')
+        if since:
+            since = self.parse_date('since', since)
+        else:
+            since = Release.objects.filter(date__lt=release_date).order_by('-date').values_list('date', flat=True).first()
+
+        queryset = ReleaseChange.objects.filter(release_date__lte=release_date)
+        if since:
+            queryset = queryset.filter(release_date__gt=since)
+
+        for param in ('entity', 'change'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value.lower()})
+        return queryset.order_by('release_date', 'id')
+
+
+class RestReleaseParquet(APIView):
+    """
+    Download the Parquet dumps of a Release (manifest or Parquet file of a table)
+    """
+
+    def get(self, request, release_date, filename=None):
+        if release_date == 'current':
+            release_date = Release.objects.order_by('-date').values_list('date', flat=True).first()
+            if not release_date:
+                raise Http404
+        else:
+            # Validated before being used in the path of the files
+            try:
+                release_date = date.fromisoformat(release_date)
+            except ValueError:
+                raise ValidationError({'release_date': f'Invalid date \'{release_date}\' (format: YYYY-MM-DD)'})
+        path = get_export_file(release_date, filename or MANIFEST_FILENAME)
+        if not path:
+            raise Http404
+        if path.endswith('.parquet'):
+            return FileResponse(open(path, 'rb'), as_attachment=True, content_type=PARQUET_MEDIA_TYPE)
+        return FileResponse(open(path, 'rb'), content_type='application/json')
+
+
+@method_decorator(release_cache_page('rest_detail'), name='get')
 class RestCurrentRelease(generics.RetrieveAPIView):
     """
     Retrieve the current Release information
     """
+    throttle_weight = 0.25
+
     def get(self, request):
         queryset = Release.objects.order_by('-date').first()
         serializer = ReleaseSerializer(queryset,many=False)
@@ -657,6 +1058,7 @@ class RestCurrentRelease(generics.RetrieveAPIView):
 
 ##### Extra endpoints #####
 
+@method_decorator(release_cache_page('rest_info'), name='get')
 class RestGCST(APIView):
     """
     Retrieve all the Polygenic Score IDs using a given GWAS study (GCST)
@@ -664,37 +1066,136 @@ class RestGCST(APIView):
 
     def get(self, request, gcst_id):
         gcst_id = gcst_id.upper()
-        samples = Sample.objects.filter(source_GWAS_catalog=gcst_id).distinct()
+        pgs_scores = GwasScoreAssociation.get_score_ids([gcst_id])[gcst_id]
 
-        try:
-            scores = Score.objects.only('id').filter(samples_variants__in=samples).distinct()
-        except Score.DoesNotExist:
-            scores = []
+        return Response(pgs_scores)
 
-        pgs_scores = [score.id for score in scores]
 
-        return Response(pgs_scores)
+@method_decorator(release_cache_page('rest_info'), name='get')
+class RestGCSTBatch(APIView):
+    """
+    Retrieve the Polygenic Score IDs using each GWAS study (GCST) of a list ('filter_ids' parameter)
+    """
+    max_ids = 1000
+
+    def get(self, request):
+        gcst_ids = list(dict.fromkeys(x.strip() for x in get_ids_list(self) if x.strip()))
+        if not gcst_ids:
+            raise ValidationError({'filter_ids': 'Parameter \'filter_ids\' is required (list of GWAS Catalog Study IDs)'})
+        if len(gcst_ids) > self.max_ids:
+            raise ValidationError({'filter_ids': f'Parameter \'filter_ids\' should contain less than or equal to {self.max_ids} GWAS Catalog Study IDs'})
+
+        return Response(GwasScoreAssociation.get_score_ids(gcst_ids))
 
 
+class RestBatch(APIView):
+    """
+    Retrieve a list of entries of different types (Scores, Publications, Performance Metrics, Sample Sets and Traits),
+    provided in the JSON object of a POST request (parameter 'filter_ids')
+    """
+    max_ids = 5000
+    # Each group of IDs uses one token of the rate limit
+    ids_per_request = 100
+
+    # Queryset and serializer used for each type of ID (prefix)
+    batch_types = {
+        'PGS': {
+            'queryset': lambda: Score.objects.defer(*related_dict['score_defer']).select_related('publication').prefetch_related(*related_dict['score_prefetch']),
+            'serializer': ScoreSerializer
+        },
+        'PGP': {
+            'queryset': lambda: Publication.objects.defer(*related_dict['publication_defer']),
+            'serializer': PublicationExtendedSerializer
+        },
+        'PPM': {
+            'queryset': lambda: Performance.objects.defer(*related_dict['perf_defer']).select_related(*related_dict['perf_select']).prefetch_related(*related_dict['perf_prefetch']),
+            'serializer': PerformanceSerializer
+        },
+        'PSS': {
+            'queryset': lambda: SampleSet.objects.prefetch_related('samples', 'samples__cohorts'),
+            'serializer': SampleSetSerializer
+        },
+        'trait': {
+            'queryset': lambda: EFOTrait_Ontology.objects.prefetch_related(*related_dict['ontology_associated_scores_prefetch'], *related_dict['traitcategory_ontology_prefetch'], *related_dict['ontology_child_traits_prefetch']),
+            'serializer': EFOTraitOntologyChildSerializer
+        }
+    }
+    pgs_id_pattern = re.compile(r'^(PGS|PGP|PPM|PSS)\d+$')
+
+    def get_ids(self, request):
+        ''' List of unique IDs (formatted) provided in the JSON object '''
+        ids = request.data.get('filter_ids') if hasattr(request.data, 'get') else None
+        if not isinstance(ids, list):
+            return []
+        ids_list = []
+        for id in ids:
+            id = str(id).strip()
+            if not id:
+                continue
+            if self.pgs_id_pattern.match(id.upper()):
+                ids_list.append(id.upper())
+            else:
+                ids_list.append(format_trait_id(id))
+        return list(dict.fromkeys(ids_list))
+
+
+    def get_throttle_cost(self, request):
+        return -(-len(self.get_ids(request)) // self.ids_per_request)
+
+
+    def post(self, request):
+        ids_list = self.get_ids(request)
+        if not ids_list:
+            raise ValidationError({'filter_ids': 'Parameter \'filter_ids\' is required (list of PGS Catalog and trait IDs)'})
+        if len(ids_list) > self.max_ids:
+            raise ValidationError({'filter_ids': f'Parameter \'filter_ids\' should contain less than or equal to {self.max_ids} IDs'})
+
+        # Group the IDs by type
+        ids_by_type = {}
+        for id in ids_list:
+            match = self.pgs_id_pattern.match(id)
+            id_type = match.group(1) if match else 'trait'
+            ids_by_type.setdefault(id_type, []).append(id)
+
+        # One query (and its prefetches) per type of entry
+        results_by_id = {}
+        for id_type, ids in ids_by_type.items():
+            batch_type = self.batch_types[id_type]
+            serializer = batch_type['serializer'](batch_type['queryset']().filter(id__in=ids), many=True)
+            for entry in serializer.data:
+                results_by_id[entry['id']] = entry
+
+        missing_ids = [id for id in ids_list if id not in results_by_id]
+        retired_ids = set()
+        if missing_ids:
+            retired_ids = set(Retired.objects.filter(id__in=missing_ids).values_list('id', flat=True))
+
+        return Response({
+            'size': len(results_by_id),
+            'results': {id: results_by_id[id] for id in ids_list if id in results_by_id},
+            'not_found': [id for id in missing_ids if id not in retired_ids],
+            'retired': [id for id in missing_ids if id in retired_ids]
+        })
+
+
+@method_decorator(release_cache_page('rest_info'), name='get')
 class RestInfo(generics.RetrieveAPIView):
     """
     Return diverse information related to the REST API and the PGS Catalog
     """
+    throttle_weight = 0.25
 
     def get(self, request):
 
-        release = Release.objects.only('date').order_by('-date').first()
+        statistics = get_release_statistics()
         # Mainly to pass the tests as there is no data (and no release) in them
-        if release:
-            release_date = release.date
-        else:
-            release_date = "NA"
+        release_date = statistics['date'] or "NA"
 
         latest_release = {
             'date': release_date,
-            'scores': Score.objects.count(),
-            'publications': Publication.objects.count(),
-            'traits': EFOTrait.objects.count()
+            'scores': statistics['total_score_count'],
+            'publications': statistics['total_publication_count'],
+            'traits': statistics['total_efotrait_count']
         }
 
         data = {
@@ -709,10 +1210,12 @@ class RestInfo(generics.RetrieveAPIView):
         return Response(data)
 
 
+@method_decorator(release_cache_page('rest_info'), name='get')
 class RestApiVersions(generics.RetrieveAPIView):
     """
     Return information about all the REST API versions
     """
+    throttle_weight = 0.25
 
     def get(self, request):
 
@@ -723,10 +1226,12 @@ class RestApiVersions(generics.RetrieveAPIView):
         return Response(formatted_data)
 
 
+@method_decorator(release_cache_page('rest_info'), name='get')
 class RestAncestryCategories(generics.RetrieveAPIView):
     """
     Return the list of ancestry categories
     """
+    throttle_weight = 0.25
 
     def get(self, request):
         data = {}